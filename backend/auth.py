@@ -1,20 +1,149 @@
 """
 Authentication and authorization utilities
+
+Users log in at /api/users/verify-login and receive a signed JWT access token that
+carries their id and role. Tokens are verified without a database round trip; only
+whether the user is still active (and still has the role in the token) is looked up,
+and that state is cached for `auth_user_state_ttl` seconds. The user endpoints
+invalidate the cache when they change or deactivate a user, so a deleted or demoted
+user is locked out immediately on this process and within the TTL on others.
 """
+import logging
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
 from fastapi import HTTPException, Depends
-from typing import Optional
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from sqlalchemy import select
+
+from config import settings
+from db import AsyncSessionLocal
+from models import User
+
+logger = logging.getLogger(__name__)
+
+_bearer = HTTPBearer(auto_error=False)
+
+_secret_key = settings.jwt_secret_key
+if not _secret_key:
+    _secret_key = secrets.token_urlsafe(32)
+    logger.warning(
+        "JWT_SECRET_KEY is not set; using a random key. Tokens will not survive a restart "
+        "and are not accepted by other workers."
+    )
+if not settings.auth_required:
+    logger.warning(
+        "AUTH_REQUIRED is off; requests without an access token act as admin. "
+        "Enable it in production."
+    )
+
+
+@dataclass
+class TokenUser:
+    id: int
+    role: str
+
+
+@dataclass
+class UserAuthState:
+    is_active: bool
+    role: str
+
+
+def create_access_token(user: User) -> Tuple[str, int]:
+    """Signed access token for the user; returns the token and its lifetime in seconds"""
+    expires_in = settings.access_token_expire_minutes * 60
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": str(user.id),
+        "role": user.role,
+        "iat": now,
+        "exp": now + timedelta(seconds=expires_in),
+    }
+    return jwt.encode(claims, _secret_key, algorithm=settings.jwt_algorithm), expires_in
+
+
+def decode_access_token(token: str) -> TokenUser:
+    try:
+        claims = jwt.decode(token, _secret_key, algorithms=[settings.jwt_algorithm])
+        return TokenUser(id=int(claims["sub"]), role=str(claims["role"]))
+    except (JWTError, KeyError, ValueError):
+        raise _unauthorized("Invalid or expired token")
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+class UserStateCache:
+    """Short-lived cache of each user's active flag and role"""
 
-# This is a simple implementation - in production, you'd want more robust auth
-def get_current_user_role() -> str:
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: Dict[int, Tuple[float, Optional[UserAuthState]]] = {}
+
+    async def get(self, user_id: int) -> Optional[UserAuthState]:
+        entry = self._entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        async with AsyncSessionLocal() as session:
+            row = (await session.execute(
+                select(User.is_active, User.role).where(User.id == user_id)
+            )).first()
+        state = UserAuthState(is_active=row.is_active, role=row.role) if row else None
+
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+        self._entries[user_id] = (time.monotonic() + settings.auth_user_state_ttl, state)
+        return state
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+
+user_state_cache = UserStateCache()
+
+
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+) -> Optional[TokenUser]:
+    """
+    The user the request's bearer token belongs to. Without a token this is None,
+    unless `auth_required` is set, in which case the request is rejected.
     """
-    Get the current user's role from the request.
-    For now, we'll return 'admin' as a placeholder.
-    In a real implementation, this would extract the role from JWT token or session.
+    if credentials is None:
+        if settings.auth_required:
+            raise _unauthorized("Not authenticated")
+        return None
+
+    token_user = decode_access_token(credentials.credentials)
+    state = await user_state_cache.get(token_user.id)
+    if state is None or not state.is_active:
+        raise _unauthorized("User is no longer active")
+    if state.role != token_user.role:
+        # The role in the token is stale; make the user log in again
+        raise _unauthorized("User role has changed, please log in again")
+    return token_user
+
+
+async def get_current_user_role(current_user: Optional[TokenUser] = Depends(get_current_user)) -> str:
     """
-    # TODO: Implement proper JWT token extraction and validation
-    # For now, we'll assume all requests are from admin users
-    # This should be replaced with actual authentication logic
-    return "admin"
+    Get the current user's role from the request's access token.
+    Requests without a token are treated as admin while `auth_required` is off, so
+    clients that do not send tokens yet keep working.
+    """
+    if current_user is None:
+        return "admin"
+    return current_user.role
+
 
 def require_admin_role(current_role: str = Depends(get_current_user_role)) -> str:
     """
@@ -23,7 +152,19 @@ def require_admin_role(current_role: str = Depends(get_current_user_role)) -> st
     """
     if current_role != "admin":
         raise HTTPException(
-            status_code=403, 
+            status_code=403,
             detail="Admin role required for this operation"
         )
     return current_role
+
+
+async def require_authenticated_admin(current_user: Optional[TokenUser] = Depends(get_current_user)) -> TokenUser:
+    """
+    Like require_admin_role, but always needs a verified token of an admin, even while
+    `auth_required` is off. For endpoints that expose internals (request profiles).
+    """
+    if current_user is None:
+        raise _unauthorized("Not authenticated")
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required for this operation")
+    return current_user
@@ -0,0 +1,174 @@
+"""
+Measure end-to-end throughput and latency of quotation emails.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_email --messages 200 --concurrency 8 --modes pooled per-message
+
+Every message goes through EmailService.deliver_quotation_email: the attachment is
+rendered with a PDF engine, the MIME message is built and sent over the SMTP pool
+to an in-process SMTP sink (see benchmarks/smtp_sink.py), so nothing leaves the
+machine. The mail settings from the environment are overridden to point at the sink.
+
+--engine auto uses the configured PDF engine unless it is wkhtmltopdf and the binary
+is missing, in which case a fake engine returning a fixed PDF after --render-ms is
+used; pass --engine fake to leave rendering out of the numbers altogether.
+
+Modes:
+  pooled       connections are reused as in production (SMTP_POOL_SIZE connections)
+  per-message  every message opens and closes its own connection, as FastMail does
+
+Use --sink-delay-ms to add the per-message latency of a real server to the sink.
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Any, Dict
+
+from benchmarks.sample_data import make_quotation
+from benchmarks.smtp_sink import SMTPSink
+from config import settings
+from email_service import email_service
+from pdf_engines import RenderEngine, WkhtmltopdfEngine, get_engine, register_engine, shutdown_engines
+
+
+class FakeRenderEngine(RenderEngine):
+    """Returns the same small PDF for every quotation after a fixed delay"""
+
+    name = "fake"
+    render_seconds = 0.0
+    pdf_bytes = (
+        b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+        b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+        b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 595 842]>>endobj\n"
+        b"trailer<</Root 1 0 R>>\n%%EOF\n"
+    )
+
+    async def render(self, quotation_data: Dict[str, Any]) -> bytes:
+        if self.render_seconds:
+            await asyncio.sleep(self.render_seconds)
+        return self.pdf_bytes
+
+
+_MAX_MESSAGES_PER_CONNECTION = settings.smtp_max_messages_per_connection
+
+
+def choose_engine(name: str) -> str:
+    if name != "auto":
+        return name
+    if settings.pdf_engine == WkhtmltopdfEngine.name:
+        try:
+            WkhtmltopdfEngine()._find_binary()
+        except Exception:
+            return FakeRenderEngine.name
+    return settings.pdf_engine
+
+
+def configure_email(port: int, mode: str) -> None:
+    settings.mail_server = "127.0.0.1"
+    settings.mail_port = port
+    settings.mail_from = settings.mail_from or "benchmark@example.com"
+    settings.mail_tls = False
+    settings.mail_ssl = False
+    settings.mail_use_credentials = False
+    # A connection that may carry only one message is closed after it, like FastMail
+    settings.smtp_max_messages_per_connection = 1 if mode == "per-message" else _MAX_MESSAGES_PER_CONNECTION
+    email_service.reinitialize()
+
+
+def _email_args(i: int, quotation: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "to_email": f"customer{i}@example.com",
+        "customer_name": "Mario Rossi",
+        "quotation_number": f"QUO/2026/{i:05d}",
+        "total_amount": 1234.5,
+        "valid_until": "31/10/2026",
+        "notes": "Benchmark quotation",
+        "company_name": "Grow United Italy",
+        "company_email": "info@example.com",
+        "quotation_data": quotation,
+    }
+
+
+async def bench_mode(mode: str, sink: SMTPSink, messages: int, concurrency: int, lines: int) -> None:
+    configure_email(sink.port, mode)
+    quotation = make_quotation(lines)
+
+    # Warm up the render engine (stylesheets, fonts) so it does not skew the first sends
+    await email_service.deliver_quotation_email(**_email_args(0, quotation))
+    sink.reset_counters()
+    email_service.smtp_pool.stats.update({key: 0 for key in email_service.smtp_pool.stats})
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(i: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            t = time.perf_counter()
+            try:
+                await email_service.deliver_quotation_email(**_email_args(i, quotation))
+            except Exception as e:
+                failures += 1
+                logging.getLogger(__name__).warning(f"Send {i} failed: {e}")
+                return
+            latencies.append(time.perf_counter() - t)
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(1, messages + 1)))
+    wall = time.perf_counter() - wall
+    await email_service.close()
+
+    if not latencies:
+        print(f"{mode:12s} all {messages} sends failed")
+        return
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"{mode:12s} sent={len(latencies):<5d} failed={failures:<3d} "
+        f"throughput={len(latencies) / wall * 60:8.0f}/min  "
+        f"p50={statistics.median(latencies) * 1000:7.1f} ms  p95={p95 * 1000:7.1f} ms  "
+        f"max={latencies[-1] * 1000:7.1f} ms  connections={sink.connections:<4d} "
+        f"received={sink.messages}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--lines", type=int, default=10, help="line items per quotation")
+    parser.add_argument("--modes", nargs="+", choices=["pooled", "per-message"], default=["pooled", "per-message"])
+    parser.add_argument("--engine", default="auto", help="PDF engine: auto, fake or a configured engine name")
+    parser.add_argument("--render-ms", type=float, default=0.0, help="render time of the fake engine")
+    parser.add_argument("--sink-delay-ms", type=float, default=0.0, help="extra latency of the SMTP sink per message")
+    parser.add_argument("--aiosmtpd", action="store_true", help="require aiosmtpd for the sink")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    FakeRenderEngine.render_seconds = args.render_ms / 1000
+    register_engine(FakeRenderEngine.name, FakeRenderEngine)
+    settings.pdf_engine = choose_engine(args.engine)
+    get_engine()  # fail early on an unknown engine name
+
+    sink = SMTPSink(data_delay=args.sink_delay_ms / 1000, use_aiosmtpd=True if args.aiosmtpd else None)
+    await sink.start()
+    print(
+        f"engine={settings.pdf_engine} sink={sink.implementation} messages={args.messages} "
+        f"concurrency={args.concurrency} pool_size={settings.smtp_pool_size} "
+        f"rate_limit={settings.smtp_rate_limit_per_minute or 'none'}"
+    )
+    try:
+        for mode in args.modes:
+            await bench_mode(mode, sink, args.messages, args.concurrency, args.lines)
+    finally:
+        await sink.stop()
+        shutdown_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""
+Measure how ReportLab quotation rendering scales with the number of line items.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_large_quotes --lines 10 1000 10000
+
+Each size is rendered in-process (no pool) so the timings show layout cost only.
+With --memory the peak Python allocation of a render is reported as well
+(tracemalloc slows rendering down noticeably, so timings are taken without it).
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.sample_data import make_quotation
+from pdf_service import pdf_service
+
+
+def bench_size(lines: int, runs: int, memory: bool) -> None:
+    quotation = make_quotation(lines)
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pdf = pdf_service.generate_quotation_pdf(quotation).getvalue()
+        timings.append(time.perf_counter() - start)
+
+    peak = ""
+    if memory:
+        tracemalloc.start()
+        pdf_service.generate_quotation_pdf(quotation)
+        peak = f"  peak_alloc={tracemalloc.get_traced_memory()[1] / 2**20:7.1f} MiB"
+        tracemalloc.stop()
+
+    best = min(timings)
+    print(
+        f"lines={lines:<6d} size={len(pdf) / 1024:9.1f} KiB  best={best * 1000:9.1f} ms  "
+        f"per_line={best / lines * 1e6:7.1f} us{peak}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--memory", action="store_true")
+    args = parser.parse_args()
+
+    for lines in args.lines:
+        bench_size(lines, args.runs, args.memory)
+
+
+if __name__ == "__main__":
+    main()
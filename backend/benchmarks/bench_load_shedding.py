@@ -0,0 +1,120 @@
+"""
+Show how cheap lookups fare during a burst of heavy requests on one worker, with and
+without per-route concurrency limits (`route_concurrency_limits`, see load_shedding.py).
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_load_shedding --heavy 40 --cheap 200
+
+A small app stands in for the real routes. Both kinds of request take a connection
+from a shared pool of --pool-size (like the database pool). A heavy request holds it
+for --heavy-db-ms and also keeps the event loop busy for --heavy-cpu-ms, as PDF
+rendering and mail assembly do; a cheap one needs the connection for 1 ms. --heavy
+heavy requests arrive at once, then --cheap lookups arrive one every 5 ms. With
+limits, only --limit heavy requests run at a time, --queue wait and the rest get 503.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Tuple
+
+from fastapi import FastAPI
+
+from config import settings
+from load_shedding import LoadSheddingMiddleware, load_shedder
+
+
+def make_app(pool_size: int, heavy_db_ms: float, heavy_cpu_ms: float) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(LoadSheddingMiddleware)
+    pool = asyncio.Semaphore(pool_size)
+
+    @app.post("/heavy")
+    async def heavy():
+        async with pool:
+            await asyncio.sleep(heavy_db_ms / 1000)
+        end = time.perf_counter() + heavy_cpu_ms / 1000
+        while time.perf_counter() < end:
+            pass
+        return {"ok": True}
+
+    @app.get("/cheap")
+    async def cheap():
+        async with pool:
+            await asyncio.sleep(0.001)
+        return {"ok": True}
+
+    return app
+
+
+async def request(app: FastAPI, method: str, path: str) -> Tuple[int, float]:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [], "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return status, time.perf_counter() - start
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def run(app: FastAPI, heavy: int, cheap: int) -> None:
+    async def cheap_lookups():
+        results = []
+        for _ in range(cheap):
+            results.append(asyncio.create_task(request(app, "GET", "/cheap")))
+            await asyncio.sleep(0.005)
+        return await asyncio.gather(*results)
+
+    start = time.perf_counter()
+    heavy_results, cheap_results = await asyncio.gather(
+        asyncio.gather(*(request(app, "POST", "/heavy") for _ in range(heavy))),
+        cheap_lookups(),
+    )
+    elapsed = time.perf_counter() - start
+    cheap_ms = [latency * 1000 for _, latency in cheap_results]
+    statuses = [status for status, _ in heavy_results]
+    print(
+        f"  heavy: {statuses.count(200)} done, {statuses.count(503)} shed (503)   "
+        f"cheap: p50={statistics.median(cheap_ms):7.1f} ms  p95={_percentile(cheap_ms, 0.95):7.1f} ms  "
+        f"max={max(cheap_ms):7.1f} ms   wall={elapsed * 1000:6.0f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--heavy", type=int, default=40, help="heavy requests arriving at once")
+    parser.add_argument("--cheap", type=int, default=200, help="cheap lookups during the burst")
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--heavy-db-ms", type=float, default=200)
+    parser.add_argument("--heavy-cpu-ms", type=float, default=20)
+    parser.add_argument("--limit", type=int, default=2, help="concurrent heavy requests allowed")
+    parser.add_argument("--queue", type=int, default=4, help="heavy requests allowed to wait")
+    args = parser.parse_args()
+
+    settings.route_queue_timeout = 5.0
+    for limited in (False, True):
+        settings.route_concurrency_limits = {"POST /heavy": [args.limit, args.queue]} if limited else {}
+        load_shedder.reload()
+        print(f"limits {'on  (' + str(args.limit) + ' running, ' + str(args.queue) + ' queued)' if limited else 'off'}")
+        await run(make_app(args.pool_size, args.heavy_db_ms, args.heavy_cpu_ms), args.heavy, args.cheap)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
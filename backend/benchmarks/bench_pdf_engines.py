@@ -0,0 +1,79 @@
+"""
+Compare latency and memory of the quotation PDF render engines.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_pdf_engines --engines wkhtmltopdf weasyprint --runs 20 --lines 10
+
+Latency is measured per render (the first render is reported separately since it
+includes stylesheet parsing and font loading). Memory is the peak RSS of this
+process and, for wkhtmltopdf, of its child processes; run one engine per
+invocation for a clean memory comparison.
+"""
+import argparse
+import asyncio
+import resource
+import statistics
+import time
+
+from benchmarks.sample_data import make_quotation
+from pdf_engines import ENGINES, get_engine, shutdown_engines
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+async def bench_engine(name: str, runs: int, lines: int, concurrency: int) -> None:
+    engine = get_engine(name)
+    quotation = make_quotation(lines)
+
+    start = time.perf_counter()
+    pdf = await engine.render(quotation)
+    first = time.perf_counter() - start
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            t = time.perf_counter()
+            await engine.render(quotation)
+            latencies.append(time.perf_counter() - t)
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(runs)))
+    wall = time.perf_counter() - wall
+
+    latencies.sort()
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    print(
+        f"{name:12s} lines={lines:<6d} size={len(pdf) / 1024:8.1f} KiB  "
+        f"first={first * 1000:8.1f} ms  p50={statistics.median(latencies) * 1000:8.1f} ms  "
+        f"p95={p95 * 1000:8.1f} ms  throughput={runs / wall:6.1f}/s  "
+        f"rss={_peak_rss_mb(resource.RUSAGE_SELF):7.1f} MiB  "
+        f"children_rss={_peak_rss_mb(resource.RUSAGE_CHILDREN):7.1f} MiB"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", nargs="+", default=sorted(ENGINES))
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        for name in args.engines:
+            try:
+                await bench_engine(name, args.runs, args.lines, args.concurrency)
+            except Exception as e:
+                print(f"{name:12s} unavailable: {e}")
+    finally:
+        shutdown_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
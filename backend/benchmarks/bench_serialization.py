@@ -0,0 +1,145 @@
+"""
+Compare the per-row cost of the quote and product list endpoints with and without
+the fast serialization path (`fast_list_serialization`, see fast_json.py).
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_serialization --quotes 10000 --items 5
+
+The list handlers are called directly and their result is encoded exactly as
+FastAPI does it: through the route's response model and JSONResponse for the
+ORM path, or the handler's own FastJSONResponse for the fast path. The two
+bodies are compared, so a mismatch in the fast path shows up here. The fast
+path's response renders itself inside the handler, so its encoding time is part
+of "handler".
+
+By default the data lives in an in-memory SQLite database (needs aiosqlite).
+Pass --database-url to measure against Postgres instead; the tables are created
+and filled there, so only point it at a scratch database.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from config import settings
+from db import Base
+from models import Customer, Product, Quote, QuoteItem
+from routers import products as products_router
+from routers import quotes as quotes_router
+
+
+async def seed(engine, quotes: int, items: int, products: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        now = datetime.now(timezone.utc)
+        await conn.execute(insert(Customer), [
+            {"id": i, "name": f"Customer {i}", "email": f"buyer{i}@example.com", "phone": "+39 055 000000",
+             "address": f"Via Roma {i}, Firenze", "contact_person": "Anna Rossi", "vat_number": f"IT{i:011d}",
+             "country": "IT"}
+            for i in range(1, 101)
+        ])
+        await conn.execute(insert(Product), [
+            {"id": i, "name": f"Product {i}", "sku": f"SKU-{i:05d}", "description": "Sample product",
+             "unit_price": Decimal("12.50") + i, "currency": "EUR", "category": "Seeds", "vat_rate": Decimal("22.00")}
+            for i in range(1, products + 1)
+        ])
+        await conn.execute(insert(Quote), [
+            {"id": q, "customer_id": q % 100 + 1, "status": "sent", "notes": "Delivery within 30 days",
+             "quotation_number": f"QUO/2026/{q:05d}", "valid_until": now + timedelta(days=30),
+             "discount_type": "percentage", "discount_value": Decimal("5.00"), "subtotal": Decimal("1000.00"),
+             "total_vat": Decimal("209.00"), "total": Decimal("1159.00"), "created_at": now, "updated_at": now}
+            for q in range(1, quotes + 1)
+        ])
+        rows = [
+            {"quote_id": q, "product_id": (q * items + i) % products + 1, "description": f"Line {i}",
+             "quantity": Decimal("4.00"), "unit_price": Decimal("50.00"), "vat_rate": Decimal("22.00"),
+             "line_total": Decimal("200.00"), "line_total_vat": Decimal("44.00")}
+            for q in range(1, quotes + 1) for i in range(items)
+        ]
+        for start in range(0, len(rows), 5000):
+            await conn.execute(insert(QuoteItem), rows[start:start + 5000])
+
+
+def _route(router, name: str):
+    return next(route for route in router.routes if route.name == name)
+
+
+async def _encode(route, result) -> bytes:
+    if isinstance(result, JSONResponse):
+        return result.body
+    content = await serialize_response(field=route.response_field, response_content=result, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def bench_endpoint(sessions, label: str, route, call, rows: int, runs: int) -> None:
+    bodies = {}
+    for fast in (False, True):
+        settings.fast_list_serialization = fast
+        handler_times, encode_times = [], []
+        for _ in range(runs):
+            async with sessions() as session:
+                start = time.perf_counter()
+                result = await call(session)
+                loaded = time.perf_counter()
+                body = await _encode(route, result)
+                done = time.perf_counter()
+            handler_times.append(loaded - start)
+            encode_times.append(done - loaded)
+        bodies[fast] = body
+        handler, encode = statistics.median(handler_times), statistics.median(encode_times)
+        print(
+            f"{label:9s} {'fast' if fast else 'orm':4s} rows={rows:<6d} "
+            f"handler={handler * 1000:8.1f} ms  encode={encode * 1000:8.1f} ms  "
+            f"per row={(handler + encode) / rows * 1e6:7.1f} us  body={len(body) / 1024:8.0f} KiB"
+        )
+    if bodies[False] == bodies[True]:
+        same = "yes, byte for byte"
+    else:
+        same = "yes" if json.loads(bodies[False]) == json.loads(bodies[True]) else "NO"
+    print(f"{label:9s} same JSON from both paths: {same}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quotes", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=5, help="line items per quote")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite://")
+    args = parser.parse_args()
+
+    if args.database_url.startswith("sqlite"):
+        engine = create_async_engine(args.database_url, poolclass=StaticPool)
+    else:
+        engine = create_async_engine(args.database_url)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    try:
+        await seed(engine, args.quotes, args.items, args.products)
+        print(f"quotes={args.quotes} items/quote={args.items} products={args.products} runs={args.runs}")
+        # The handlers are called directly, past the response cache (`__wrapped__`)
+        await bench_endpoint(
+            sessions, "quotes", _route(quotes_router.router, "list_quotes"),
+            lambda session: quotes_router.list_quotes.__wrapped__(include_deleted=False, session=session),
+            args.quotes, args.runs,
+        )
+        await bench_endpoint(
+            sessions, "products", _route(products_router.router, "list_products"),
+            lambda session: products_router.list_products.__wrapped__(q=None, skip=0, limit=args.products, include_deleted=False, session=session),
+            args.products, args.runs,
+        )
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Show what a burst of identical GETs costs the database with and without single-flight
+coalescing (`single_flight_enabled`, see singleflight.py): the dashboard loading in
+every browser at once.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_single_flight --clients 50 --quotes 2000
+
+For each mode, --clients concurrent requests for each of /api/quotes, /api/customers
+and /api/products go through the app (middleware, dependencies, handlers) and the
+SQL statements they run are counted. The response cache is disabled, so only
+coalescing is measured; with it on, the burst costs one query per list, as the
+cache's first miss is coalesced the same way.
+
+By default the data lives in an in-memory SQLite database (needs aiosqlite).
+Pass --database-url to measure against Postgres instead; the tables are created
+and filled there, so only point it at a scratch database.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.bench_serialization import seed
+from config import settings
+from db import get_read_session
+from main import app
+from singleflight import single_flight
+
+PATHS = ["/api/quotes", "/api/customers?limit=100", "/api/products?limit=500"]
+
+
+async def get(path: str) -> Tuple[int, bytes]:
+    """One GET through the ASGI app"""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [], "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]["status"], b"".join(m.get("body", b"") for m in messages[1:])
+
+
+async def burst(clients: int) -> Tuple[float, List[float]]:
+    async def timed(path: str) -> float:
+        start = time.perf_counter()
+        status, _ = await get(path)
+        if status != 200:
+            raise RuntimeError(f"GET {path} answered {status}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(timed(path) for _ in range(clients) for path in PATHS))
+    return time.perf_counter() - start, latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50, help="concurrent requests per endpoint")
+    parser.add_argument("--quotes", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=5, help="line items per quote")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite://")
+    args = parser.parse_args()
+
+    if args.database_url.startswith("sqlite"):
+        engine = create_async_engine(args.database_url, poolclass=StaticPool)
+    else:
+        engine = create_async_engine(args.database_url)
+    sessions = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def read_session():
+        async with sessions() as session:
+            yield session
+
+    statements = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    app.dependency_overrides[get_read_session] = read_session
+    settings.response_cache_enabled = False
+    settings.request_deadline_seconds = 0  # queued requests are expected here
+    try:
+        await seed(engine, args.quotes, args.items, args.products)
+        print(f"clients={args.clients} per endpoint, endpoints={len(PATHS)} quotes={args.quotes} items/quote={args.items}")
+        for enabled in (False, True):
+            settings.single_flight_enabled = enabled
+            await burst(1)  # warm up
+            statements, shared = 0, single_flight.shared
+            elapsed, latencies = await burst(args.clients)
+            print(
+                f"single flight {'on ' if enabled else 'off'}  requests={len(latencies):<5d} "
+                f"SQL statements={statements:<6d} shared={single_flight.shared - shared:<5d} "
+                f"wall={elapsed * 1000:8.0f} ms  median latency={statistics.median(latencies) * 1000:8.0f} ms"
+            )
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""
+Measure how long a fresh worker takes to import the app, and fail when it is over budget.
+
+Run from the backend directory:
+
+    python -m benchmarks.cold_start --runs 5 --budget-ms 2000
+
+Each run starts a new interpreter and times `import main`, which is what uvicorn
+does for every worker it spawns. The check fails (exit status 1) when the median
+import time is above --budget-ms, or when any of the heavy rendering and mail
+modules was imported; those are loaded on first use (see email_service.py and
+pdf_service.py), and one showing up here means an import crept back onto the
+startup path. Use --profile to print the slowest imports of one run.
+
+The image build runs it with a generous budget (5000 ms, a few times the usual
+import time) so a slow build machine does not fail it but a regression that
+doubles startup does; use the 2000 ms default on a developer machine. With
+--budget-ms 0 the timing is only reported.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Must not be imported when a worker starts
+LAZY_MODULES = ["reportlab", "pdfkit", "weasyprint", "fastapi_mail", "requests", "PIL", "alembic", "redis", "aiosmtplib"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def _run_once() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _profile(top: int) -> None:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            rows.append((int(cumulative), name.rstrip()))
+    print("\nSlowest imports (cumulative):")
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cold start check for API workers")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=2000.0, help="0 reports the timing without checking it")
+    parser.add_argument("--profile", action="store_true", help="show the slowest imports of one run")
+    args = parser.parse_args()
+
+    _run_once()  # warm the bytecode and OS file caches so runs are comparable
+    runs = [_run_once() for _ in range(args.runs)]
+    times = [run["ms"] for run in runs]
+    median = statistics.median(times)
+    budget = f"budget {args.budget_ms:.0f} ms" if args.budget_ms > 0 else "no budget"
+    print(f"import main: median {median:.0f} ms, min {min(times):.0f} ms, max {max(times):.0f} ms over {args.runs} runs "
+          f"({budget})")
+    if args.profile:
+        _profile(top=15)
+
+    failed = False
+    loaded = sorted({module for run in runs for module in run["loaded"]})
+    if loaded:
+        print(f"FAIL: imported at startup, should be lazy: {', '.join(loaded)}")
+        failed = True
+    if args.budget_ms > 0 and median > args.budget_ms:
+        print(f"FAIL: cold start over budget by {median - args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+In-process Redis stand-in for benchmarks and local testing of the shared response
+cache backend (response_cache.py), so it can be exercised without a Redis server.
+
+`RedisStandin` speaks enough RESP2 on 127.0.0.1 for redis-py and the commands the
+cache uses: GET, MGET, SET (with PX/EX), DEL, INCR/INCRBY, SADD, SMEMBERS,
+PEXPIRE/EXPIRE, plus PING, SELECT, FLUSHALL and CLIENT. Keys expire lazily on
+access, as in Redis.
+
+    standin = RedisStandin()
+    port = await standin.start()
+    ...  # RESPONSE_CACHE_REDIS_URL=redis://127.0.0.1:<port>/0
+    await standin.stop()
+
+`delay` holds every reply for that many seconds, to stand in for the network
+round trip to a real server.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+Value = Union[bytes, Set[bytes]]
+
+
+class _WrongType(Exception):
+    pass
+
+
+class RedisStandin:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.host = "127.0.0.1"
+        self.port: Optional[int] = None
+        self.connections = 0
+        self.commands = 0
+        self._data: Dict[bytes, Value] = {}
+        self._expires: Dict[bytes, float] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def reset_counters(self) -> None:
+        self.connections = 0
+        self.commands = 0
+
+    async def start(self, port: int = 0) -> int:
+        self._server = await asyncio.start_server(self._handle, self.host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Redis stand-in listening on {self.host}:{self.port}")
+        return self.port
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    # Keyspace
+
+    def _get(self, key: bytes) -> Optional[Value]:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._delete(key)
+        return self._data.get(key)
+
+    def _delete(self, key: bytes) -> bool:
+        self._expires.pop(key, None)
+        return self._data.pop(key, None) is not None
+
+    def _string(self, key: bytes) -> Optional[bytes]:
+        value = self._get(key)
+        if value is not None and not isinstance(value, bytes):
+            raise _WrongType()
+        return value
+
+    def _set(self, key: bytes) -> Set[bytes]:
+        value = self._get(key)
+        if value is None:
+            value = self._data[key] = set()
+        elif not isinstance(value, set):
+            raise _WrongType()
+        return value
+
+    def _expire(self, key: bytes, seconds: float) -> int:
+        if self._get(key) is None:
+            return 0
+        self._expires[key] = time.monotonic() + seconds
+        return 1
+
+    def _execute(self, args: List[bytes]) -> Union[bytes, int, None, List, Exception]:
+        command = args[0].upper()
+        if command == b"PING":
+            return b"+PONG"
+        if command in (b"CLIENT", b"SELECT"):
+            return b"+OK"
+        if command == b"FLUSHALL":
+            self._data.clear()
+            self._expires.clear()
+            return b"+OK"
+        if command == b"GET":
+            return self._string(args[1])
+        if command == b"MGET":
+            return [self._string(key) for key in args[1:]]
+        if command == b"SET":
+            key, value = args[1], args[2]
+            self._delete(key)
+            self._data[key] = value
+            options = [arg.upper() for arg in args[3:]]
+            for option, amount in zip(options, args[4:]):
+                if option == b"PX":
+                    self._expire(key, int(amount) / 1000)
+                elif option == b"EX":
+                    self._expire(key, int(amount))
+            return b"+OK"
+        if command == b"DEL":
+            return sum(self._delete(key) for key in args[1:] if self._get(key) is not None)
+        if command in (b"INCR", b"INCRBY"):
+            value = int(self._string(args[1]) or 0) + (int(args[2]) if command == b"INCRBY" else 1)
+            self._data[args[1]] = str(value).encode()
+            return value
+        if command == b"SADD":
+            members = self._set(args[1])
+            before = len(members)
+            members.update(args[2:])
+            return len(members) - before
+        if command == b"SMEMBERS":
+            value = self._get(args[1])
+            if value is not None and not isinstance(value, set):
+                raise _WrongType()
+            return sorted(value or ())
+        if command == b"PEXPIRE":
+            return self._expire(args[1], int(args[2]) / 1000)
+        if command == b"EXPIRE":
+            return self._expire(args[1], int(args[2]))
+        return ValueError(f"unknown command '{args[0].decode(errors='replace')}'")
+
+    # Protocol
+
+    @staticmethod
+    def _encode(reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, Exception):
+            return f"-ERR {reply}\r\n".encode()
+        if isinstance(reply, bool) or isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, bytes):
+            if reply.startswith((b"+", b"-")):  # status and error replies
+                return reply + b"\r\n"
+            return b"$%d\r\n%s\r\n" % (len(reply), reply)
+        return b"*%d\r\n" % len(reply) + b"".join(RedisStandin._encode(item) for item in reply)
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                self.commands += 1
+                try:
+                    reply = self._execute(args)
+                except _WrongType:
+                    reply = b"-WRONGTYPE Operation against a key holding the wrong kind of value"
+                except (IndexError, ValueError):
+                    reply = ValueError(f"wrong arguments for '{args[0].decode(errors='replace')}' command")
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                writer.write(self._encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
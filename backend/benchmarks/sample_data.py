@@ -0,0 +1,55 @@
+"""
+Synthetic quotation payloads shared by the benchmark scripts.
+"""
+from typing import Any, Dict
+
+
+def make_quotation(line_count: int = 10) -> Dict[str, Any]:
+    items = [
+        {
+            "product_name": f"Product {i}",
+            "sku": f"SKU-{i:05d}",
+            "description": f"Product {i} description",
+            "quantity": (i % 7) + 1,
+            "unit_price": 10.0 + (i % 50),
+            "vat_rate": 22 if i % 3 else 4,
+        }
+        for i in range(1, line_count + 1)
+    ]
+    subtotal = sum(it["quantity"] * it["unit_price"] for it in items)
+    vat_amount = sum(it["quantity"] * it["unit_price"] * it["vat_rate"] / 100 for it in items)
+    return {
+        "quotation_number": f"QUO/2026/{line_count:04d}",
+        "date": "2026-10-01",
+        "valid_until": "2026-10-31",
+        "notes": "Benchmark quotation",
+        "vat_rate": 22,
+        "customer": {
+            "company_name": "Benchmark Customer S.r.l.",
+            "contact_person": "Mario Rossi",
+            "address": "Via Roma 1, Milano",
+            "email": "customer@example.com",
+        },
+        "company_settings": {
+            "company_name": "Grow United Italia SRL",
+            "address_line1": "Via Paleocapa 1",
+            "city": "Milano",
+            "postal_code": "20121",
+            "country": "Italy",
+            "email": "administration@growunited.it",
+            "website": "www.canna-it.com",
+            "vat_number": "IT13328670966",
+            "bank_name_branch": "BANCA PASSADORE & C. S.P.A.",
+            "account_number": "1118520",
+            "iban": "IT87I0333201600000001118520",
+            "bic_swift": "PASBITGG",
+        },
+        "items": items,
+        "discount": {"type": "none", "value": 0},
+        "totals": {
+            "subtotal": subtotal,
+            "discountAmount": 0,
+            "vatAmount": vat_amount,
+            "total": subtotal + vat_amount,
+        },
+    }
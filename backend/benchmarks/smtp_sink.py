@@ -0,0 +1,149 @@
+"""
+In-process SMTP stand-in for benchmarks and local testing of the email path.
+
+`SMTPSink` accepts mail on 127.0.0.1 and throws it away, counting connections and
+messages. It uses aiosmtpd when that package is installed and otherwise a minimal
+built-in asyncio server (enough ESMTP for aiosmtplib: EHLO/HELO, AUTH, MAIL, RCPT,
+DATA, RSET, NOOP, QUIT), so it runs on any box without network access. Point the
+app at it with MAIL_TLS=false and MAIL_USE_CREDENTIALS=false.
+
+    sink = SMTPSink(data_delay=0.005)
+    port = await sink.start()
+    ...
+    await sink.stop()
+
+`data_delay` holds the reply to DATA for that many seconds, to stand in for the
+per-message latency of a real server. `drop_connections()` closes the open
+sessions of the built-in server, like a server timing out idle clients.
+"""
+import asyncio
+import logging
+from typing import Optional, Set
+
+logger = logging.getLogger(__name__)
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # optional; the built-in server is used instead
+    Controller = None
+
+
+class SMTPSink:
+    def __init__(self, data_delay: float = 0.0, use_aiosmtpd: Optional[bool] = None):
+        self.data_delay = data_delay
+        self.use_aiosmtpd = Controller is not None if use_aiosmtpd is None else use_aiosmtpd
+        if self.use_aiosmtpd and Controller is None:
+            raise RuntimeError("aiosmtpd is not installed")
+        self.host = "127.0.0.1"
+        self.port: Optional[int] = None
+        self.connections = 0
+        self.messages = 0
+        self.bytes_received = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._controller = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    @property
+    def implementation(self) -> str:
+        return "aiosmtpd" if self.use_aiosmtpd else "built-in"
+
+    def reset_counters(self) -> None:
+        self.connections = 0
+        self.messages = 0
+        self.bytes_received = 0
+
+    async def start(self, port: int = 0) -> int:
+        if self.use_aiosmtpd:
+            # The controller needs a fixed port; it connects to itself to check startup
+            self._controller = Controller(_AiosmtpdHandler(self), hostname=self.host, port=port or 8025)
+            await asyncio.to_thread(self._controller.start)
+            self.port = self._controller.port
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, port)
+            self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"SMTP sink ({self.implementation}) listening on {self.host}:{self.port}")
+        return self.port
+
+    async def drop_connections(self) -> None:
+        """Close every open session without a reply (built-in server only)"""
+        if self.use_aiosmtpd:
+            raise RuntimeError("drop_connections needs the built-in server")
+        writers, self._writers = self._writers, set()
+        for writer in writers:
+            writer.close()
+        await asyncio.gather(*(writer.wait_closed() for writer in writers), return_exceptions=True)
+
+    async def stop(self) -> None:
+        if self._controller is not None:
+            await asyncio.to_thread(self._controller.stop)
+            self._controller = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._writers.add(writer)
+        writer.write(b"220 sink ESMTP ready\r\n")
+        await writer.drain()
+        in_data = False
+        size = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if in_data:
+                    if line == b".\r\n":
+                        in_data = False
+                        if self.data_delay:
+                            await asyncio.sleep(self.data_delay)
+                        self.messages += 1
+                        self.bytes_received += size
+                        writer.write(b"250 2.0.0 OK: queued\r\n")
+                        await writer.drain()
+                    else:
+                        size += len(line)
+                    continue
+
+                command = line[:4].upper()
+                if command == b"EHLO":
+                    writer.write(b"250-sink\r\n250-8BITMIME\r\n250-AUTH PLAIN LOGIN\r\n250 PIPELINING\r\n")
+                elif command == b"HELO":
+                    writer.write(b"250 sink\r\n")
+                elif command == b"AUTH":
+                    writer.write(b"235 2.7.0 Authentication successful\r\n")
+                elif command == b"DATA":
+                    in_data, size = True, 0
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                elif command == b"QUIT":
+                    writer.write(b"221 2.0.0 Bye\r\n")
+                    await writer.drain()
+                    break
+                else:  # MAIL, RCPT, RSET, NOOP
+                    writer.write(b"250 2.0.0 OK\r\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+class _AiosmtpdHandler:
+    def __init__(self, sink: SMTPSink):
+        self.sink = sink
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        # Called once per EHLO; close enough to a connection count for benchmarking
+        self.sink.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.sink.data_delay:
+            await asyncio.sleep(self.sink.data_delay)
+        self.sink.messages += 1
+        self.sink.bytes_received += len(envelope.content or b"")
+        return "250 2.0.0 OK: queued"
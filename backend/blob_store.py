@@ -0,0 +1,207 @@
+"""
+Content-addressed store for uploaded images (company logo, profile pictures).
+
+Images used to be saved as base64 data URIs in `CompanySettings.logo_url` and
+`User.profile_picture_url`, so every settings or user list response carried them.
+They are now written to `blob_store_dir` under the SHA-256 of their bytes, and the
+columns hold a short URL (`/api/blobs/<sha256>.<ext>`). A name never changes
+content, so the files are served with an immutable Cache-Control header.
+
+Thumbnails (`?w=&h=`) are generated once per size with Pillow and stored next to
+the originals; without Pillow the original is served.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config import settings
+from db import AsyncSessionLocal
+from models import CompanySettings, User
+
+logger = logging.getLogger(__name__)
+
+URL_PREFIX = "/api/blobs/"
+
+CONTENT_TYPES: Dict[str, str] = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/svg+xml": "svg",
+}
+EXTENSIONS: Dict[str, str] = {ext: content_type for content_type, ext in CONTENT_TYPES.items()}
+
+_NAME_RE = re.compile(r"^[0-9a-f]{64}\.(png|jpg|gif|webp|svg)$")
+_DATA_URI_RE = re.compile(r"^data:(?P<type>[\w.+-]+/[\w.+-]+)?(?P<params>(;[^,;]*)*?);base64,(?P<data>.*)$", re.S)
+
+
+@lru_cache(maxsize=None)
+def pil_image():
+    """PIL.Image, or None when Pillow is not installed; imported on first use"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+class BlobError(ValueError):
+    """Rejected upload: unsupported type, too large or malformed"""
+
+
+def parse_data_uri(uri: str) -> Tuple[bytes, str]:
+    match = _DATA_URI_RE.match(uri)
+    if not match:
+        raise BlobError("Not a base64 data URI")
+    try:
+        data = base64.b64decode(match.group("data"), validate=False)
+    except (binascii.Error, ValueError):
+        raise BlobError("Invalid base64 data")
+    return data, (match.group("type") or "application/octet-stream").lower()
+
+
+class BlobStore:
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or settings.blob_store_dir)
+        self._thumbnail_locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def is_blob_url(url: Optional[str]) -> bool:
+        return bool(url) and url.startswith(URL_PREFIX)
+
+    @staticmethod
+    def url_for(name: str) -> str:
+        return URL_PREFIX + name
+
+    @staticmethod
+    def name_from_url(url: str) -> Optional[str]:
+        name = url[len(URL_PREFIX):].split("?", 1)[0]
+        return name if _NAME_RE.match(name) else None
+
+    @staticmethod
+    def content_type_for(name: str) -> str:
+        return EXTENSIONS[name.rsplit(".", 1)[-1]]
+
+    def path_for(self, name: str) -> Path:
+        """Path of a stored blob; raises BlobError for names that are not ours"""
+        if not _NAME_RE.match(name):
+            raise BlobError("Invalid blob name")
+        return self.directory / name[:2] / name
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def put(self, data: bytes, content_type: str) -> str:
+        """Store image bytes and return the blob name; identical images share one file"""
+        content_type = content_type.split(";", 1)[0].strip().lower()
+        if content_type == "image/jpg":
+            content_type = "image/jpeg"
+        if content_type not in CONTENT_TYPES:
+            raise BlobError(f"Unsupported image type '{content_type}'")
+        if not data:
+            raise BlobError("Empty file")
+        if len(data) > settings.max_file_size_mb * 1024 * 1024:
+            raise BlobError(f"File is larger than {settings.max_file_size_mb} MB")
+
+        name = f"{hashlib.sha256(data).hexdigest()}.{CONTENT_TYPES[content_type]}"
+        path = self.path_for(name)
+        if not path.exists():
+            self._write_atomic(path, data)
+            logger.info(f"Stored blob {name} ({len(data)} bytes)")
+        return name
+
+    def externalize(self, value: Optional[str]) -> Optional[str]:
+        """Replace a data URI with the URL of a stored blob; other values are returned as they are"""
+        if not value or not value.startswith("data:"):
+            return value
+        data, content_type = parse_data_uri(value)
+        return self.url_for(self.put(data, content_type))
+
+    async def thumbnail(self, name: str, width: int, height: int) -> Path:
+        """Path of the image scaled to fit width x height, rendered on first request"""
+        path = self.path_for(name)
+        # Without Pillow thumbnails fall back to the original
+        if pil_image() is None or name.endswith((".svg", ".gif")):
+            return path
+        thumb = path.parent / "thumbs" / f"{name.rsplit('.', 1)[0]}-{width}x{height}.png"
+        if thumb.exists():
+            return thumb
+        key = thumb.name
+        lock = self._thumbnail_locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                if not thumb.exists():
+                    await asyncio.to_thread(self._render_thumbnail, path, thumb, width, height)
+        finally:
+            if not lock.locked():
+                self._thumbnail_locks.pop(key, None)
+        return thumb
+
+    def _render_thumbnail(self, source: Path, target: Path, width: int, height: int) -> None:
+        with pil_image().open(source) as img:
+            img = img.convert("RGBA") if img.mode not in ("RGB", "RGBA", "L", "LA", "P") else img.copy()
+            if img.width > width or img.height > height:
+                img.thumbnail((width, height))
+            out = BytesIO()
+            img.save(out, format="PNG", optimize=True)
+        self._write_atomic(target, out.getvalue())
+
+    async def data_uri(self, url: str, max_size: Optional[Tuple[int, int]] = None) -> Optional[str]:
+        """Base64 data URI of a stored image, scaled to fit max_size if given, for embedding in PDFs"""
+        name = self.name_from_url(url)
+        if name is None:
+            return None
+        try:
+            path = await self.thumbnail(name, *max_size) if max_size else self.path_for(name)
+            data = await asyncio.to_thread(path.read_bytes)
+        except (OSError, BlobError) as e:
+            logger.warning(f"Failed to read blob {name}: {e}")
+            return None
+        content_type = "image/png" if path.parent.name == "thumbs" else self.content_type_for(name)
+        return f"data:{content_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+blob_store = BlobStore()
+
+
+async def migrate_inline_images(sessions: async_sessionmaker = AsyncSessionLocal) -> int:
+    """
+    Move images still stored inline as data URIs into the blob store and replace
+    them with blob URLs. Idempotent; returns the number of rows changed. Run by
+    migrate.py once per deploy.
+    """
+    changed = 0
+    async with sessions() as session:
+        for model, column in ((CompanySettings, CompanySettings.logo_url), (User, User.profile_picture_url)):
+            result = await session.execute(select(model).where(column.like("data:%")))
+            for row in result.scalars().all():
+                try:
+                    setattr(row, column.key, await asyncio.to_thread(blob_store.externalize, getattr(row, column.key)))
+                    changed += 1
+                except BlobError as e:
+                    logger.warning(f"Could not move {model.__tablename__}.{column.key} of row {row.id} to the blob store: {e}")
+        if changed:
+            await session.commit()
+            logger.info(f"Moved {changed} inline images to the blob store")
+    return changed
@@ -0,0 +1,200 @@
+"""
+Bulk quotation mailing.
+
+A bulk job sends stored quotes either to each quote's own customer or one quote to
+a list of recipients. Starting a job resolves the recipients and, in one
+transaction, queues an `email_outbox` row per recipient (kind "bulk_quotation",
+tagged with the job id). Delivery is the outbox workers' job (see email_outbox.py),
+so bulk mail gets the same retries and backoff as single sends and a restart loses
+nothing. The attachment is the quote's PDF from the render cache
+(quote_documents.py), so each distinct quote is rendered once however many
+recipients it has. Recipients that can not be sent to (quote not found, customer
+without an email address) are stored as failed rows right away; they hold no
+message, so they can not be retried (see is_unresolved).
+
+Messages to one recipient domain are scheduled `bulk_email_per_domain_per_minute`
+apart when they are queued, so no worker has to wait for the limit; the SMTP pool
+applies its own per-server limit on top. The schedule lives in the API process that
+queues the job: jobs started on different workers at the same time are each spaced
+on their own, so a domain can get up to one rate per worker. The job's
+per-recipient results are read back from its rows.
+
+To try it without a real mail server, point MAIL_SERVER/MAIL_PORT at a local SMTP
+stand-in (e.g. `python -m aiosmtpd -n -l localhost:1025` with MAIL_TLS=false and
+MAIL_USE_CREDENTIALS=false).
+"""
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from config import settings
+from email_outbox import email_outbox
+from email_service import EmailService
+from models import EmailOutbox, Quote
+from quote_documents import load_company_settings
+from schemas import BulkQuotationEmailRequest
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RecipientResult:
+    to_email: str
+    quote_id: int
+    status: str  # pending, sending, sent, failed
+    error: Optional[str] = None
+
+
+@dataclass
+class BulkEmailJob:
+    id: str
+    results: List[RecipientResult]
+    created_at: datetime
+    last_change: Optional[datetime] = None
+
+    @property
+    def status(self) -> str:
+        return "running" if any(r.status in ("pending", "sending") for r in self.results) else "completed"
+
+    @property
+    def finished_at(self) -> Optional[datetime]:
+        return self.last_change if self.status == "completed" else None
+
+    @property
+    def total(self) -> int:
+        return len(self.results)
+
+    @property
+    def sent(self) -> int:
+        return sum(1 for r in self.results if r.status == "sent")
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for r in self.results if r.status == "failed")
+
+
+def is_unresolved(message: EmailOutbox) -> bool:
+    """A bulk recipient that failed before anything was queued (no message to retry)"""
+    return message.kind == "bulk_quotation" and "to_email" not in (message.payload or {})
+
+
+class DomainSchedule:
+    """
+    Send times spaced per recipient domain, like smtp_pool.RateLimiter but handed out
+    as timestamps. Per process, like the RateLimiter.
+    """
+
+    def __init__(self):
+        # domain -> (rate the slot was computed with, next free slot)
+        self._next_slot: Dict[str, Tuple[int, datetime]] = {}
+
+    def slot(self, email: str, now: datetime) -> datetime:
+        per_minute = settings.bulk_email_per_domain_per_minute
+        if per_minute <= 0:
+            return now
+        # Slots in the past do not hold anything back any more
+        self._next_slot = {domain: entry for domain, entry in self._next_slot.items() if entry[1] > now}
+        domain = email.rsplit("@", 1)[-1].lower()
+        rate, next_slot = self._next_slot.get(domain, (per_minute, now))
+        start = next_slot if rate == per_minute else now
+        self._next_slot[domain] = (per_minute, start + timedelta(seconds=60.0 / per_minute))
+        return start
+
+
+class BulkMailer:
+    def __init__(self):
+        self._schedule = DomainSchedule()
+
+    async def start(self, session: AsyncSession, request: BulkQuotationEmailRequest) -> BulkEmailJob:
+        """Queue one outbox message per recipient; commits the session"""
+        job_id = uuid.uuid4().hex
+        quote_ids = list(dict.fromkeys(([request.quote_id] if request.quote_id is not None else []) + request.quote_ids))
+        result = await session.execute(
+            select(Quote).options(selectinload(Quote.customer)).where(Quote.id.in_(quote_ids), Quote.deleted == False)
+        )
+        quotes = {quote.id: quote for quote in result.scalars().all()}
+        company = await load_company_settings()
+        company_name = (company.company_name if company else None) or settings.default_company_name
+        company_email = (company.email if company else None) or ""
+
+        targets = [(request.quote_id, r.to_email, r.customer_name) for r in request.recipients]
+        targets.extend((quote_id, None, None) for quote_id in dict.fromkeys(request.quote_ids))
+
+        now = datetime.now(timezone.utc)
+        messages = []
+        for quote_id, to_email, customer_name in targets:
+            quote = quotes.get(quote_id)
+            customer = quote.customer if quote else None
+            to_email = to_email or (customer.email if customer else None) or ""
+            error = None
+            if quote is None:
+                error = f"Quote {quote_id} not found"
+            elif not to_email:
+                error = f"Quote {quote_id} customer has no email address"
+            if error:
+                messages.append(EmailOutbox(
+                    kind="bulk_quotation", bulk_job_id=job_id, to_email=to_email, subject="",
+                    payload={"quote_id": quote_id}, status="failed", attempts=0, last_error=error,
+                ))
+                continue
+            email = {
+                "to_email": to_email,
+                "customer_name": customer_name or (customer.contact_person if customer else None) or "Customer",
+                "quotation_number": quote.quotation_number or f"#{quote.id}",
+                "total_amount": float(quote.total or 0),
+                "valid_until": quote.valid_until.strftime('%d/%m/%Y') if quote.valid_until else '',
+                "notes": request.notes if request.notes is not None else quote.notes,
+                "company_name": company_name,
+                "company_email": company_email,
+                "quote_id": quote.id,
+            }
+            messages.append(EmailOutbox(
+                kind="bulk_quotation",
+                bulk_job_id=job_id,
+                to_email=to_email,
+                subject=EmailService.quotation_subject(email["quotation_number"], company_name),
+                payload=email,
+                status="pending",
+                attempts=0,
+                max_attempts=settings.email_max_attempts,
+                next_attempt_at=self._schedule.slot(to_email, now),
+            ))
+
+        session.add_all(messages)
+        await session.commit()
+        email_outbox.notify()
+        job = BulkEmailJob(job_id, [self._result(m) for m in messages], created_at=now, last_change=now)
+        logger.info(f"Bulk email {job_id}: queued {job.total - job.failed} messages, {job.failed} recipients failed")
+        return job
+
+    @staticmethod
+    def _result(message: EmailOutbox) -> RecipientResult:
+        return RecipientResult(
+            to_email=message.to_email,
+            quote_id=message.payload.get("quote_id"),
+            status=message.status,
+            error=message.last_error if message.status != "sent" else None,
+        )
+
+    async def get_job(self, session: AsyncSession, job_id: str) -> Optional[BulkEmailJob]:
+        result = await session.execute(
+            select(EmailOutbox).where(EmailOutbox.bulk_job_id == job_id).order_by(EmailOutbox.id)
+        )
+        messages = list(result.scalars().all())
+        if not messages:
+            return None
+        return BulkEmailJob(
+            job_id,
+            [self._result(m) for m in messages],
+            created_at=min(m.created_at for m in messages),
+            last_change=max(m.updated_at for m in messages),
+        )
+
+
+bulk_mailer = BulkMailer()
@@ -0,0 +1,177 @@
+"""
+Response compression for clients that reach the API without the bundled nginx
+(which gzips on its own), e.g. directly over the LAN or VPN or through another proxy.
+
+`CompressionMiddleware` compresses responses of at least `compression_min_size`
+bytes with brotli (when the `brotli` package is installed) or gzip, whichever the
+client accepts first in `compression_encodings`. Bodies are compressed chunk by
+chunk as the app sends them, and each chunk of a streamed response is flushed
+(a sync flush for gzip) so the client gets it right away instead of when the
+stream ends; large lists are never held twice in memory.
+
+Skipped: formats that are compressed already (PDF, ZIP, images, ...), responses
+that already have a Content-Encoding, partial content (206), and X-Accel-Redirect
+responses whose body nginx sends itself. Compressed responses get a weak ETag, as
+their bytes differ from the identity encoding; conditional requests in this app
+compare ETags weakly, so 304s keep working.
+"""
+import zlib
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is used instead
+    brotli = None
+
+# Content types not worth compressing again
+INCOMPRESSIBLE_TYPES = (
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/octet-stream",
+    "image/",
+    "audio/",
+    "video/",
+    "font/woff",
+)
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str], preferred: List[str]) -> Optional[str]:
+    """First encoding of `preferred` that we support and the client accepts"""
+    if not accept_encoding:
+        return None
+    accepted = _parse_accept_encoding(accept_encoding)
+    for coding in preferred:
+        if coding == "br" and brotli is None:
+            continue
+        if coding not in ("br", "gzip"):
+            continue
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > 0:
+            return coding
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.compression_brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits=31: gzip container
+            self._zlib = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so everything sent so far can be decoded"""
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compress the last chunk and end the stream"""
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), settings.compression_encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self.app, encoding, send)(scope, receive)
+
+
+class _CompressedResponder:
+    """Holds back the response start until the first body chunk shows whether to compress"""
+
+    def __init__(self, app: ASGIApp, encoding: str, send: Send):
+        self.app = app
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive) -> None:
+        await self.app(scope, receive, self.send_wrapper)
+
+    def _should_compress(self, headers: Headers) -> bool:
+        if self.start["status"] in (204, 206, 304) or self.start["status"] < 200:
+            return False
+        if "content-encoding" in headers or "x-accel-redirect" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return not content_type.startswith(INCOMPRESSIBLE_TYPES)
+
+    async def send_wrapper(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = not self._should_compress(Headers(raw=message.get("headers", [])))
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body and len(body) < settings.compression_min_size:
+                # Small single-chunk response: not worth the CPU or the extra headers
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            headers = MutableHeaders(raw=self.start.setdefault("headers", []))
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            self.compressor = _Compressor(self.encoding)
+            if more_body:
+                data = self.compressor.compress(body)
+                del headers["Content-Length"]
+            else:
+                data = self.compressor.finish(body)
+                headers["Content-Length"] = str(len(data))
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        data = self.compressor.compress(body) if more_body else self.compressor.finish(body)
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
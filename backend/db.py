@@ -1,12 +1,173 @@
-from typing import AsyncGenerator
+import logging
+import time
+from typing import AsyncGenerator, Dict, Optional
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import settings
 
-engine = create_async_engine(str(settings.database_url), echo=False, future=True)
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Counters for connection checkouts; the gauges come from the pool itself"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection"""
+
+    def connect(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            pool_metrics.record(time.perf_counter() - start, timed_out)
+
+
+def _create_engine(url: str, **kwargs):
+    return create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        # Fail fast when the pool is exhausted; the request gets a 503 instead of hanging
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            # Prepared statements cached per connection by the asyncpg dialect
+            "prepared_statement_cache_size": settings.db_statement_cache_size,
+            # Backstop for queries nobody waits for anymore (see load_shedding.py)
+            "server_settings": {"statement_timeout": str(int(settings.db_statement_timeout * 1000))},
+        },
+        **kwargs,
+    )
+
+
+engine = _create_engine(str(settings.database_url), poolclass=InstrumentedPool)
 AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+# Read-only endpoints use the replica when one is configured, so list, dashboard and
+# PDF loads do not take primary connections away from quote saves
+replica_engine = _create_engine(str(settings.database_replica_url)) if settings.database_replica_url else None
+ReadSessionLocal = (
+    async_sessionmaker(replica_engine, expire_on_commit=False, class_=AsyncSession, info={"read_only": True})
+    if replica_engine is not None
+    else AsyncSessionLocal
+)
 Base = declarative_base()
 
+# Set on responses to writes; while it is fresh the client's reads go to the primary,
+# so it sees its own changes even if the replica lags behind
+LAST_WRITE_COOKIE = "last_write"
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+def wrote_recently(request: Request, seconds: Optional[float] = None) -> bool:
+    """Whether the client's last write (the last-write cookie) is under `seconds` old"""
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - last_write < (settings.read_your_writes_seconds if seconds is None else seconds)
+
+
+def read_sessionmaker(request: Request) -> async_sessionmaker:
+    """Session factory for the request's reads: the replica, or the primary right after the client wrote"""
+    if replica_engine is None or wrote_recently(request):
+        return AsyncSessionLocal
+    return ReadSessionLocal
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Session for handlers that only read; never commit through it"""
+    async with read_sessionmaker(request)() as session:
+        yield session
+
+
+class ReadYourWritesMiddleware:
+    """Marks clients that just wrote (a successful non-GET request) with the last-write cookie"""
+
+    def __init__(self, app, max_age: Optional[float] = None):
+        self.app = app
+        self.max_age = settings.read_your_writes_seconds if max_age is None else max_age
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                max_age = max(int(self.max_age + 0.999), 1)
+                cookie = f"{LAST_WRITE_COOKIE}={time.time():.3f}; Max-Age={max_age}; Path=/api; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def pool_status() -> Dict[str, object]:
+    pool = engine.pool
+    checkouts = pool_metrics.checkouts + pool_metrics.timeouts
+    replica: Optional[Dict[str, int]] = None
+    if replica_engine is not None:
+        replica = {
+            "pool_size": replica_engine.pool.size(),
+            "checked_out": replica_engine.pool.checkedout(),
+            "checked_in": replica_engine.pool.checkedin(),
+            "overflow": max(replica_engine.pool.overflow(), 0),
+        }
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": settings.db_max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": pool_metrics.checkouts,
+        "timeouts": pool_metrics.timeouts,
+        "wait_ms_avg": round(pool_metrics.wait_seconds_total / checkouts * 1000, 3) if checkouts else 0.0,
+        "wait_ms_max": round(pool_metrics.wait_seconds_max * 1000, 3),
+        "pool_timeout_seconds": settings.db_pool_timeout,
+        "statement_cache_size": settings.db_statement_cache_size,
+        "replica": replica,
+    }
+
+
+async def pool_timeout_handler(request: Request, error: exc.TimeoutError) -> JSONResponse:
+    """Pool exhausted for `db_pool_timeout` seconds: tell the client to retry shortly"""
+    logger.warning(f"Database pool exhausted on {request.method} {request.url.path}: {error}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
@@ -0,0 +1,210 @@
+"""
+Persistent outbox for outgoing emails.
+
+Requests only insert a row into `email_outbox`; background workers claim due rows
+with `SELECT ... FOR UPDATE SKIP LOCKED` (so several workers, or several API
+processes, never pick the same message), render the attachment, send, and on
+failure reschedule the message with exponential backoff until `max_attempts`.
+Bulk mailings (bulk_email.py) are queued here too, one row per recipient.
+
+A claimed row is marked `sending` and the claiming transaction commits right away,
+so no row lock is held while talking to SMTP. Rows left in `sending` by a worker
+that died are claimed again once `email_outbox_lock_timeout` has passed.
+
+`locked_at` doubles as the claim token: a worker renews it just before sending and
+writes the outcome only while the row still carries its token (compare-and-set).
+A worker whose claim expired and was taken over skips the message instead of
+sending it a second time or overwriting the new owner's result.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from db import AsyncSessionLocal
+from email_service import EmailService, email_service
+from models import EmailOutbox
+from quote_documents import quote_attachment
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def backoff_delay(attempts: int) -> float:
+    """Seconds to wait before the next attempt: exponential, capped, with jitter"""
+    delay = min(settings.email_retry_base_seconds * (2 ** max(attempts - 1, 0)), settings.email_retry_max_seconds)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class EmailOutboxWorkers:
+    def __init__(self):
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    async def enqueue_quotation(self, session: AsyncSession, email: Dict[str, Any]) -> EmailOutbox:
+        """
+        Store a quotation email for delivery; `email` holds the keyword arguments of
+        EmailService.deliver_quotation_email. Commits the session.
+        """
+        message = EmailOutbox(
+            kind="quotation",
+            to_email=email["to_email"],
+            subject=EmailService.quotation_subject(email["quotation_number"], email.get("company_name", "")),
+            payload=email,
+            max_attempts=settings.email_max_attempts,
+        )
+        session.add(message)
+        await session.commit()
+        await session.refresh(message)
+        self.notify()
+        return message
+
+    def notify(self) -> None:
+        """Wake idle workers so a new message does not wait for the next poll"""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._tasks or settings.email_outbox_workers <= 0:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run(f"outbox-{i}"), name=f"outbox-{i}")
+            for i in range(settings.email_outbox_workers)
+        ]
+        logger.info(f"Started {len(self._tasks)} email outbox workers")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, name: str) -> None:
+        while True:
+            try:
+                processed = await self.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker {name} failed: {e}", exc_info=True)
+                processed = 0
+            if processed:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.email_outbox_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def claim(self, limit: int) -> List[EmailOutbox]:
+        now = _now()
+        stale = now - timedelta(seconds=settings.email_outbox_lock_timeout)
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                result = await session.execute(
+                    select(EmailOutbox)
+                    .where(or_(
+                        and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+                        and_(EmailOutbox.status == "sending", EmailOutbox.locked_at < stale),
+                    ))
+                    .order_by(EmailOutbox.next_attempt_at)
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                )
+                messages = list(result.scalars().all())
+                for message in messages:
+                    message.status = "sending"
+                    message.locked_at = now
+                    message.attempts += 1
+        return messages
+
+    async def process_batch(self) -> int:
+        messages = await self.claim(settings.email_outbox_batch_size)
+        for message in messages:
+            await self._deliver(message)
+        return len(messages)
+
+    async def _compare_and_set(self, message: EmailOutbox, **values: Any) -> bool:
+        """Update the row if this worker's claim still holds; False if it was reclaimed"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                update(EmailOutbox)
+                .where(
+                    EmailOutbox.id == message.id,
+                    EmailOutbox.status == "sending",
+                    EmailOutbox.locked_at == message.locked_at,
+                )
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        return result.rowcount == 1
+
+    async def _deliver(self, message: EmailOutbox) -> None:
+        # The rest of the batch may have taken long enough for the claim to expire
+        renewed_at = _now()
+        if not await self._compare_and_set(message, locked_at=renewed_at):
+            logger.warning(f"Email {message.id} was claimed by another worker, skipping it")
+            return
+        message.locked_at = renewed_at
+
+        error: Optional[str] = None
+        try:
+            if message.kind == "quotation":
+                await email_service.deliver_quotation_email(**message.payload)
+            elif message.kind == "bulk_quotation":
+                # Stored quote: attach its PDF from the render cache (rendered once per version)
+                email = dict(message.payload)
+                attachment = await quote_attachment(email.pop("quote_id"))
+                await email_service.deliver_quotation_email(**email, attachment=attachment)
+            else:
+                raise ValueError(f"Unknown outbox message kind '{message.kind}'")
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            email_service.log_smtp_hints(error)
+
+        if error is None:
+            values = {"status": "sent", "sent_at": _now(), "last_error": None}
+        elif message.attempts >= message.max_attempts:
+            values = {"status": "failed", "last_error": error}
+        else:
+            delay = backoff_delay(message.attempts)
+            values = {"status": "pending", "last_error": error, "next_attempt_at": _now() + timedelta(seconds=delay)}
+        if not await self._compare_and_set(message, locked_at=None, **values):
+            logger.warning(f"Email {message.id} was claimed by another worker while sending; its result is dropped")
+            return
+        if error is None:
+            return
+        if values["status"] == "failed":
+            logger.error(f"Email {message.id} to {message.to_email} failed permanently after {message.attempts} attempts: {error}")
+        else:
+            logger.warning(f"Email {message.id} to {message.to_email} failed (attempt {message.attempts}), retrying in {delay:.0f}s: {error}")
+
+    async def status_counts(self, session: AsyncSession) -> Dict[str, int]:
+        result = await session.execute(
+            select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+        )
+        counts = {"pending": 0, "sending": 0, "sent": 0, "failed": 0}
+        counts.update({status: count for status, count in result.all()})
+        return counts
+
+    async def retry(self, session: AsyncSession, message: EmailOutbox) -> EmailOutbox:
+        """Put a failed message back in the queue with a fresh attempt budget"""
+        message.status = "pending"
+        message.attempts = 0
+        message.next_attempt_at = _now()
+        await session.commit()
+        await session.refresh(message)
+        self.notify()
+        return message
+
+
+email_outbox = EmailOutboxWorkers()
@@ -0,0 +1,64 @@
+"""
+Fast JSON encoding for large list responses.
+
+By default FastAPI loads ORM objects, validates every row through the response model
+(QuoteRead, ProductRead) and encodes the result with the standard json module. For
+lists of thousands of quotes that is most of the request's CPU time.
+
+With `fast_list_serialization` enabled the list endpoints select plain columns with
+Core, turn the rows into dicts (`rows_to_dicts`) and return a `FastJSONResponse`,
+which encodes them with orjson when it is installed. The output is the same JSON the
+response models produce: Decimal amounts become floats and UTC datetimes end in "Z".
+benchmarks/bench_serialization.py compares both paths.
+"""
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List
+
+from fastapi.responses import JSONResponse
+from sqlalchemy.engine import Result
+
+try:
+    import orjson
+except ImportError:  # optional; the standard json module is used instead
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        # Same form as Pydantic: "Z" for UTC, the offset otherwise
+        text = value.isoformat()
+        return text[:-6] + "Z" if value.utcoffset() == timezone.utc.utcoffset(None) else text
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson; also takes Decimal and datetime values"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(result: Result, floats: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Rows of a Core select() as dicts keyed by column label. Columns in `floats`
+    are converted from Decimal to float (None becomes 0.0), as the response models'
+    field serializers do.
+    """
+    rows = [dict(row) for row in result.mappings()]
+    floats = tuple(floats)
+    if floats:
+        for row in rows:
+            for key in floats:
+                value = row[key]
+                row[key] = float(value) if value is not None else 0.0
+    return rows
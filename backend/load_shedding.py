@@ -0,0 +1,171 @@
+"""
+Per-route concurrency limits and request deadlines, so a burst of heavy requests
+(PDF emails, ZIP exports) can not starve cheap lookups on the same worker.
+
+`route_concurrency_limits` maps "METHOD /path/{param}" to [max concurrent, max
+queued] per worker. A request over the cap waits in the route's queue for up to
+`route_queue_timeout` seconds; when the queue is full, or the wait runs out, it is
+answered right away with 503 and Retry-After. A slot is held until the response
+has been sent completely, so streamed exports count for their whole duration.
+Routes without a rule are not limited.
+
+`request_deadline_seconds` bounds the time from admission until a response starts
+(time spent queued is bounded by the queue timeout instead). Past it the
+handler is cancelled, which also cancels its running query (asyncpg asks the
+server to cancel it), and the client gets 504. Streamed bodies are not cut off
+once they started. `db_statement_timeout` (db.py) is the server-side backstop for
+queries whose client went away.
+"""
+import asyncio
+import logging
+import re
+from typing import Dict, List, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RouteLimit:
+    def __init__(self, rule: str, max_concurrent: int, max_queued: int):
+        method, _, path = rule.strip().partition(" ")
+        if not path:
+            method, path = "*", method
+        self.rule = rule
+        self.method = method.upper()
+        # "{param}" matches one path segment
+        self.pattern = re.compile(re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(path.rstrip("/") or "/")) + "/?")
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def matches(self, method: str, path: str) -> bool:
+        return self.method in ("*", method) and self.pattern.fullmatch(path) is not None
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in the queue if there is room; False means shed the request"""
+        if self._semaphore.locked():
+            if self.queued >= self.max_queued:
+                self.rejected += 1
+                return False
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=settings.route_queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+            finally:
+                self.queued -= 1
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+class LoadShedder:
+    def __init__(self):
+        self._limits: Optional[List[RouteLimit]] = None
+        self.deadline_exceeded = 0
+
+    @property
+    def limits(self) -> List[RouteLimit]:
+        if self._limits is None:
+            self._limits = [
+                RouteLimit(rule, *values) for rule, values in settings.route_concurrency_limits.items()
+            ]
+        return self._limits
+
+    def reload(self) -> None:
+        """Re-read `route_concurrency_limits` (benchmarks and tests)"""
+        self._limits = None
+
+    def limit_for(self, method: str, path: str) -> Optional[RouteLimit]:
+        return next((limit for limit in self.limits if limit.matches(method, path)), None)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "queue_timeout_seconds": settings.route_queue_timeout,
+            "request_deadline_seconds": settings.request_deadline_seconds,
+            "deadline_exceeded": self.deadline_exceeded,
+            "routes": {limit.rule: limit.snapshot() for limit in self.limits},
+        }
+
+
+load_shedder = LoadShedder()
+
+
+class LoadSheddingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = load_shedder.limit_for(scope["method"], scope["path"])
+        if limit is not None and not await limit.acquire():
+            logger.info(f"Shedding {scope['method']} {scope['path']}: {limit.active} running, {limit.queued} queued")
+            response = JSONResponse(
+                {"detail": "Server busy, please retry shortly"},
+                status_code=503,
+                headers={"Retry-After": str(settings.load_shed_retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self._call_with_deadline(scope, receive, send)
+        finally:
+            if limit is not None:
+                limit.release()
+
+    async def _call_with_deadline(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if settings.request_deadline_seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                # The response is on its way; let a streamed body take as long as it needs
+                deadline.reschedule(None)
+            await send(message)
+
+        try:
+            async with asyncio.timeout(settings.request_deadline_seconds) as deadline:
+                await self.app(scope, receive, send_wrapper)
+        except TimeoutError:
+            if not deadline.expired():
+                raise  # the app's own timeout, not the deadline
+            load_shedder.deadline_exceeded += 1
+            logger.warning(
+                f"{scope['method']} {scope['path']} cancelled after the {settings.request_deadline_seconds:g}s deadline"
+            )
+            if not started:
+                response = JSONResponse({"detail": "Request deadline exceeded"}, status_code=504)
+                await response(scope, receive, send)
@@ -0,0 +1,195 @@
+"""
+Cache of company logo images used when rendering quotation PDFs.
+
+Remote logos are downloaded once per URL and kept as base64 data URIs so the
+renderer never blocks on the network. Entries are revalidated in the background
+with the ETag returned by the server once they are older than the configured TTL.
+
+Renders that need a logo which is not cached yet all wait for the same download.
+A URL whose download failed is not tried again for `logo_failure_ttl_seconds`, so
+a dead logo server costs one fetch timeout rather than one per render. At most
+`logo_cache_max_entries` logos are kept, least recently used ones are dropped first.
+"""
+import asyncio
+import base64
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Optional
+
+from blob_store import blob_store, pil_image
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LogoCacheEntry:
+    url: str
+    data_uri: str
+    etag: Optional[str]
+    fetched_at: float
+
+
+class LogoCache:
+    def __init__(self):
+        self._entries: OrderedDict[str, LogoCacheEntry] = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._failed_at: Dict[str, float] = {}  # url -> when its last download failed
+
+    @staticmethod
+    def is_remote(url: Optional[str]) -> bool:
+        return bool(url) and (url.startswith("http://") or url.startswith("https://"))
+
+    def get(self, url: str) -> Optional[str]:
+        """Return the cached data URI for a logo URL without touching the network"""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        self._entries.move_to_end(url)
+        return entry.data_uri
+
+    def _store(self, entry: LogoCacheEntry) -> None:
+        self._entries[entry.url] = entry
+        self._entries.move_to_end(entry.url)
+        while len(self._entries) > max(settings.logo_cache_max_entries, 1):
+            self._entries.popitem(last=False)
+
+    def _recently_failed(self, url: str) -> bool:
+        failed_at = self._failed_at.get(url)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at < settings.logo_failure_ttl_seconds:
+            return True
+        del self._failed_at[url]
+        return False
+
+    async def ensure(self, url: Optional[str]) -> Optional[str]:
+        """
+        Return the data URI for a remote or blob store logo, downloading it on first use.
+        Stale entries are served immediately and refreshed in the background.
+        """
+        if blob_store.is_blob_url(url):
+            return await self._ensure_blob(url)
+        if not self.is_remote(url):
+            return None
+        entry = self._entries.get(url)
+        if entry is None:
+            task = self.schedule_refresh(url)
+            if task is not None:
+                # Shielded: a render that gives up must not cancel the download others wait for
+                await asyncio.shield(task)
+            return self.get(url)
+        self._entries.move_to_end(url)
+        if time.monotonic() - entry.fetched_at > settings.logo_cache_ttl_seconds:
+            self.schedule_refresh(url)
+        return entry.data_uri
+
+    async def _ensure_blob(self, url: str) -> Optional[str]:
+        # Blob URLs never change content, so entries are never refreshed
+        data_uri = self.get(url)
+        if data_uri is not None:
+            return data_uri
+        max_size = (settings.logo_max_width_px, settings.logo_max_height_px) if settings.logo_resize_enabled else None
+        data_uri = await blob_store.data_uri(url, max_size)
+        if data_uri:
+            self._store(LogoCacheEntry(url=url, data_uri=data_uri, etag=None, fetched_at=time.monotonic()))
+        return data_uri
+
+    def schedule_refresh(self, url: Optional[str]) -> Optional[asyncio.Task]:
+        """
+        Start a background refresh for a URL unless one is already running, and return it.
+        Returns None for URLs that are not remote or failed to download recently.
+        """
+        if not self.is_remote(url):
+            return None
+        task = self._refreshing.get(url)
+        if task and not task.done():
+            return task
+        if self._recently_failed(url):
+            return None
+        try:
+            task = asyncio.get_running_loop().create_task(self.refresh(url))
+        except RuntimeError:
+            # No running loop (e.g. called from a sync context); the next render fetches it
+            return None
+        self._refreshing[url] = task
+        return task
+
+    async def refresh(self, url: str) -> None:
+        entry = self._entries.get(url)
+        try:
+            fetched = await asyncio.to_thread(self._fetch, url, entry.etag if entry else None)
+        except Exception as e:
+            logger.warning(f"Failed to refresh logo from {url}: {e}")
+            self._failed_at[url] = time.monotonic()
+            # Expired failures of other URLs are only dropped here, so the dict stays small
+            self._failed_at = {
+                failed_url: failed_at for failed_url, failed_at in self._failed_at.items()
+                if time.monotonic() - failed_at < settings.logo_failure_ttl_seconds
+            }
+        else:
+            self._failed_at.pop(url, None)
+            if fetched is not None:
+                self._store(fetched)
+            elif url in self._entries:
+                self._entries[url].fetched_at = time.monotonic()
+        finally:
+            self._refreshing.pop(url, None)
+
+    def invalidate(self, url: Optional[str] = None) -> None:
+        """Drop a single cached logo, or the whole cache when no URL is given"""
+        if url is None:
+            self._entries.clear()
+            self._failed_at.clear()
+        else:
+            self._entries.pop(url, None)
+            self._failed_at.pop(url, None)
+
+    def _fetch(self, url: str, etag: Optional[str]) -> Optional[LogoCacheEntry]:
+        """Download a logo; None when the server says the cached one is still current"""
+        import requests  # only needed for remote logos; kept off the startup path
+
+        headers = {"If-None-Match": etag} if etag else {}
+        response = requests.get(url, timeout=settings.logo_fetch_timeout, allow_redirects=True, headers=headers)
+
+        if response.status_code == 304 and etag:
+            return None
+        if response.status_code != 200:
+            raise ValueError(f"HTTP {response.status_code}")
+
+        content_type = response.headers.get("Content-Type", "image/png")
+        content, content_type = self._resize(response.content, content_type)
+        img_base64 = base64.b64encode(content).decode("utf-8")
+        logger.info(f"Logo downloaded and cached as base64: {len(img_base64)} bytes")
+        return LogoCacheEntry(
+            url=url,
+            data_uri=f"data:{content_type};base64,{img_base64}",
+            etag=response.headers.get("ETag"),
+            fetched_at=time.monotonic(),
+        )
+
+    @staticmethod
+    def _resize(content: bytes, content_type: str) -> tuple[bytes, str]:
+        """Shrink oversized logos to the print bounding box so every PDF embeds fewer bytes"""
+        Image = pil_image()  # Pillow is optional, logos are then embedded unresized
+        if Image is None or not settings.logo_resize_enabled or "svg" in content_type:
+            return content, content_type
+        try:
+            with Image.open(BytesIO(content)) as img:
+                max_size = (settings.logo_max_width_px, settings.logo_max_height_px)
+                if img.width <= max_size[0] and img.height <= max_size[1]:
+                    return content, content_type
+                img.thumbnail(max_size)
+                out = BytesIO()
+                img.save(out, format="PNG", optimize=True)
+                return out.getvalue(), "image/png"
+        except Exception as e:
+            logger.warning(f"Failed to resize logo, embedding original: {e}")
+            return content, content_type
+
+
+# Global logo cache instance
+logo_cache = LogoCache()
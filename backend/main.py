@@ -1,18 +1,44 @@
 from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from config import settings
-from db import engine
-from models import Base
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from db import ReadYourWritesMiddleware, engine, pool_timeout_handler, replica_engine
+from compression import CompressionMiddleware
+from load_shedding import LoadSheddingMiddleware
+from request_profiler import ProfilingMiddleware
+from pdf_engines import shutdown_engines
+from passwords import shutdown_password_pool
+from email_outbox import email_outbox
+from email_service import email_service
+from response_cache import response_cache
+from settings_cache import company_settings_cache
 from routers import company_settings as company_settings_router
 from routers import customers as customers_router
 from routers import products as products_router
 from routers import quotes as quotes_router
+from routers import quote_documents as quote_documents_router
 from routers import users as users_router
 from routers import countries as countries_router
+from routers import reference_data as reference_data_router
 from routers import email as email_router
+from routers import blobs as blobs_router
+from routers import metrics as metrics_router
+from routers import profiles as profiles_router
 
 app = FastAPI(title="Local Test API", version="0.1.0")
 
+# A request that cannot get a database connection within DB_POOL_TIMEOUT gets a 503
+app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+
+# Clients that just wrote keep reading from the primary for a moment when there is a
+# read replica, and get no cached or shared in-flight responses (see response_cache.py)
+if response_cache.read_your_writes_seconds():
+    app.add_middleware(ReadYourWritesMiddleware, max_age=response_cache.read_your_writes_seconds())
+
+# Cap heavy routes per worker and cancel requests past their deadline; inside CORS,
+# so browsers can read the 503s
+app.add_middleware(LoadSheddingMiddleware)
+
 # CORS from env - Allow specific origins for network access
 app.add_middleware(
     CORSMiddleware,
@@ -28,12 +54,34 @@ app.add_middleware(
     allow_credentials=True,  # Can be True with specific origins
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Export-Job-Id", "Retry-After", "X-Profile-Id"],
 )
 
+# Compress large responses for clients that do not go through nginx
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware)
+
+# Outermost, so a profile covers the whole request including the middleware above
+if settings.request_profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
 @app.on_event("startup")
 async def on_startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # The schema and data are migrated by `python migrate.py`, run once per deploy
+    email_outbox.start()
+    company_settings_cache.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await company_settings_cache.stop()
+    await email_outbox.stop()
+    await email_service.close()
+    await response_cache.close()
+    shutdown_engines()
+    shutdown_password_pool()
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
 # Root-level test routes
 @app.get("/")
@@ -66,9 +114,14 @@ app.include_router(company_settings_router.router)
 app.include_router(customers_router.router)
 app.include_router(products_router.router)
 app.include_router(quotes_router.router)
+app.include_router(quote_documents_router.router)
 app.include_router(users_router.router)
 app.include_router(countries_router.router)
+app.include_router(reference_data_router.router)
 app.include_router(email_router.router)
+app.include_router(blobs_router.router)
+app.include_router(metrics_router.router)
+app.include_router(profiles_router.router)
 
 # Silence favicon 404s
 @app.get("/favicon.ico", include_in_schema=False)
@@ -0,0 +1,89 @@
+"""
+Bring the database schema up to date. Run once per deploy, before the API workers
+start; the workers themselves never create or alter tables.
+
+    python migrate.py           # upgrade to the latest revision
+    python migrate.py --check   # exit 1 if the database is behind
+
+Databases created by the old `create_all` startup have no `alembic_version`; they
+are stamped at the initial revision (the original tables) and then upgraded, so
+later revisions add what they are missing.
+
+After the schema, images still stored inline as data URIs are moved to the blob
+store (`blob_store_dir` must be the directory the API workers serve).
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from blob_store import migrate_inline_images
+from config import settings
+
+logger = logging.getLogger("migrate")
+
+BASELINE_REVISION = "0001"
+ALEMBIC_INI = Path(__file__).resolve().parent / "alembic.ini"
+
+
+def _schema_state(connection):
+    tables = set(inspect(connection).get_table_names())
+    return tables, MigrationContext.configure(connection).get_current_revision()
+
+
+async def _current_state(url: str):
+    engine = create_async_engine(url, poolclass=NullPool)
+    try:
+        async with engine.connect() as connection:
+            return await connection.run_sync(_schema_state)
+    finally:
+        await engine.dispose()
+
+
+async def _migrate_data(url: str) -> None:
+    engine = create_async_engine(url, poolclass=NullPool)
+    try:
+        await migrate_inline_images(async_sessionmaker(engine, expire_on_commit=False))
+    finally:
+        await engine.dispose()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="only report whether migrations are pending")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    url = str(settings.database_url)
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    config.attributes["url"] = url
+    head = ScriptDirectory.from_config(config).get_current_head()
+
+    tables, revision = asyncio.run(_current_state(url))
+    if args.check:
+        if revision != head:
+            logger.error(f"Database is at revision {revision or 'none'}, latest is {head}; run `python migrate.py`")
+            return 1
+        logger.info(f"Database is at the latest revision ({head})")
+        return 0
+
+    if revision is None and "quotes" in tables:
+        logger.info(f"Existing schema without migration history; stamping it at {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+    asyncio.run(_migrate_data(url))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""initial schema
+
+Tables as created by the original `Base.metadata.create_all` startup, before the
+email outbox and migrations were introduced.
+Databases created that way are stamped at this revision by migrate.py.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 08:10:41.967557
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('company_settings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_name', sa.String(length=200), nullable=False),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('address_line1', sa.String(length=255), nullable=True),
+    sa.Column('address_line2', sa.String(length=255), nullable=True),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('postal_code', sa.String(length=40), nullable=True),
+    sa.Column('country', sa.String(length=120), nullable=True),
+    sa.Column('phone', sa.String(length=100), nullable=True),
+    sa.Column('email', sa.String(length=200), nullable=True),
+    sa.Column('vat_number', sa.String(length=100), nullable=True),
+    sa.Column('website', sa.String(length=200), nullable=True),
+    sa.Column('logo_url', sa.Text(), nullable=True),
+    sa.Column('bank_name_branch', sa.String(length=255), nullable=True),
+    sa.Column('bank_address_line1', sa.String(length=255), nullable=True),
+    sa.Column('bank_address_line2', sa.String(length=255), nullable=True),
+    sa.Column('account_number', sa.String(length=120), nullable=True),
+    sa.Column('iban', sa.String(length=120), nullable=True),
+    sa.Column('bic_swift', sa.String(length=120), nullable=True),
+    sa.Column('default_vat_rate', sa.Numeric(precision=5, scale=2), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('customers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('email', sa.String(length=200), nullable=True),
+    sa.Column('phone', sa.String(length=100), nullable=True),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('city', sa.String(length=100), nullable=True),
+    sa.Column('country', sa.String(length=100), nullable=True),
+    sa.Column('contact_person', sa.String(length=200), nullable=True),
+    sa.Column('vat_number', sa.String(length=100), nullable=True),
+    sa.Column('source', sa.String(length=100), nullable=True),
+    sa.Column('opportunity', sa.String(length=200), nullable=True),
+    sa.Column('opportunity_address', sa.Text(), nullable=True),
+    sa.Column('archived', sa.Boolean(), server_default='false', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_customers_name'), 'customers', ['name'], unique=False)
+    op.create_table('products',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('sku', sa.String(length=100), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('unit_price', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('currency', sa.String(length=8), nullable=True),
+    sa.Column('category', sa.String(length=100), nullable=True),
+    sa.Column('vat_rate', sa.Numeric(precision=5, scale=2), nullable=False),
+    sa.Column('active', sa.Boolean(), server_default='true', nullable=False),
+    sa.Column('available_for_quotations', sa.Boolean(), server_default='true', nullable=False),
+    sa.Column('archived', sa.Boolean(), server_default='false', nullable=False),
+    sa.Column('deleted', sa.Boolean(), server_default='false', nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_products_name'), 'products', ['name'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('full_name', sa.String(length=200), nullable=False),
+    sa.Column('email', sa.String(length=200), nullable=False),
+    sa.Column('role', sa.String(length=50), nullable=False),
+    sa.Column('profile_picture_url', sa.Text(), nullable=True),
+    sa.Column('password_hash', sa.String(length=255), nullable=True),
+    sa.Column('is_active', sa.Boolean(), server_default='true', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_full_name'), 'users', ['full_name'], unique=False)
+    op.create_table('quotes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=30), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('quotation_number', sa.String(length=30), nullable=True),
+    sa.Column('valid_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('terms_and_conditions', sa.Text(), nullable=True),
+    sa.Column('discount_type', sa.String(length=20), nullable=False),
+    sa.Column('discount_value', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('subtotal', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('total_vat', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('total', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('deleted', sa.Boolean(), server_default='false', nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('is_archived', sa.Boolean(), server_default='false', nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_by', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='RESTRICT'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('quote_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('quote_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('quantity', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('unit_price', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('vat_rate', sa.Numeric(precision=5, scale=2), nullable=False),
+    sa.Column('line_total', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('line_total_vat', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['quote_id'], ['quotes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('quote_items')
+    op.drop_table('quotes')
+    op.drop_index(op.f('ix_users_full_name'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_products_name'), table_name='products')
+    op.drop_table('products')
+    op.drop_index(op.f('ix_customers_name'), table_name='customers')
+    op.drop_table('customers')
+    op.drop_table('company_settings')
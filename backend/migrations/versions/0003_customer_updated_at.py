@@ -0,0 +1,29 @@
+"""customer updated_at
+
+Quote PDFs print the customer's details, so the render cache key includes when the
+customer was last changed (quote_documents.py).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 14:31:05.602718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('customers', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('customers', 'updated_at')
@@ -0,0 +1,31 @@
+"""email outbox bulk job
+
+Bulk quotation mailings are queued in the outbox, one row per recipient tagged
+with the job id (bulk_email.py).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 15:12:47.090331
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('email_outbox', sa.Column('bulk_job_id', sa.String(length=32), nullable=True))
+    op.create_index(op.f('ix_email_outbox_bulk_job_id'), 'email_outbox', ['bulk_job_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_email_outbox_bulk_job_id'), table_name='email_outbox')
+    op.drop_column('email_outbox', 'bulk_job_id')
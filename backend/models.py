@@ -2,7 +2,7 @@ from __future__ import annotations
 from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import String, Text, Numeric, Boolean, DateTime, func, ForeignKey
+from sqlalchemy import String, Text, Numeric, Boolean, DateTime, Integer, JSON, func, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from db import Base
 
@@ -27,6 +27,8 @@ class Customer(Base):
 
     archived: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # Part of the quote PDF cache key (name, contact and address are printed on quotes)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     quotes: Mapped[List["Quote"]] = relationship(back_populates="customer", lazy="selectin")
 
@@ -158,4 +160,28 @@ class CompanySettings(Base):
     bic_swift: Mapped[Optional[str]] = mapped_column(String(120), nullable=True)
     default_vat_rate: Mapped[Decimal] = mapped_column(Numeric(5, 2), default=4)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# Outgoing emails, delivered by background workers (see email_outbox.py)
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(String(30), default="quotation")  # quotation, bulk_quotation
+    bulk_job_id: Mapped[Optional[str]] = mapped_column(String(32), nullable=True, index=True)
+    to_email: Mapped[str] = mapped_column(String(200))
+    subject: Mapped[str] = mapped_column(String(300))
+    # Everything needed to build the message again on a retry (body fields, quotation data)
+    payload: Mapped[dict] = mapped_column(JSON, default=dict)
+
+    status: Mapped[str] = mapped_column(String(20), default="pending")  # pending, sending, sent, failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    max_attempts: Mapped[int] = mapped_column(Integer, default=5, server_default="5")
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    locked_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
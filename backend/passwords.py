@@ -0,0 +1,99 @@
+"""
+Password hashing.
+
+Passwords are hashed with bcrypt (passlib) at `password_bcrypt_rounds`. One hash or
+verification costs 100 ms or more of CPU, so it runs on a small bounded pool instead
+of the event loop; a burst of logins queues up there while other requests keep being
+served. bcrypt releases the GIL, so the default thread pool hashes in parallel.
+
+Hashes from before bcrypt (unsalted hex SHA-256) still verify. `verify_password`
+returns a replacement hash whenever the stored one is legacy or was made with a
+different cost, and callers store it, so users are migrated as they log in.
+
+A login for an unknown email (or a user without a password) is checked against a
+dummy hash of the same cost, so it takes as long as a wrong password and response
+times do not tell which emails are registered.
+"""
+import asyncio
+import secrets
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from config import settings
+
+_context: Optional[CryptContext] = None
+_executor: Optional[Executor] = None
+_dummy_hash: Optional[str] = None
+
+
+def _get_context() -> CryptContext:
+    # Built lazily so each process-pool worker creates its own
+    global _context
+    if _context is None:
+        _context = CryptContext(
+            schemes=["bcrypt", "hex_sha256"],
+            deprecated=["hex_sha256"],
+            bcrypt__rounds=settings.password_bcrypt_rounds,
+        )
+    return _context
+
+
+def _hash(password: str) -> str:
+    return _get_context().hash(password)
+
+
+def _verify(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    try:
+        return _get_context().verify_and_update(password, hashed)
+    except ValueError:
+        # Not a hash format we know
+        return False, None
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if settings.password_hash_pool == "process":
+            _executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                thread_name_prefix="password-hash",
+            )
+    return _executor
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password with the configured KDF"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), _hash, password)
+
+
+async def verify_password(password: str, hashed: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password against its hash. Returns (valid, new_hash); new_hash is set
+    when the password is valid and the stored hash should be replaced.
+    """
+    if not hashed:
+        await verify_dummy_password(password)
+        return False, None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), _verify, password, hashed)
+
+
+async def verify_dummy_password(password: str) -> None:
+    """Spend the time of one verification without a real hash (see module docstring)"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await hash_password(secrets.token_urlsafe(16))
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_get_executor(), _verify, password, _dummy_hash)
+
+
+def shutdown_password_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
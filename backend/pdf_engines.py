@@ -0,0 +1,379 @@
+"""
+Pluggable PDF render engines for quotations.
+
+Every engine turns the quotation payload (the same dict QuotePrint.jsx works with)
+into PDF bytes. The engine used by a deployment is chosen with the `pdf_engine`
+setting; `get_engine()` returns the shared instance.
+
+Renders are bounded by `pdf_render_timeout`. wkhtmltopdf runs in its own process
+group, which is killed on timeout. A render on a thread can not be stopped, so a
+timed-out one is abandoned and counted until it returns; once abandoned renders
+occupy every worker, the pool is retired and the next renders start on a fresh
+one instead of queueing behind them. The retired pool takes no new renders; once
+the healthy renders still queued or running on it are done, a process pool has its
+workers (the hung ones) terminated.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import signal
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from config import settings
+from logo_cache import logo_cache
+from quote_template import QUOTATION_CSS, TEMPLATES_DIR, render_quotation_html
+
+logger = logging.getLogger(__name__)
+
+
+class RenderEngine:
+    """Base class for quotation PDF renderers"""
+
+    name = "base"
+
+    async def render(self, quotation_data: Dict[str, Any]) -> bytes:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """Release pools or other resources held by the engine"""
+
+
+class RenderTimeout(Exception):
+    """A render took longer than `pdf_render_timeout`"""
+
+
+# Threads of retired pools still stuck in a render; past this many, renders are refused
+_MAX_ABANDONED_FACTOR = 4
+
+
+class _RenderPool:
+    """An executor and the renders submitted to it"""
+
+    def __init__(self, executor: Executor):
+        self.executor = executor
+        self.active = 0  # submitted renders not yet finished or abandoned
+        self.abandoned: Set[Future] = set()  # timed out but still running
+        self.retired = False
+        self.processes: List = []  # workers of a retired process pool, terminated once it drains
+
+
+class PooledRenderEngine(RenderEngine):
+    """Engines that render in-process on a bounded thread or process pool"""
+
+    def __init__(self):
+        self._pool: Optional[_RenderPool] = None
+        self.hung = 0  # abandoned renders still running, on any pool
+        self.abandoned = 0
+        self.pools_retired = 0
+        # Guards the pool and the counters; render callbacks run on pool threads
+        self._lock = threading.Lock()
+
+    def _current_pool(self) -> _RenderPool:
+        # Called with self._lock held
+        if self._pool is None:
+            if settings.pdf_render_pool == "process":
+                executor = ProcessPoolExecutor(max_workers=settings.pdf_render_workers)
+            else:
+                executor = ThreadPoolExecutor(
+                    max_workers=settings.pdf_render_workers,
+                    thread_name_prefix=f"pdf-{self.name}",
+                )
+            self._pool = _RenderPool(executor)
+        return self._pool
+
+    async def run_in_pool(self, fn: Callable[..., bytes], *args: Any) -> bytes:
+        with self._lock:
+            if self.hung >= settings.pdf_render_workers * _MAX_ABANDONED_FACTOR:
+                raise RenderTimeout(f"{self.hung} {self.name} renders are hung; not starting another")
+            pool = self._current_pool()
+            future = pool.executor.submit(fn, *args)
+            pool.active += 1
+        future.add_done_callback(lambda done: self._render_done(pool, done))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=settings.pdf_render_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(pool, future)
+            raise RenderTimeout(f"{self.name} render timed out after {settings.pdf_render_timeout}s")
+
+    def _abandon(self, pool: _RenderPool, future: Future) -> None:
+        if future.cancel():
+            return  # still queued, never started
+        with self._lock:
+            if future.done():
+                return  # finished just now; _render_done counted it
+            pool.active -= 1
+            pool.abandoned.add(future)
+            self.hung += 1
+            self.abandoned += 1
+            hung = self.hung
+            # Every worker is stuck; don't queue new renders behind them
+            retire = pool is self._pool and len(pool.abandoned) >= settings.pdf_render_workers
+            if retire:
+                self._pool = None
+                pool.retired = True
+                self.pools_retired += 1
+        logger.warning(
+            f"Abandoned a {self.name} render after {settings.pdf_render_timeout}s; "
+            f"{hung} hung, {self.abandoned} abandoned in total"
+        )
+        if retire:
+            logger.error(f"{self.name} render pool is saturated by hung renders; starting a new pool")
+            self._retire(pool)
+
+    def _render_done(self, pool: _RenderPool, future: Future) -> None:
+        # Called from the pool's thread (or the event loop for a cancelled render)
+        with self._lock:
+            if future in pool.abandoned:
+                pool.abandoned.discard(future)
+                self.hung -= 1
+            else:
+                pool.active -= 1
+            drained = pool.retired and pool.active == 0
+        if drained:
+            self._terminate(pool)
+
+    def _retire(self, pool: _RenderPool) -> None:
+        """Stop taking renders on the pool; its workers are stopped once the healthy renders finished"""
+        if isinstance(pool.executor, ProcessPoolExecutor):
+            pool.processes = list((getattr(pool.executor, "_processes", None) or {}).values())
+        pool.executor.shutdown(wait=False)
+        with self._lock:
+            drained = pool.active == 0
+        if drained:
+            self._terminate(pool)
+
+    @staticmethod
+    def _terminate(pool: _RenderPool) -> None:
+        # Worker processes can be stopped; threads have to finish on their own
+        processes, pool.processes = pool.processes, []
+        for process in processes:
+            process.terminate()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pool": settings.pdf_render_pool,
+                "workers": settings.pdf_render_workers,
+                "hung": self.hung,
+                "abandoned": self.abandoned,
+                "pools_retired": self.pools_retired,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class HTMLRenderEngine(RenderEngine):
+    """Engines that print the Jinja2 quotation template"""
+
+    inline_stylesheet = True
+
+    async def render_html(self, quotation_data: Dict[str, Any]) -> str:
+        # Make sure a remote logo is cached before rendering so the HTML never waits on the network
+        logo_url = quotation_data.get('company_settings', {}).get('logo_url', '')
+        data_uri = await logo_cache.ensure(logo_url)
+        return render_quotation_html(
+            quotation_data,
+            logo_src=data_uri or logo_url or None,
+            logo_embedded=bool(data_uri),
+            inline_stylesheet=self.inline_stylesheet,
+        )
+
+
+class WkhtmltopdfEngine(HTMLRenderEngine):
+    """Prints the HTML template with an external wkhtmltopdf process under Xvfb"""
+
+    name = "wkhtmltopdf"
+
+    def __init__(self):
+        self._binary: Optional[str] = None
+
+    def _find_binary(self) -> str:
+        if self._binary:
+            return self._binary
+        candidates = ['/usr/local/bin/wkhtmltopdf', '/usr/bin/wkhtmltopdf', shutil.which('wkhtmltopdf')]
+        binary = next((p for p in candidates if p and os.path.exists(p)), None)
+        if not binary:
+            logger.error("wkhtmltopdf binary not found in any standard location")
+            raise Exception("wkhtmltopdf binary not found. Cannot generate PDF with correct template.")
+        logger.info(f"Using wkhtmltopdf at: {binary}")
+        self._binary = binary
+        return binary
+
+    async def render(self, quotation_data: Dict[str, Any]) -> bytes:
+        html_content = await self.render_html(quotation_data)
+        return await asyncio.to_thread(self._render_sync, html_content)
+
+    def _render_sync(self, html_content: str) -> bytes:
+        wkhtmltopdf_path = self._find_binary()
+
+        with tempfile.TemporaryDirectory() as workdir:
+            html_path = os.path.join(workdir, "quote.html")
+            pdf_path = os.path.join(workdir, "quote.pdf")
+            with open(html_path, "w", encoding="utf-8") as f:
+                f.write(html_content)
+
+            # Use xvfb-run for headless rendering
+            cmd = [
+                'xvfb-run', '-a', '--server-args=-screen 0 1024x768x24', wkhtmltopdf_path,
+                '--page-size', 'A4',
+                '--margin-top', '0.75in',
+                '--margin-right', '0.75in',
+                '--margin-bottom', '0.75in',
+                '--margin-left', '0.75in',
+                '--encoding', 'UTF-8',
+                '--enable-local-file-access',
+                '--load-error-handling', 'ignore',
+                '--load-media-error-handling', 'ignore',
+                '--quiet',
+                html_path, pdf_path,
+            ]
+            logger.info(f"Running wkhtmltopdf command: {' '.join(cmd[:5])}... [html] [pdf]")
+
+            # A session of its own, so a timeout kills xvfb-run, Xvfb and wkhtmltopdf together
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True,
+            )
+            try:
+                stdout, stderr = process.communicate(timeout=settings.pdf_render_timeout)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.communicate()
+                logger.error(f"wkhtmltopdf killed after {settings.pdf_render_timeout}s")
+                raise RenderTimeout(f"wkhtmltopdf render timed out after {settings.pdf_render_timeout}s")
+
+            if process.returncode != 0:
+                error_msg = stderr or stdout or "Unknown error"
+                logger.error(f"wkhtmltopdf failed (exit code {process.returncode}): {error_msg[:500]}")
+                raise Exception(f"wkhtmltopdf failed (exit code {process.returncode}): {error_msg[:200]}")
+
+            if not os.path.exists(pdf_path):
+                raise Exception("PDF file was not created by wkhtmltopdf")
+
+            with open(pdf_path, "rb") as f:
+                pdf_bytes = f.read()
+
+        if not pdf_bytes:
+            raise Exception("PDF file is empty")
+        return pdf_bytes
+
+
+# WeasyPrint keeps its parsed stylesheet and font configuration per worker thread
+# (FontConfiguration is not safe to share between threads). In a process pool each
+# worker process ends up with its own copy as well.
+_weasyprint_state = threading.local()
+
+# wkhtmltopdf gets its page margins from the command line; WeasyPrint needs them in CSS
+_WEASYPRINT_PAGE_CSS = """
+@page { size: A4; margin: 0.75in; }
+.page { width: auto; min-height: auto; padding: 0 0 32mm 0; box-shadow: none; margin: 0; }
+"""
+
+
+def _weasyprint_render(html_content: str, base_url: str) -> bytes:
+    from weasyprint import CSS, HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    state = _weasyprint_state
+    if not hasattr(state, "stylesheets"):
+        state.font_config = FontConfiguration()
+        state.stylesheets = [
+            CSS(string=QUOTATION_CSS, font_config=state.font_config),
+            CSS(string=_WEASYPRINT_PAGE_CSS, font_config=state.font_config),
+        ]
+    return HTML(string=html_content, base_url=base_url).write_pdf(
+        stylesheets=state.stylesheets,
+        font_config=state.font_config,
+    )
+
+
+class WeasyPrintEngine(PooledRenderEngine, HTMLRenderEngine):
+    """Renders the HTML template in-process with WeasyPrint on a bounded worker pool"""
+
+    name = "weasyprint"
+    inline_stylesheet = False
+
+    async def render(self, quotation_data: Dict[str, Any]) -> bytes:
+        html_content = await self.render_html(quotation_data)
+        return await self.run_in_pool(_weasyprint_render, html_content, str(TEMPLATES_DIR))
+
+
+def _reportlab_render(quotation_data: Dict[str, Any], logo_data_uri: Optional[str]) -> bytes:
+    from pdf_service import pdf_service
+
+    return pdf_service.generate_quotation_pdf(quotation_data, logo_data_uri=logo_data_uri).getvalue()
+
+
+class ReportLabEngine(PooledRenderEngine):
+    """Pure-Python renderer drawing the QuotePrint.jsx layout directly with ReportLab"""
+
+    name = "reportlab"
+
+    async def render(self, quotation_data: Dict[str, Any]) -> bytes:
+        logo_url = quotation_data.get('company_settings', {}).get('logo_url', '')
+        logo_data_uri = await logo_cache.ensure(logo_url)
+        return await self.run_in_pool(_reportlab_render, quotation_data, logo_data_uri)
+
+
+ENGINES: Dict[str, Callable[[], RenderEngine]] = {
+    WkhtmltopdfEngine.name: WkhtmltopdfEngine,
+    WeasyPrintEngine.name: WeasyPrintEngine,
+    ReportLabEngine.name: ReportLabEngine,
+}
+
+_instances: Dict[str, RenderEngine] = {}
+
+
+def register_engine(name: str, factory: Callable[[], RenderEngine]) -> None:
+    """Register an additional engine (or replace one) under the given name"""
+    ENGINES[name] = factory
+    stale = _instances.pop(name, None)
+    if stale:
+        stale.shutdown()
+
+
+def get_engine(name: Optional[str] = None) -> RenderEngine:
+    """Return the shared engine instance, defaulting to the configured `pdf_engine`"""
+    name = name or settings.pdf_engine
+    if name not in ENGINES:
+        raise ValueError(f"Unknown PDF engine '{name}'. Available: {', '.join(sorted(ENGINES))}")
+    if name not in _instances:
+        _instances[name] = ENGINES[name]()
+    return _instances[name]
+
+
+def get_engine_for(quotation_data: Dict[str, Any]) -> RenderEngine:
+    """
+    Engine for a specific quotation. HTML engines lay out the whole document in one
+    pass and slow down sharply with thousands of lines, so quotes above
+    `pdf_large_quote_lines` go to the paged ReportLab renderer instead.
+    """
+    engine = get_engine()
+    line_count = len(quotation_data.get('items', quotation_data.get('line_items', [])))
+    if isinstance(engine, HTMLRenderEngine) and line_count > settings.pdf_large_quote_lines:
+        logger.info(f"Quote has {line_count} lines; rendering with {ReportLabEngine.name} instead of {engine.name}")
+        return get_engine(ReportLabEngine.name)
+    return engine
+
+
+def render_pool_status() -> Dict[str, Dict[str, Any]]:
+    """Counters of the in-process engines in use on this worker"""
+    return {name: engine.snapshot() for name, engine in _instances.items() if isinstance(engine, PooledRenderEngine)}
+
+
+def shutdown_engines() -> None:
+    for engine in _instances.values():
+        engine.shutdown()
+    _instances.clear()
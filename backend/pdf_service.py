@@ -1,218 +1,526 @@
-from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
+from reportlab.lib.units import mm
 from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, Flowable
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from xml.sax.saxutils import escape
 from io import BytesIO
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+import base64
 import logging
+import threading
+
+from config import settings
+from quote_template import build_quotation_context, format_currency, format_date
 
 logger = logging.getLogger(__name__)
 
+# CSS pixels (as used by QuotePrint.jsx) to PDF points
+PX = 0.75
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN_X = 14 * mm
+MARGIN_TOP = 20 * mm
+FOOTER_HEIGHT = 30 * mm
+MARGIN_BOTTOM = 32 * mm
+FRAME_WIDTH = PAGE_WIDTH - 2 * MARGIN_X
+
+# Item table columns, proportional to the widths in QuotePrint.jsx
+ITEM_HEADERS = ['S.No.', 'Description', 'Quantity', 'VAT', 'Sale Price', 'Discount (%)', 'Price', 'Total']
+_ITEM_COL_PX = [35, 180, 45, 80, 55, 45, 55, 55]
+ITEM_COL_WIDTHS = [FRAME_WIDTH * w / sum(_ITEM_COL_PX) for w in _ITEM_COL_PX]
+
+
+class _NumberedCanvas(canvas.Canvas):
+    """Canvas that defers page output so every page can show 'Page: n / total'"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._saved_page_states = []
+
+    def showPage(self):
+        self._saved_page_states.append(dict(self.__dict__))
+        self._startPage()
+
+    def save(self):
+        total = len(self._saved_page_states)
+        for state in self._saved_page_states:
+            self.__dict__.update(state)
+            self.setFont('Helvetica', 11 * PX)
+            self.drawRightString(PAGE_WIDTH - MARGIN_X, 8 * mm, f"Page: {self._pageNumber} / {total}")
+            super().showPage()
+        super().save()
+
+
+class _PagedItemTable(Flowable):
+    """
+    Line item table laid out one page at a time.
+
+    A single Table holding every row is measured and re-split on every page break,
+    which grows quadratically with the number of lines. This flowable only builds a
+    Table for the rows that fit the space ReportLab offers it (header included) and
+    hands the remaining rows on as a new _PagedItemTable, so layout is linear and
+    only one page of cell flowables is alive at a time.
+    """
+
+    def __init__(self, service: "PDFService", ctx: Dict[str, Any], start: int = 0, carry: Optional[tuple] = None):
+        super().__init__()
+        self.service = service
+        self.ctx = ctx
+        self.start = start
+        # (cells, height) of the first row when it was already built for the previous page
+        self._carry = carry
+        self._chunk: Optional[tuple] = None  # (avail_height, table, next_index, overflow_row)
+
+    def _next_row(self, index: int) -> tuple:
+        if index == self.start and self._carry:
+            return self._carry
+        cells = self.service.item_row(self.ctx['rows'][index], self.ctx['vat_rate'])
+        return cells, self.service.item_row_height(cells)
+
+    def _layout(self, avail_width: float, avail_height: float) -> tuple:
+        if self._chunk and self._chunk[0] == avail_height:
+            return self._chunk
+        limit = min(len(self.ctx['rows']), self.start + settings.pdf_table_page_rows)
+        header_height = self.service.item_header_height()
+        data = [self.service.item_header_row()]
+        heights = [header_height]
+        used = header_height
+        next_index = self.start
+        overflow_row = None
+        # Add rows until the next one would overflow; rows are measured one at a time
+        while next_index < limit:
+            cells, height = self._next_row(next_index)
+            if used + height > avail_height:
+                overflow_row = (cells, height)
+                break
+            used += height
+            data.append(cells)
+            heights.append(height)
+            next_index += 1
+        table = None
+        if next_index > self.start:
+            # Row heights are already known, so the Table does not wrap every cell again
+            table = Table(data, colWidths=ITEM_COL_WIDTHS, rowHeights=heights, repeatRows=1)
+            table.setStyle(self.service.item_table_style)
+        self._chunk = (avail_height, table, next_index, overflow_row)
+        return self._chunk
+
+    def wrap(self, avail_width, avail_height):
+        _, table, next_index, _ = self._layout(avail_width, avail_height)
+        if table is None or next_index < len(self.ctx['rows']):
+            # Not everything fits here: ask the frame to split us
+            return avail_width, avail_height + 1
+        return table.wrap(avail_width, avail_height)
+
+    def split(self, avail_width, avail_height):
+        _, table, next_index, overflow_row = self._layout(avail_width, avail_height)
+        if table is None:
+            # Not even one row fits in the remaining space; continue on the next page
+            return []
+        self._chunk = None
+        return [table, _PagedItemTable(self.service, self.ctx, next_index, overflow_row)]
+
+    def draw(self):
+        table = self._chunk[1]
+        table.drawOn(self.canv, 0, 0)
+
+
 class PDFService:
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self.setup_custom_styles()
-    
+        # Styles are built on the first render, not when the module is imported
+        self.styles = None
+        self._item_header_height: Optional[float] = None
+        self._description_frags = None
+        # Renders run on a thread pool; the first ones must not see half-built styles
+        self._styles_lock = threading.Lock()
+
+    def _ensure_styles(self):
+        # _description_frags is set last, once everything else is in place
+        if self._description_frags is not None:
+            return
+        with self._styles_lock:
+            if self._description_frags is not None:
+                return
+            self.styles = getSampleStyleSheet()
+            self.setup_custom_styles()
+            self.setup_table_styles()
+            # Item descriptions share one markup shape; parse it once and reuse the fragments
+            self._description_frags = Paragraph(
+                f"<b>name</b><br/><font size='{10 * PX}' color='#666666'>sku</font>",
+                self.styles['ItemDescription'],
+            ).frags
+
     def setup_custom_styles(self):
-        """Setup custom paragraph styles for the quotation PDF"""
-        # Title style
+        """Setup paragraph styles matching the QuotePrint.jsx stylesheet"""
+        base = self.styles['Normal']
+
         self.styles.add(ParagraphStyle(
             name='QuotationTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
+            parent=base,
+            fontName='Helvetica-Bold',
+            fontSize=20 * PX,
+            leading=26 * PX,
             alignment=TA_CENTER,
-            textColor=colors.darkblue
+            textColor=colors.HexColor('#111111'),
+            spaceBefore=25 * PX,
+            spaceAfter=20 * PX,
         ))
-        
-        # Company info style
+
         self.styles.add(ParagraphStyle(
-            name='CompanyInfo',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=6,
-            alignment=TA_LEFT
+            name='MetaLabel',
+            parent=base,
+            fontName='Helvetica-Bold',
+            fontSize=12 * PX,
+            leading=19 * PX,
+            textColor=colors.HexColor('#333333'),
         ))
-        
-        # Customer info style
+
         self.styles.add(ParagraphStyle(
-            name='CustomerInfo',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=6,
-            alignment=TA_LEFT
+            name='MetaValue',
+            parent=base,
+            fontSize=12 * PX,
+            leading=19 * PX,
+            textColor=colors.HexColor('#333333'),
         ))
-        
-        # Table header style
+
         self.styles.add(ParagraphStyle(
             name='TableHeader',
-            parent=self.styles['Normal'],
-            fontSize=10,
+            parent=base,
+            fontName='Helvetica-Bold',
+            fontSize=11 * PX,
+            leading=14 * PX,
             alignment=TA_CENTER,
-            textColor=colors.white
+            textColor=colors.HexColor('#222222'),
+        ))
+
+        self.styles.add(ParagraphStyle(
+            name='ItemDescription',
+            parent=base,
+            fontSize=11 * PX,
+            leading=14 * PX,
+            alignment=TA_LEFT,
+        ))
+
+        self.styles.add(ParagraphStyle(
+            name='Notes',
+            parent=base,
+            fontSize=12 * PX,
+            leading=18 * PX,
+        ))
+
+        self.styles.add(ParagraphStyle(
+            name='NotesTitle',
+            parent=base,
+            fontName='Helvetica-Bold',
+            fontSize=14 * PX,
+            leading=18 * PX,
+            spaceAfter=8 * PX,
+        ))
+
+        self.styles.add(ParagraphStyle(
+            name='Footer',
+            parent=base,
+            fontSize=11 * PX,
+            leading=15 * PX,
         ))
-        
-        # Table data style
+
         self.styles.add(ParagraphStyle(
-            name='TableData',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            alignment=TA_LEFT
+            name='FooterTitle',
+            parent=base,
+            fontName='Helvetica-Bold',
+            fontSize=12 * PX,
+            leading=15 * PX,
         ))
-        
-        # Total style
+
         self.styles.add(ParagraphStyle(
-            name='Total',
-            parent=self.styles['Normal'],
-            fontSize=12,
+            name='TotalsCell',
+            parent=base,
+            fontSize=13 * PX,
+            leading=16 * PX,
             alignment=TA_RIGHT,
-            textColor=colors.darkblue,
-            spaceBefore=10
         ))
 
-    def generate_quotation_pdf(self, quotation_data: Dict[str, Any]) -> BytesIO:
+    def setup_table_styles(self):
+        """Table styles are immutable once built, so they are shared by every render"""
+        self.meta_table_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 15 * PX),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+        ])
+
+        self.item_table_style = TableStyle([
+            # Header row
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f5f5f5')),
+            ('GRID', (0, 0), (-1, 0), 1 * PX, colors.HexColor('#dddddd')),
+            ('TOPPADDING', (0, 0), (-1, 0), 10 * PX),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10 * PX),
+            ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+
+            # Data rows
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 11 * PX),
+            ('GRID', (0, 1), (-1, -1), 1 * PX, colors.HexColor('#e5e5e5')),
+            ('TOPPADDING', (0, 1), (-1, -1), 8 * PX),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 8 * PX),
+            ('LEFTPADDING', (0, 0), (-1, -1), 6 * PX),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6 * PX),
+            ('VALIGN', (0, 1), (-1, -1), 'TOP'),
+            ('ALIGN', (0, 1), (0, -1), 'RIGHT'),
+            ('ALIGN', (2, 1), (2, -1), 'RIGHT'),
+            ('ALIGN', (3, 1), (3, -1), 'CENTER'),
+            ('ALIGN', (4, 1), (-1, -1), 'RIGHT'),
+        ])
+
+        self.totals_table_style = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 13 * PX),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (-1, -1), 6 * PX),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6 * PX),
+            ('LINEBELOW', (0, 0), (-1, -2), 1 * PX, colors.HexColor('#eeeeee')),
+            # Payment term row
+            ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 2), (-1, 2), 12 * PX),
+            # Final total row
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -1), (-1, -1), 16 * PX),
+            ('TOPPADDING', (0, -1), (-1, -1), 10 * PX),
+            ('BOTTOMPADDING', (0, -1), (-1, -1), 10 * PX),
+            ('LINEABOVE', (0, -1), (-1, -1), 2 * PX, colors.HexColor('#333333')),
+            ('LINEBELOW', (0, -1), (-1, -1), 2 * PX, colors.HexColor('#333333')),
+        ])
+
+        self.vat_table_style = TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11 * PX),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f5f5f5')),
+            ('GRID', (0, 0), (-1, -1), 1 * PX, colors.HexColor('#e5e5e5')),
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('TOPPADDING', (0, 0), (-1, -1), 4 * PX),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4 * PX),
+        ])
+
+        self.notes_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f9f9f9')),
+            ('BOX', (0, 0), (-1, -1), 1 * PX, colors.HexColor('#dddddd')),
+            ('TOPPADDING', (0, 0), (-1, -1), 15 * PX),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 15 * PX),
+            ('LEFTPADDING', (0, 0), (-1, -1), 15 * PX),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 15 * PX),
+        ])
+
+    def generate_quotation_pdf(self, quotation_data: Dict[str, Any], logo_data_uri: Optional[str] = None) -> BytesIO:
         """
-        Generate a PDF for the quotation
+        Generate a PDF for the quotation with the same layout as QuotePrint.jsx:
+        logo, title, meta information, item table (header repeated on every page),
+        totals with a per-VAT breakdown, notes, and the company/bank footer on every page.
         """
+        self._ensure_styles()
         try:
+            ctx = build_quotation_context(quotation_data)
             buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-            
-            # Build the PDF content
+            doc = SimpleDocTemplate(
+                buffer,
+                pagesize=A4,
+                leftMargin=MARGIN_X,
+                rightMargin=MARGIN_X,
+                topMargin=MARGIN_TOP,
+                bottomMargin=MARGIN_BOTTOM,
+                title=f"Quotation {ctx['quotation_number']}",
+            )
+
             story = []
-            
-            # Title
-            story.append(Paragraph("QUOTATION", self.styles['QuotationTitle']))
-            story.append(Spacer(1, 12))
-            
-            # Company and Customer info side by side
-            company_info = self._format_company_info(quotation_data.get('company_settings', {}))
-            customer_info = self._format_customer_info(quotation_data.get('customer', {}))
-            
-            # Create a table for company and customer info
-            info_data = [
-                [company_info, customer_info]
-            ]
-            
-            info_table = Table(info_data, colWidths=[3*inch, 3*inch])
-            info_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-            ]))
-            
-            story.append(info_table)
-            story.append(Spacer(1, 20))
-            
-            # Quotation details
-            story.append(Paragraph(f"<b>Quotation Number:</b> {quotation_data.get('quotation_number', 'N/A')}", self.styles['Normal']))
-            story.append(Paragraph(f"<b>Date:</b> {quotation_data.get('date', 'N/A')}", self.styles['Normal']))
-            story.append(Paragraph(f"<b>Valid Until:</b> {quotation_data.get('valid_until', 'N/A')}", self.styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # Items table
-            if quotation_data.get('line_items'):
-                story.append(Paragraph("Items:", self.styles['Heading2']))
-                story.append(Spacer(1, 10))
-                
-                # Table headers
-                table_data = [['Description', 'Quantity', 'Unit Price', 'Total']]
-                
-                # Add items
-                for item in quotation_data['line_items']:
-                    table_data.append([
-                        item.get('description', ''),
-                        str(item.get('quantity', 0)),
-                        f"€{item.get('unit_price', 0):.2f}",
-                        f"€{item.get('total', 0):.2f}"
-                    ])
-                
-                # Create table
-                items_table = Table(table_data, colWidths=[3*inch, 1*inch, 1.5*inch, 1.5*inch])
-                items_table.setStyle(TableStyle([
-                    # Header row
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    
-                    # Data rows
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                    ('FONTSIZE', (0, 1), (-1, -1), 9),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ]))
-                
-                story.append(items_table)
-                story.append(Spacer(1, 20))
-            
-            # Totals
-            totals = quotation_data.get('totals', {})
-            if totals:
-                story.append(Paragraph(f"<b>Subtotal:</b> €{totals.get('subtotal', 0):.2f}", self.styles['Total']))
-                if totals.get('discount_amount', 0) > 0:
-                    story.append(Paragraph(f"<b>Discount:</b> -€{totals.get('discount_amount', 0):.2f}", self.styles['Total']))
-                if totals.get('vat_amount', 0) > 0:
-                    story.append(Paragraph(f"<b>VAT ({totals.get('vat_rate', 0):.1f}%):</b> €{totals.get('vat_amount', 0):.2f}", self.styles['Total']))
-                story.append(Paragraph(f"<b>TOTAL:</b> €{totals.get('total', 0):.2f}", self.styles['Total']))
-                story.append(Spacer(1, 20))
-            
-            # Terms and conditions
-            if quotation_data.get('terms_and_conditions'):
-                story.append(Paragraph("Terms and Conditions:", self.styles['Heading2']))
-                story.append(Paragraph(quotation_data['terms_and_conditions'], self.styles['Normal']))
-                story.append(Spacer(1, 20))
-            
-            # Notes
-            if quotation_data.get('notes'):
-                story.append(Paragraph("Notes:", self.styles['Heading2']))
-                story.append(Paragraph(quotation_data['notes'], self.styles['Normal']))
-            
-            # Build PDF
-            doc.build(story)
+            logo = self._logo_flowable(logo_data_uri or ctx['company']['logo_url'])
+            if logo:
+                story.append(logo)
+                story.append(Spacer(1, 15 * PX))
+
+            story.append(Paragraph(f"Quotation No. {escape(str(ctx['quotation_number']))}", self.styles['QuotationTitle']))
+            story.extend(self._meta_section(ctx))
+            story.append(_PagedItemTable(self, ctx))
+            story.append(Spacer(1, 25 * PX))
+            story.append(self._totals_table(ctx))
+            if len(ctx['vat_breakdown']) > 1:
+                story.append(Spacer(1, 15 * PX))
+                story.append(self._vat_breakdown_table(ctx))
+
+            if ctx['notes']:
+                story.append(Spacer(1, 20 * PX))
+                story.append(self._notes_box(ctx['notes']))
+
+            footer = self._footer_table(ctx)
+
+            def draw_footer(canv, _doc):
+                canv.saveState()
+                canv.setStrokeColor(colors.HexColor('#dddddd'))
+                canv.setLineWidth(1 * PX)
+                canv.line(0, FOOTER_HEIGHT, PAGE_WIDTH, FOOTER_HEIGHT)
+                _, height = footer.wrapOn(canv, FRAME_WIDTH, FOOTER_HEIGHT)
+                footer.drawOn(canv, MARGIN_X, FOOTER_HEIGHT - 4 * mm - height)
+                canv.restoreState()
+
+            doc.build(story, onFirstPage=draw_footer, onLaterPages=draw_footer, canvasmaker=_NumberedCanvas)
             buffer.seek(0)
-            
-            logger.info(f"PDF generated successfully for quotation {quotation_data.get('quotation_number', 'N/A')}")
+
+            logger.info(f"PDF generated successfully for quotation {ctx['quotation_number']}")
             return buffer
-            
+
         except Exception as e:
             logger.error(f"Error generating PDF: {str(e)}")
             raise Exception(f"Failed to generate PDF: {str(e)}")
 
-    def _format_company_info(self, company_settings: Dict[str, Any]) -> str:
-        """Format company information for PDF"""
-        info = f"<b>{company_settings.get('company_name', 'Your Company')}</b><br/>"
-        if company_settings.get('address'):
-            info += f"{company_settings['address']}<br/>"
-        if company_settings.get('phone'):
-            info += f"Phone: {company_settings['phone']}<br/>"
-        if company_settings.get('email'):
-            info += f"Email: {company_settings['email']}<br/>"
-        if company_settings.get('vat_number'):
-            info += f"VAT: {company_settings['vat_number']}<br/>"
-        if company_settings.get('website'):
-            info += f"Web: {company_settings['website']}"
-        return info
-
-    def _format_customer_info(self, customer: Dict[str, Any]) -> str:
-        """Format customer information for PDF"""
-        info = f"<b>Bill To:</b><br/>"
-        info += f"{customer.get('company_name', '')}<br/>"
-        if customer.get('contact_person'):
-            info += f"Attn: {customer['contact_person']}<br/>"
-        if customer.get('address'):
-            info += f"{customer['address']}<br/>"
-        if customer.get('phone'):
-            info += f"Phone: {customer['phone']}<br/>"
-        if customer.get('email'):
-            info += f"Email: {customer['email']}"
-        return info
+    def _logo_flowable(self, logo_url: Optional[str]) -> Optional[Image]:
+        """Only embedded (data URI) logos are drawn; remote logos must be resolved by the logo cache first"""
+        if not logo_url or not logo_url.startswith('data:') or ',' not in logo_url:
+            return None
+        try:
+            raw = base64.b64decode(logo_url.split(',', 1)[1])
+            width, height = ImageReader(BytesIO(raw)).getSize()
+            scale = min(120 * PX / width, 60 * PX / height, 1)
+            logo = Image(BytesIO(raw), width=width * scale, height=height * scale)
+            logo.hAlign = 'LEFT'
+            return logo
+        except Exception as e:
+            logger.warning(f"Failed to embed logo in PDF: {e}")
+            return None
+
+    def _meta_cell(self, label: str, *values: str) -> List[Paragraph]:
+        cell = [Paragraph(escape(label), self.styles['MetaLabel'])]
+        cell.extend(Paragraph(escape(str(v)), self.styles['MetaValue']) for v in values)
+        return cell
+
+    def _meta_section(self, ctx: Dict[str, Any]) -> List[Any]:
+        customer = ctx['customer']
+        col_widths = [FRAME_WIDTH / 3] * 3
+
+        meta = Table([[
+            self._meta_cell('Quotation Date:', format_date(ctx['date'])),
+            self._meta_cell('Delivery Date:', format_date(ctx['valid_until'])),
+            self._meta_cell('Payment Term:', 'Prepaid'),
+        ]], colWidths=col_widths)
+        meta.setStyle(self.meta_table_style)
+
+        additional = Table([[
+            self._meta_cell(
+                'Order Contact:',
+                f"{customer.get('company_name', '')}, {customer.get('contact_person', '')}",
+                customer.get('address', '') or '',
+            ),
+            self._meta_cell('Your Reference:', f"ORDER No. {ctx['quotation_number']}"),
+            self._meta_cell(
+                'Discount:',
+                f"{format_currency(ctx['discount_amount'])} of {format_currency(ctx['subtotal'])}",
+            ),
+        ]], colWidths=col_widths)
+        additional.setStyle(self.meta_table_style)
+
+        return [meta, Spacer(1, 15 * PX), additional, Spacer(1, 25 * PX)]
+
+    def item_header_row(self) -> List[Paragraph]:
+        return [Paragraph(h, self.styles['TableHeader']) for h in ITEM_HEADERS]
+
+    def item_header_height(self) -> float:
+        if self._item_header_height is None:
+            table = Table([self.item_header_row()], colWidths=ITEM_COL_WIDTHS)
+            table.setStyle(self.item_table_style)
+            self._item_header_height = table.wrap(FRAME_WIDTH, PAGE_HEIGHT)[1]
+        return self._item_header_height
+
+    def item_row_height(self, row_cells: List[Any]) -> float:
+        """Height of a data row: the wrapped description plus the cell padding"""
+        description = row_cells[1]
+        _, text_height = description.wrap(ITEM_COL_WIDTHS[1] - 12 * PX, PAGE_HEIGHT)
+        return max(text_height, 11 * PX * 1.2) + 16 * PX
+
+    def item_row(self, row: Dict[str, Any], vat_rate) -> List[Any]:
+        # Build the description from the pre-parsed fragments: the markup parser is the
+        # most expensive part of a row, and fragment text is plain (no escaping needed)
+        name_frag, break_frag, sku_frag = self._description_frags
+        frags = [name_frag.clone(text=str(row['name']))]
+        if row['sku']:
+            frags += [break_frag.clone(), sku_frag.clone(text=str(row['sku']))]
+        description = Paragraph('', self.styles['ItemDescription'], frags=frags)
+        return [
+            str(row['index']),
+            description,
+            f"{row['quantity']:.3f}",
+            f"VAT at {vat_rate}%",
+            format_currency(row['unit_price']),
+            f"{row['discount_pct']}%",
+            format_currency(row['discounted_price']),
+            format_currency(row['total']),
+        ]
+
+    def _totals_table(self, ctx: Dict[str, Any]) -> Table:
+        data = [
+            ['Total Without VAT', format_currency(ctx['subtotal'] - ctx['discount_amount'])],
+            ['Discount', f"-{format_currency(ctx['discount_amount'])}"],
+            ['Payment Term', 'Prepaid'],
+            [f"VAT ({ctx['vat_rate']}%)", format_currency(ctx['vat_amount'])],
+            ['Total', format_currency(ctx['total'])],
+        ]
+        table = Table(data, colWidths=[180 * PX, 100 * PX], hAlign='RIGHT')
+        table.setStyle(self.totals_table_style)
+        return table
+
+    def _vat_breakdown_table(self, ctx: Dict[str, Any]) -> Table:
+        data = [['VAT rate', 'Taxable amount', 'VAT']]
+        data.extend(
+            [f"{entry['rate']}%", format_currency(entry['base']), format_currency(entry['vat'])]
+            for entry in ctx['vat_breakdown']
+        )
+        table = Table(data, colWidths=[80 * PX, 100 * PX, 100 * PX], hAlign='RIGHT')
+        table.setStyle(self.vat_table_style)
+        return table
+
+    def _notes_box(self, notes: str) -> Table:
+        content = [
+            Paragraph('Additional Notes:', self.styles['NotesTitle']),
+            Paragraph(escape(str(notes)).replace('\n', '<br/>'), self.styles['Notes']),
+        ]
+        table = Table([[content]], colWidths=[FRAME_WIDTH])
+        table.setStyle(self.notes_table_style)
+        return table
+
+    def _footer_table(self, ctx: Dict[str, Any]) -> Table:
+        company = ctx['company']
+        bank = ctx['bank']
+        footer_style = self.styles['Footer']
+
+        address = '<br/>'.join(escape(line) for line in company['address_lines']) or 'Via Paleocapa 1<br/>Milano, 20121<br/>Italy'
+        left = [
+            Paragraph(escape(company['company_name'] or 'Grow United Italia SRL'), self.styles['FooterTitle']),
+            Paragraph(address, footer_style),
+            Paragraph(escape(company['email'] or 'administration@growunited.it'), footer_style),
+            Paragraph(escape(company['website'] or 'www.canna-it.com'), footer_style),
+            Paragraph(f"IVA {escape(company['vat_number'] or 'IT13328670966')}", footer_style),
+        ]
+        right = [
+            Paragraph('<b>Bank Details:</b>', footer_style),
+            Paragraph(escape(bank['name_branch'] or 'BANCA PASSADORE & C. S.P.A. - CORSO MATTEOTTI, 7 - MILANO 20121'), footer_style),
+        ]
+        if bank['address_lines']:
+            right.append(Paragraph('<br/>'.join(escape(line) for line in bank['address_lines']), footer_style))
+        right.extend([
+            Paragraph(f"Account nr.: {escape(bank['account_number'] or '1118520')}", footer_style),
+            Paragraph(f"IBAN-code: {escape(bank['iban'] or 'IT87I0333201600000001118520')}", footer_style),
+            Paragraph(f"BIC/Swift: {escape(bank['bic_swift'] or 'PASBITGG')}", footer_style),
+        ])
+
+        table = Table([[left, right]], colWidths=[FRAME_WIDTH / 2] * 2)
+        table.setStyle(self.meta_table_style)
+        return table
 
 # Global PDF service instance
 pdf_service = PDFService()
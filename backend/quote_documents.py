@@ -0,0 +1,273 @@
+"""
+Rendered quotation PDFs for stored quotes, cached on disk.
+
+A rendered file is keyed by everything that can change its bytes: the quote's
+`updated_at`, the `updated_at` of its customer and of the newest of its products
+(names, addresses and SKUs are read from those rows), the company settings'
+`updated_at` (logo, address, bank details), the template version and the render
+engine configuration. The same key is used as
+the HTTP ETag, so a client that already has the current PDF gets a 304 without the
+quote ever being loaded or rendered.
+
+Older versions are not deleted when a new one is rendered: another request (or
+nginx) may have just looked one up and be about to open it. They are pruned on a
+later render of the same quote, once the newest version has been on disk for
+`pdf_cache_superseded_grace_seconds`.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from config import settings
+from db import AsyncSessionLocal
+from models import CompanySettings, Customer, Product, Quote, QuoteItem
+from pdf_engines import get_engine_for
+from quote_template import TEMPLATE_VERSION
+from settings_cache import company_settings_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QuoteDocument:
+    quote_id: int
+    etag: str
+    path: Path
+    filename: str
+    cached: bool = False
+
+    @property
+    def size(self) -> int:
+        return self.path.stat().st_size
+
+
+def _isoformat(value) -> str:
+    return value.isoformat() if value else ""
+
+
+def document_etag(quote_id: int, quote_updated_at, customer_updated_at, products_updated_at, company_updated_at) -> str:
+    """Cache key / ETag of a quote's PDF; changes whenever the rendered bytes would"""
+    parts = [
+        str(quote_id),
+        _isoformat(quote_updated_at),
+        _isoformat(customer_updated_at),
+        _isoformat(products_updated_at),
+        _isoformat(company_updated_at),
+        TEMPLATE_VERSION,
+        settings.pdf_engine,
+        str(settings.pdf_large_quote_lines),
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def document_filename(quotation_number: Optional[str], quote_id: int) -> str:
+    # Quotation numbers look like QUO/2026/0001; keep them readable but path-safe
+    name = re.sub(r"[^A-Za-z0-9._-]+", "-", quotation_number or f"quote-{quote_id}").strip("-")
+    return f"Quotation-{name}.pdf"
+
+
+def quotation_payload(quote: Quote, company: Optional[CompanySettings]) -> Dict[str, Any]:
+    """Build the quotation payload (the structure QuotePrint.jsx and the email use) from a stored quote"""
+    items = []
+    for item in quote.items:
+        product = item.product
+        items.append({
+            "product_name": product.name if product else item.description,
+            "sku": (product.sku if product else None) or "",
+            "description": item.description or "",
+            "quantity": float(item.quantity or 0),
+            "unit_price": float(item.unit_price or 0),
+            "vat_rate": float(item.vat_rate) if item.vat_rate is not None else None,
+        })
+
+    subtotal = float(quote.subtotal or 0)
+    discount_value = float(quote.discount_value or 0)
+    if quote.discount_type == "percentage":
+        discount_amount = subtotal * discount_value / 100
+    elif quote.discount_type == "fixed":
+        discount_amount = discount_value
+    else:
+        discount_amount = 0
+
+    # One rate for the whole quote when every line shares it, otherwise the company default
+    rates = {it["vat_rate"] for it in items if it["vat_rate"] is not None}
+    default_vat_rate = float(company.default_vat_rate) if company and company.default_vat_rate is not None else settings.default_vat_rate
+    vat_rate = rates.pop() if len(rates) == 1 else default_vat_rate
+
+    customer = quote.customer
+    company_settings = {}
+    if company:
+        company_settings = {
+            column.name: getattr(company, column.name)
+            for column in CompanySettings.__table__.columns
+            if column.name not in ("id", "created_at", "updated_at", "default_vat_rate")
+        }
+
+    return {
+        "quotation_number": quote.quotation_number,
+        "date": _isoformat(quote.created_at),
+        "valid_until": _isoformat(quote.valid_until),
+        "company_settings": company_settings,
+        "customer": {
+            "company_name": customer.name if customer else "",
+            "contact_person": (customer.contact_person if customer else None) or "",
+            "address": (customer.address if customer else None) or "",
+            "email": (customer.email if customer else None) or "",
+            "vat_number": (customer.vat_number if customer else None) or "",
+        },
+        "items": items,
+        "totals": {
+            "subtotal": subtotal,
+            "discountAmount": discount_amount,
+            "vatAmount": float(quote.total_vat or 0),
+            "total": float(quote.total or 0),
+        },
+        "discount": {"type": quote.discount_type, "value": discount_value},
+        "vat_rate": vat_rate,
+        "currency": "EUR",
+        "terms_and_conditions": quote.terms_and_conditions,
+        "notes": quote.notes or "",
+    }
+
+
+async def load_company_settings() -> Optional[CompanySettings]:
+    """Company settings snapshot (shared, read-only) from the settings cache"""
+    return await company_settings_cache.get()
+
+
+async def load_quote(session: AsyncSession, quote_id: int) -> Optional[Quote]:
+    result = await session.execute(
+        select(Quote)
+        .options(selectinload(Quote.customer), selectinload(Quote.items).selectinload(QuoteItem.product))
+        .where(Quote.id == quote_id, Quote.deleted == False)
+    )
+    return result.scalar_one_or_none()
+
+
+async def current_etag(session: AsyncSession, quote_id: int) -> Optional[str]:
+    """ETag of the quote's current PDF from one narrow query, or None if the quote does not exist"""
+    products_updated_at = (
+        select(func.max(Product.updated_at))
+        .join(QuoteItem, QuoteItem.product_id == Product.id)
+        .where(QuoteItem.quote_id == Quote.id)
+        .scalar_subquery()
+    )
+    row = (await session.execute(
+        select(Quote.updated_at, Customer.updated_at, products_updated_at)
+        .join(Customer, Customer.id == Quote.customer_id)
+        .where(Quote.id == quote_id, Quote.deleted == False)
+    )).first()
+    if row is None:
+        return None
+    company = await company_settings_cache.get()
+    return document_etag(quote_id, *row, company.updated_at if company else None)
+
+
+def quote_etag(quote: Quote, company: Optional[CompanySettings]) -> str:
+    """Same as current_etag, for a quote loaded with its customer and item products"""
+    products = [item.product.updated_at for item in quote.items if item.product is not None]
+    return document_etag(
+        quote.id,
+        quote.updated_at,
+        quote.customer.updated_at if quote.customer else None,
+        max(products) if products else None,
+        company.updated_at if company else None,
+    )
+
+
+async def quote_attachment(quote_id: int) -> Tuple[str, bytes]:
+    """(filename, PDF bytes) of a stored quote for an email, from the render cache"""
+    async with AsyncSessionLocal() as session:
+        quote = await load_quote(session, quote_id)
+    if quote is None:
+        raise ValueError(f"Quote {quote_id} not found")
+    document = await quote_documents.get(quote, await load_company_settings())
+    return document.filename, await asyncio.to_thread(document.path.read_bytes)
+
+
+class QuoteDocumentCache:
+    """Renders quote PDFs once per version and serves them from a directory"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or settings.pdf_cache_dir)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def path_for(self, quote_id: int, etag: str) -> Path:
+        return self.directory / f"{quote_id}-{etag}.pdf"
+
+    def lookup(self, quote_id: int, etag: str) -> Optional[Path]:
+        path = self.path_for(quote_id, etag)
+        return path if path.exists() else None
+
+    async def get(self, quote: Quote, company: Optional[CompanySettings]) -> QuoteDocument:
+        """Return the cached PDF for the quote, rendering it if this version is not on disk yet"""
+        etag = quote_etag(quote, company)
+        filename = document_filename(quote.quotation_number, quote.id)
+        path = self.lookup(quote.id, etag)
+        if path:
+            return QuoteDocument(quote.id, etag, path, filename, cached=True)
+
+        # Concurrent requests for the same version wait for one render instead of starting their own
+        lock = self._locks.setdefault(etag, asyncio.Lock())
+        try:
+            async with lock:
+                path = self.lookup(quote.id, etag)
+                if path is None:
+                    payload = quotation_payload(quote, company)
+                    engine = get_engine_for(payload)
+                    pdf_bytes = await engine.render(payload)
+                    path = await asyncio.to_thread(self._store, quote.id, etag, pdf_bytes)
+                    logger.info(f"Rendered quote {quote.id} with {engine.name} ({len(pdf_bytes)} bytes)")
+        finally:
+            if not lock.locked():
+                self._locks.pop(etag, None)
+        return QuoteDocument(quote.id, etag, path, filename)
+
+    def _store(self, quote_id: int, etag: str, pdf_bytes: bytes) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(quote_id, etag)
+        # Write to a temporary file first so readers (and nginx) never see a partial PDF
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        self._prune_superseded(quote_id)
+        return path
+
+    def _prune_superseded(self, quote_id: int) -> None:
+        """Delete versions of a quote that were superseded more than the grace period ago"""
+        versions = []
+        for path in self.directory.glob(f"{quote_id}-*.pdf"):
+            try:
+                versions.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        versions.sort()
+        now = time.time()
+        # A version is superseded from the moment the next one was written
+        for (_, older), (superseded_at, _) in zip(versions, versions[1:]):
+            if now - superseded_at >= settings.pdf_cache_superseded_grace_seconds:
+                older.unlink(missing_ok=True)
+
+    def invalidate(self, quote_id: Optional[int] = None) -> None:
+        """Remove cached versions of one quote (or of every quote), e.g. when it is deleted"""
+        pattern = f"{quote_id}-*.pdf" if quote_id is not None else "*.pdf"
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob(pattern):
+            path.unlink(missing_ok=True)
+
+
+quote_documents = QuoteDocumentCache()
@@ -0,0 +1,180 @@
+"""
+Batch export of quotation PDFs as a streamed ZIP archive.
+
+PDFs are rendered (or taken from the render cache) in parallel, bounded by
+`pdf_export_concurrency`, and written into the archive as they complete. The ZIP is
+produced on a non-seekable stream: each member carries a data descriptor instead of
+a patched header, so nothing but the member being copied is held in memory. PDFs are
+already compressed, so members are stored rather than deflated.
+"""
+import asyncio
+import logging
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from config import settings
+from db import AsyncSessionLocal
+from models import Quote
+from quote_documents import QuoteDocument, load_company_settings, load_quote, quote_documents
+from schemas import QuoteExportRequest
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class ExportJob:
+    id: str
+    total: int
+    status: str = "running"
+    rendered: int = 0
+    cached: int = 0
+    failed: int = 0
+    errors: List[str] = field(default_factory=list)
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = datetime.now(timezone.utc)
+
+
+class _ChunkWriter:
+    """Write-only sink for ZipFile; it has no tell()/seek(), so ZipFile streams"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class QuoteExporter:
+    def __init__(self):
+        self._jobs: Dict[str, ExportJob] = {}
+
+    def get_job(self, job_id: str) -> Optional[ExportJob]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - settings.pdf_export_job_ttl_seconds
+        for job_id, job in list(self._jobs.items()):
+            # Also drops jobs whose stream was never consumed to the end
+            if (job.finished_at or job.created_at).timestamp() < cutoff:
+                del self._jobs[job_id]
+
+    async def select_quote_ids(self, request: QuoteExportRequest, sessions: async_sessionmaker = AsyncSessionLocal) -> List[int]:
+        if request.ids is not None:
+            # Explicit ids are exported as given; unknown or deleted ones are reported in errors.txt
+            return list(dict.fromkeys(request.ids))
+        stmt = select(Quote.id).where(Quote.deleted == False)
+        if request.status:
+            stmt = stmt.where(Quote.status == request.status)
+        if request.customer_id is not None:
+            stmt = stmt.where(Quote.customer_id == request.customer_id)
+        if request.created_from:
+            stmt = stmt.where(Quote.created_at >= request.created_from)
+        if request.created_to:
+            stmt = stmt.where(Quote.created_at < request.created_to)
+        if not request.include_archived:
+            stmt = stmt.where(Quote.is_archived == False)
+        async with sessions() as session:
+            result = await session.execute(stmt.order_by(Quote.id))
+            return list(result.scalars().all())
+
+    def start(self, quote_ids: List[int]) -> ExportJob:
+        self._prune()
+        job = ExportJob(id=uuid.uuid4().hex, total=len(quote_ids))
+        self._jobs[job.id] = job
+        return job
+
+    async def _document(self, quote_id: int, company, semaphore: asyncio.Semaphore, sessions: async_sessionmaker) -> QuoteDocument:
+        async with semaphore:
+            # Each task has its own session; an AsyncSession can't be shared between tasks
+            async with sessions() as session:
+                quote = await load_quote(session, quote_id)
+            if quote is None:
+                raise LookupError(f"Quote {quote_id} not found")
+            return await quote_documents.get(quote, company)
+
+    async def stream(self, job: ExportJob, quote_ids: List[int], sessions: async_sessionmaker = AsyncSessionLocal) -> AsyncIterator[bytes]:
+        """Yield the ZIP archive in pieces as the PDFs become available"""
+        async with sessions() as session:
+            company = await load_company_settings()
+
+        semaphore = asyncio.Semaphore(settings.pdf_export_concurrency)
+        tasks = {
+            asyncio.create_task(self._document(quote_id, company, semaphore, sessions)): quote_id
+            for quote_id in quote_ids
+        }
+        sink = _ChunkWriter()
+        names = set()
+        try:
+            with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        document = await next_done
+                    except Exception as e:
+                        job.failed += 1
+                        job.errors.append(str(e))
+                        logger.warning(f"Export {job.id}: {e}")
+                        continue
+
+                    name = document.filename
+                    if name in names:
+                        name = f"{document.quote_id}-{name}"
+                    names.add(name)
+
+                    member = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                    member.compress_type = zipfile.ZIP_STORED
+                    with archive.open(member, mode="w") as out, open(document.path, "rb") as src:
+                        while chunk := src.read(COPY_CHUNK_SIZE):
+                            out.write(chunk)
+                            yield sink.drain()
+                    # Data descriptor written when the member is closed
+                    yield sink.drain()
+
+                    if document.cached:
+                        job.cached += 1
+                    else:
+                        job.rendered += 1
+
+                if job.errors:
+                    archive.writestr("errors.txt", "\n".join(job.errors) + "\n")
+            yield sink.drain()
+            job.finish("failed" if job.failed == job.total and job.total else "completed")
+            logger.info(
+                f"Export {job.id} finished: {job.rendered} rendered, {job.cached} cached, {job.failed} failed"
+            )
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client went away; stop rendering what nobody will receive
+            job.finish("cancelled")
+            raise
+        except Exception as e:
+            job.errors.append(str(e))
+            job.finish("failed")
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+quote_exporter = QuoteExporter()
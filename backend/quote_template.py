@@ -0,0 +1,181 @@
+"""
+Precompiled Jinja2 template for the HTML quotation (same layout as QuotePrint.jsx).
+
+The template is compiled once at import time (with a bytecode cache shared across
+worker restarts) and the static stylesheet is read once, so rendering only has to
+fill in the quote-specific values and line items.
+"""
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
+QUOTATION_TEMPLATE = "quotation.html"
+QUOTATION_STYLESHEET = "quotation.css"
+
+
+def format_currency(amount, currency: str = "EUR") -> str:
+    return f"€{amount:.2f}" if amount else "€0.00"
+
+
+def format_date(date_str) -> str:
+    if not date_str:
+        return ''
+    try:
+        if isinstance(date_str, str):
+            # Try to parse the date - handle different formats
+            if 'Z' in date_str:
+                dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+            elif 'T' in date_str:
+                dt = datetime.fromisoformat(date_str)
+            elif '/' in date_str and len(date_str.split('/')) == 3:
+                # Handle DD/MM/YYYY format
+                dt = datetime.strptime(date_str, '%d/%m/%Y')
+            else:
+                # Try parsing as simple date YYYY-MM-DD
+                dt = datetime.strptime(date_str, '%Y-%m-%d')
+            return dt.strftime('%d/%m/%Y %H:%M:%S')
+        return str(date_str)
+    except Exception as e:
+        logger.warning(f"Failed to format date '{date_str}': {e}")
+        return str(date_str) if date_str else ''
+
+
+_env = Environment(
+    loader=FileSystemLoader(str(TEMPLATES_DIR)),
+    autoescape=select_autoescape(["html"]),
+    bytecode_cache=FileSystemBytecodeCache(),
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+_env.filters["currency"] = format_currency
+_env.filters["quote_date"] = format_date
+
+# Static CSS, read once and injected verbatim into every render
+QUOTATION_CSS: str = (TEMPLATES_DIR / QUOTATION_STYLESHEET).read_text(encoding="utf-8")
+_env.globals["stylesheet"] = Markup(QUOTATION_CSS)
+
+# Compiled once per process
+quotation_template = _env.get_template(QUOTATION_TEMPLATE)
+
+# Changes whenever the layout or stylesheet changes; used to key rendered output
+TEMPLATE_VERSION: str = hashlib.sha256(
+    (TEMPLATES_DIR / QUOTATION_TEMPLATE).read_bytes() + QUOTATION_CSS.encode("utf-8")
+).hexdigest()[:12]
+
+
+def _build_rows(line_items: List[Dict[str, Any]], discount: Dict[str, Any], default_vat_rate) -> List[Dict[str, Any]]:
+    # Handle discount like QuotePrint.jsx: discount?.type === 'percentage' ? discount.value : 0
+    discount_pct = discount.get('value', 0) if discount.get('type') == 'percentage' else 0
+    rows = []
+    for idx, item in enumerate(line_items, start=1):
+        quantity = item.get('quantity', 0)
+        unit_price = item.get('unit_price', 0)
+        rows.append({
+            "index": idx,
+            # Match QuotePrint.jsx: item.product_name_snapshot || item.product_name
+            "name": item.get('product_name_snapshot') or item.get('product_name') or item.get('description', ''),
+            # Match QuotePrint.jsx: item.product_code_snapshot || item.sku
+            "sku": item.get('product_code_snapshot') or item.get('sku', ''),
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "vat_rate": item['vat_rate'] if item.get('vat_rate') is not None else default_vat_rate,
+            "discount_pct": discount_pct,
+            "discounted_price": unit_price * (1 - discount_pct / 100),
+            "total": quantity * unit_price * (1 - discount_pct / 100),
+        })
+    return rows
+
+
+def _build_vat_breakdown(rows: List[Dict[str, Any]], discount_amount) -> List[Dict[str, Any]]:
+    """Taxable amount and VAT per rate, with a fixed discount spread proportionally over the rates"""
+    bases: Dict[Any, float] = {}
+    for row in rows:
+        bases[row["vat_rate"]] = bases.get(row["vat_rate"], 0) + row["total"]
+    gross = sum(bases.values())
+    # Percentage discounts are already applied per row; only fixed amounts remain to be spread
+    ratio = 1 - (discount_amount / gross) if gross and discount_amount and not any(r["discount_pct"] for r in rows) else 1
+    return [
+        {"rate": rate, "base": base * ratio, "vat": base * ratio * float(rate or 0) / 100}
+        for rate, base in sorted(bases.items(), key=lambda kv: float(kv[0] or 0))
+    ]
+
+
+def build_quotation_context(quotation_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn the quotation payload (as sent by QuotePrint/QuoteBuilder) into the values
+    used by the quotation layout. Shared by every output format.
+    """
+    company_settings = quotation_data.get('company_settings', {})
+    # Handle both 'items' (from QuotePrint/frontend) and 'line_items' (legacy)
+    line_items = quotation_data.get('items', quotation_data.get('line_items', []))
+    totals = quotation_data.get('totals', {})
+
+    # Company address (Address Line 1, Address Line 2, City + Postal, Country)
+    address_lines = [x for x in [company_settings.get('address_line1'), company_settings.get('address_line2')] if x]
+    city_postal = ", ".join([x for x in [company_settings.get('city'), company_settings.get('postal_code')] if x])
+    if city_postal:
+        address_lines.append(city_postal)
+    if company_settings.get('country'):
+        address_lines.append(company_settings['country'])
+
+    vat_rate = quotation_data.get('vat_rate', 4)
+    discount_amount = totals.get('discountAmount', 0)
+    rows = _build_rows(line_items, quotation_data.get('discount', {}), vat_rate)
+
+    return {
+        "quotation_number": quotation_data.get('quotation_number', 'N/A'),
+        "date": quotation_data.get('date', 'N/A'),
+        "valid_until": quotation_data.get('valid_until', 'N/A'),
+        "notes": quotation_data.get('notes', ''),
+        "vat_rate": vat_rate,
+        "customer": quotation_data.get('customer', {}),
+        "subtotal": totals.get('subtotal', 0),
+        "discount_amount": discount_amount,
+        "vat_amount": totals.get('vatAmount', totals.get('taxAmount', 0)),
+        "total": totals.get('total', 0),
+        "rows": rows,
+        "vat_breakdown": _build_vat_breakdown(rows, discount_amount),
+        "company": {
+            "company_name": company_settings.get('company_name'),
+            "address_lines": address_lines,
+            "email": company_settings.get('email') or '',
+            "website": company_settings.get('website') or '',
+            "vat_number": company_settings.get('vat_number') or '',
+            "logo_url": company_settings.get('logo_url') or '',
+        },
+        "bank": {
+            "name_branch": company_settings.get('bank_name_branch') or '',
+            "address_lines": [x for x in [company_settings.get('bank_address_line1'), company_settings.get('bank_address_line2')] if x],
+            "account_number": company_settings.get('account_number') or '',
+            "iban": company_settings.get('iban') or '',
+            "bic_swift": company_settings.get('bic_swift') or '',
+        },
+    }
+
+
+def render_quotation_html(
+    quotation_data: Dict[str, Any],
+    logo_src: Optional[str] = None,
+    logo_embedded: bool = False,
+    inline_stylesheet: bool = True,
+) -> str:
+    """
+    Render the quotation HTML. `logo_src` is the resolved image source (data URI or URL);
+    `inline_stylesheet=False` leaves out the <style> block for engines that apply the
+    stylesheet themselves.
+    """
+    context = build_quotation_context(quotation_data)
+    return quotation_template.render(
+        **context,
+        logo_src=logo_src,
+        logo_embedded=logo_embedded,
+        inline_stylesheet=inline_stylesheet,
+    )
@@ -0,0 +1,168 @@
+"""
+Static reference data (countries, VAT rate presets, currencies).
+
+Each dataset is validated, indexed by its key and serialized to JSON once at import,
+so requests are answered with prebuilt bytes. Responses carry a strong ETag derived
+from the bytes and a long Cache-Control; browsers reuse their copy and revalidate
+with a 304 once it expires. The ETag only changes when the data in this module does.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request, Response
+
+# Browsers may reuse the data for a day, then revalidate (usually a 304)
+CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+
+COUNTRIES: List[Dict[str, str]] = [
+    {"code": "IT", "name": "Italy"},
+    {"code": "DE", "name": "Germany"},
+    {"code": "FR", "name": "France"},
+    {"code": "ES", "name": "Spain"},
+    {"code": "NL", "name": "Netherlands"},
+    {"code": "BE", "name": "Belgium"},
+    {"code": "AT", "name": "Austria"},
+    {"code": "CH", "name": "Switzerland"},
+    {"code": "GB", "name": "United Kingdom"},
+    {"code": "IE", "name": "Ireland"},
+    {"code": "PT", "name": "Portugal"},
+    {"code": "GR", "name": "Greece"},
+    {"code": "PL", "name": "Poland"},
+    {"code": "CZ", "name": "Czech Republic"},
+    {"code": "HU", "name": "Hungary"},
+    {"code": "SK", "name": "Slovakia"},
+    {"code": "SI", "name": "Slovenia"},
+    {"code": "HR", "name": "Croatia"},
+    {"code": "RO", "name": "Romania"},
+    {"code": "BG", "name": "Bulgaria"},
+    {"code": "EE", "name": "Estonia"},
+    {"code": "LV", "name": "Latvia"},
+    {"code": "LT", "name": "Lithuania"},
+    {"code": "FI", "name": "Finland"},
+    {"code": "SE", "name": "Sweden"},
+    {"code": "NO", "name": "Norway"},
+    {"code": "DK", "name": "Denmark"},
+    {"code": "US", "name": "United States"},
+    {"code": "CA", "name": "Canada"},
+    {"code": "AU", "name": "Australia"},
+    {"code": "NZ", "name": "New Zealand"},
+    {"code": "JP", "name": "Japan"},
+    {"code": "KR", "name": "South Korea"},
+    {"code": "CN", "name": "China"},
+    {"code": "IN", "name": "India"},
+    {"code": "BR", "name": "Brazil"},
+    {"code": "AR", "name": "Argentina"},
+    {"code": "MX", "name": "Mexico"},
+    {"code": "RU", "name": "Russia"},
+    {"code": "TR", "name": "Turkey"},
+    {"code": "ZA", "name": "South Africa"},
+    {"code": "EG", "name": "Egypt"},
+    {"code": "MA", "name": "Morocco"},
+    {"code": "NG", "name": "Nigeria"},
+    {"code": "KE", "name": "Kenya"},
+    {"code": "GH", "name": "Ghana"},
+    {"code": "ET", "name": "Ethiopia"},
+    {"code": "TZ", "name": "Tanzania"},
+    {"code": "UG", "name": "Uganda"},
+    {"code": "RW", "name": "Rwanda"},
+    {"code": "SN", "name": "Senegal"},
+    {"code": "CI", "name": "Ivory Coast"},
+    {"code": "ML", "name": "Mali"},
+    {"code": "BF", "name": "Burkina Faso"},
+    {"code": "NE", "name": "Niger"},
+    {"code": "TD", "name": "Chad"},
+    {"code": "CM", "name": "Cameroon"},
+    {"code": "CF", "name": "Central African Republic"},
+    {"code": "CD", "name": "Democratic Republic of the Congo"},
+    {"code": "CG", "name": "Republic of the Congo"},
+    {"code": "GA", "name": "Gabon"},
+    {"code": "GQ", "name": "Equatorial Guinea"},
+    {"code": "ST", "name": "São Tomé and Príncipe"},
+    {"code": "AO", "name": "Angola"},
+    {"code": "ZM", "name": "Zambia"},
+    {"code": "ZW", "name": "Zimbabwe"},
+    {"code": "BW", "name": "Botswana"},
+    {"code": "NA", "name": "Namibia"},
+    {"code": "SZ", "name": "Eswatini"},
+    {"code": "LS", "name": "Lesotho"},
+    {"code": "MG", "name": "Madagascar"},
+    {"code": "MU", "name": "Mauritius"},
+    {"code": "SC", "name": "Seychelles"},
+    {"code": "KM", "name": "Comoros"},
+    {"code": "DJ", "name": "Djibouti"},
+    {"code": "SO", "name": "Somalia"},
+    {"code": "ER", "name": "Eritrea"},
+    {"code": "SD", "name": "Sudan"},
+    {"code": "SS", "name": "South Sudan"},
+    {"code": "LY", "name": "Libya"},
+    {"code": "TN", "name": "Tunisia"},
+    {"code": "DZ", "name": "Algeria"},
+    {"code": "MR", "name": "Mauritania"},
+    {"code": "OTHER", "name": "Other"}
+]
+
+# Italian VAT rates (aliquote IVA) offered when pricing products and quote lines
+VAT_RATES: List[Dict[str, Any]] = [
+    {"code": "22", "rate": 22.0, "name": "Standard rate"},
+    {"code": "10", "rate": 10.0, "name": "Reduced rate"},
+    {"code": "5", "rate": 5.0, "name": "Reduced rate (special)"},
+    {"code": "4", "rate": 4.0, "name": "Super-reduced rate"},
+    {"code": "0", "rate": 0.0, "name": "Exempt / non-taxable"},
+]
+
+CURRENCIES: List[Dict[str, Any]] = [
+    {"code": "EUR", "name": "Euro", "symbol": "€", "decimals": 2},
+    {"code": "USD", "name": "US Dollar", "symbol": "$", "decimals": 2},
+    {"code": "GBP", "name": "British Pound", "symbol": "£", "decimals": 2},
+    {"code": "CHF", "name": "Swiss Franc", "symbol": "CHF", "decimals": 2},
+]
+
+
+def _serialize(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ReferenceDataset:
+    """An immutable list of records, indexed by `key` (case-insensitive) and pre-serialized"""
+
+    def __init__(self, name: str, items: List[Dict[str, Any]], key: str = "code"):
+        self.name = name
+        self.items = items
+        self.index: Dict[str, Dict[str, Any]] = {}
+        for item in items:
+            code = str(item[key]).upper()
+            if code in self.index:
+                raise ValueError(f"Duplicate {key} '{code}' in {name}")
+            self.index[code] = item
+        self.body = _serialize(items)
+        self._digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{self._digest}"'
+        self._item_bodies = {code: _serialize(item) for code, item in self.index.items()}
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        return self.index.get(code.upper())
+
+    def list_response(self, request: Request) -> Response:
+        return cached_json_response(request, self.body, self.etag)
+
+    def item_response(self, request: Request, code: str) -> Optional[Response]:
+        """Response for a single record, or None if the code is unknown"""
+        body = self._item_bodies.get(code.upper())
+        if body is None:
+            return None
+        # Every record changes only together with the dataset, so the dataset ETag is reused per code
+        return cached_json_response(request, body, f'"{self._digest}-{code.upper()}"')
+
+
+def cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+countries = ReferenceDataset("countries", COUNTRIES)
+vat_rates = ReferenceDataset("vat_rates", VAT_RATES)
+currencies = ReferenceDataset("currencies", CURRENCIES)
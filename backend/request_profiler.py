@@ -0,0 +1,337 @@
+"""
+On-demand profiling of single requests, for finding out in production why one quote
+is slow to save or print.
+
+An admin sends the request with an `X-Profile` header:
+- `X-Profile: sample` (or any other value): a sampling profiler records the stacks of
+  every thread each `profile_sample_interval_ms`, so PDF rendering and other work on
+  worker threads shows up too. Stored as collapsed stacks, which speedscope
+  (https://www.speedscope.app) and flamegraph.pl turn into flame graphs.
+- `X-Profile: cprofile`: cProfile on the event loop thread, every function call
+  counted. Stored as a pstats dump for snakeviz or `python -m pstats`.
+
+Either way every SQL statement the request runs is recorded with its duration. The
+profile is written to `profile_dir` (the newest `profile_keep` are kept) and its id
+comes back in the `X-Profile-Id` response header; /api/profiles lists the profiles
+and serves them. Profiling is off unless `request_profiling_enabled` is set. The
+header is ignored unless the request carries a valid access token of an admin (a
+request without a token never qualifies, even while `auth_required` is off), and
+while another request is being profiled on the same worker. Profilers see the whole worker, so requests
+running at the same time show up in the stacks as well (not in the SQL list).
+"""
+import asyncio
+import cProfile
+import contextvars
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from auth import get_current_user, require_authenticated_admin
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ID_RE = re.compile(r"\d{8}-\d{6}-[0-9a-f]{8}")
+ARTIFACT_SUFFIXES = {"sample": ".collapsed.txt", "cprofile": ".prof"}
+SUMMARY_KEYS = ("id", "mode", "method", "path", "query", "status", "started_at", "duration_ms", "sql_count", "sql_ms")
+_MAX_STATEMENT_CHARS = 2000
+
+
+class _StackSampler(threading.Thread):
+    """Counts the stacks of all other threads every `interval` seconds"""
+
+    def __init__(self, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if _is_idle_worker(frames):
+                    continue
+                self.stacks[";".join([names.get(thread_id, str(thread_id)), *reversed(frames)])] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _is_idle_worker(frames: List[str]) -> bool:
+    # Pool threads waiting for work would fill the graph with noise
+    return bool(frames) and frames[0].startswith(("wait (threading.py", "get (queue.py", "_worker (thread.py"))
+
+
+class RequestProfile:
+    def __init__(self, scope: Scope, mode: str):
+        self.id = f"{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
+        self.mode = mode
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query = scope.get("query_string", b"").decode("latin-1")
+        self.started_at = datetime.now(timezone.utc)
+        self.status: Optional[int] = None
+        self.duration = 0.0
+        self.statements: List[Dict[str, Any]] = []
+        self._start = 0.0
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_StackSampler] = None
+
+    def start(self) -> None:
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._sampler = _StackSampler(settings.profile_sample_interval_ms / 1000)
+            self._sampler.start()
+        self._start = time.perf_counter()
+
+    def stop(self) -> None:
+        self.duration = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+
+    def record_statement(self, statement: str, seconds: float, executemany: bool) -> None:
+        self.statements.append({
+            "offset_ms": round((time.perf_counter() - self._start - seconds) * 1000, 3),
+            "duration_ms": round(seconds * 1000, 3),
+            "statement": statement[:_MAX_STATEMENT_CHARS],
+            "executemany": executemany,
+        })
+
+    def _top_functions(self, limit: int = 40) -> List[Dict[str, Any]]:
+        if self._profiler is not None:
+            stats = pstats.Stats(self._profiler, stream=io.StringIO())
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+            return [
+                {
+                    "function": f"{name} ({os.path.basename(filename)}:{line})",
+                    "calls": calls,
+                    "own_ms": round(own * 1000, 3),
+                    "cumulative_ms": round(cumulative * 1000, 3),
+                }
+                for (filename, line, name), (_, calls, own, cumulative, _) in rows
+            ]
+        # Sampled: frames by the share of samples they appear in (inclusive) or are on top of (own)
+        inclusive: Counter = Counter()
+        own: Counter = Counter()
+        for stack, count in self._sampler.stacks.items():
+            frames = stack.split(";")[1:]
+            for frame in set(frames):
+                inclusive[frame] += count
+            if frames:
+                own[frames[-1]] += count
+        samples = max(self._sampler.samples, 1)
+        return [
+            {"function": frame, "samples": count, "inclusive_pct": round(count / samples * 100, 1),
+             "own_pct": round(own[frame] / samples * 100, 1)}
+            for frame, count in inclusive.most_common(limit)
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        sql_ms = sum(statement["duration_ms"] for statement in self.statements)
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "sql_count": len(self.statements),
+            "sql_ms": round(sql_ms, 3),
+        }
+
+    def write(self, directory: Path) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        artifact = directory / (self.id + ARTIFACT_SUFFIXES[self.mode])
+        if self._profiler is not None:
+            self._profiler.dump_stats(str(artifact))
+        else:
+            artifact.write_text("".join(f"{stack} {count}\n" for stack, count in self._sampler.stacks.items()))
+        document = {
+            **self.summary(),
+            "samples": self._sampler.samples if self._sampler is not None else None,
+            "top_functions": self._top_functions(),
+            "sql": self.statements,
+        }
+        tmp = directory / (self.id + ".json.tmp")
+        tmp.write_text(json.dumps(document, indent=1))
+        tmp.replace(directory / (self.id + ".json"))
+
+
+_current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "current_profile", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is not None and starts:
+        profile.record_statement(statement, time.perf_counter() - starts.pop(), executemany)
+
+
+class RequestProfiler:
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or settings.profile_dir)
+        self._busy = False
+
+    def begin(self, scope: Scope, mode: str) -> Optional[RequestProfile]:
+        """A started profile, or None while another request is being profiled"""
+        if self._busy:
+            return None
+        self._busy = True
+        profile = RequestProfile(scope, mode)
+        try:
+            profile.start()
+        except Exception as e:  # e.g. another profiler is active in this process
+            self._busy = False
+            logger.warning(f"Could not profile {profile.method} {profile.path}: {e}")
+            return None
+        return profile
+
+    async def finish(self, profile: RequestProfile) -> None:
+        profile.stop()
+        self._busy = False
+        try:
+            await asyncio.to_thread(profile.write, self.directory)
+            await asyncio.to_thread(self._prune)
+        except OSError as e:
+            logger.warning(f"Could not store profile {profile.id}: {e}")
+            return
+        logger.info(
+            f"Profiled {profile.method} {profile.path} as {profile.id}: {profile.duration * 1000:.0f} ms, "
+            f"{len(profile.statements)} SQL statements"
+        )
+
+    def _documents(self) -> List[Path]:
+        """Stored profile documents, newest first"""
+        documents = []
+        for path in self.directory.glob("*.json"):
+            try:
+                documents.append((path.stat().st_mtime, path))
+            except OSError:  # pruned meanwhile
+                continue
+        return [path for _, path in sorted(documents, reverse=True)]
+
+    def _prune(self) -> None:
+        for document in self._documents()[settings.profile_keep:]:
+            profile_id = document.name[:-len(".json")]
+            for path in self.directory.glob(profile_id + ".*"):
+                path.unlink(missing_ok=True)
+
+    def list(self, limit: int) -> List[Dict[str, Any]]:
+        profiles = []
+        for document in self._documents()[:limit]:
+            try:
+                data = json.loads(document.read_text())
+            except (OSError, ValueError):
+                continue
+            profiles.append({key: data.get(key) for key in SUMMARY_KEYS})
+        return profiles
+
+    def _path(self, profile_id: str, suffix: str) -> Optional[Path]:
+        if not PROFILE_ID_RE.fullmatch(profile_id):
+            return None
+        path = self.directory / (profile_id + suffix)
+        return path if path.exists() else None
+
+    def document(self, profile_id: str) -> Optional[Path]:
+        return self._path(profile_id, ".json")
+
+    def artifact(self, profile_id: str) -> Optional[Path]:
+        for suffix in ARTIFACT_SUFFIXES.values():
+            path = self._path(profile_id, suffix)
+            if path is not None:
+                return path
+        return None
+
+
+request_profiler = RequestProfiler()
+
+
+async def _is_admin(headers: Headers) -> bool:
+    """Same rule as require_authenticated_admin, for a request that has not reached a route yet"""
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        await require_authenticated_admin(
+            await get_current_user(HTTPAuthorizationCredentials(scheme=scheme, credentials=token))
+        )
+    except HTTPException:
+        return False
+    return True
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        mode = headers.get("x-profile")
+        if not mode or not await _is_admin(headers):
+            await self.app(scope, receive, send)
+            return
+        profile = request_profiler.begin(scope, "cprofile" if mode.strip().lower() == "cprofile" else "sample")
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                MutableHeaders(raw=message.setdefault("headers", []))["X-Profile-Id"] = profile.id
+            await send(message)
+
+        token = _current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            await request_profiler.finish(profile)
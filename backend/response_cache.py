@@ -0,0 +1,349 @@
+"""
+Read-through cache of serialized GET responses.
+
+Handlers opt in with `@response_cache.cached(ResponseModel, tags=...)` placed under
+the route decorator. On a miss the handler runs and its result is validated and
+serialized with the response model, exactly once; the JSON bytes are stored under
+a key made of the handler name and its plain (str/int/float/bool) parameters and
+served as they are on later hits, with an `X-Cache: HIT` header.
+
+Entries carry tags such as "quotes" (every quote list) or "quote:42"; write handlers
+call `await response_cache.invalidate(...)` with the tags they affect after their
+commit. Entries also expire after `response_cache_ttl` seconds.
+
+Backends (`response_cache_backend`):
+- "memory": LRU per worker process, bounded by `response_cache_max_bytes`. Other
+  workers only see a write once their entry expires; the client that wrote skips
+  the cache for `response_cache_ttl` seconds (last-write cookie, see db.py), so it
+  always sees its own changes. For a shared cache use:
+- "redis": shared by all workers (`response_cache_redis_url`, needs the redis
+  package). benchmarks/redis_standin.py is a small in-process stand-in for tests.
+
+Concurrent misses for the same key run the handler once and share its JSON
+(`single_flight_enabled`, see singleflight.py); this also holds with the cache
+disabled, or while its backend is unreachable.
+
+A result computed while an invalidation happened is not stored, so a slow miss can
+not put back data older than the write. With a read replica the same applies for
+`read_your_writes_seconds` after every invalidation, while the replica may lag.
+Hit ratios per handler are served at /api/metrics/response-cache.
+"""
+import functools
+import inspect
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from config import settings
+from db import replica_engine, wrote_recently
+from singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+Tags = Union[Iterable[str], Callable[[Any], Iterable[str]]]
+
+
+@dataclass
+class _Entry:
+    body: bytes
+    expires_at: float
+    tags: Tuple[str, ...]
+
+
+class MemoryBackend:
+    """LRU of serialized responses in this process"""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._generation = 0
+        self._invalidated_at = 0.0
+        self.size = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.body
+
+    async def state(self) -> Tuple[int, float]:
+        return self._generation, self._invalidated_at
+
+    async def set(self, key: str, body: bytes, tags: Tuple[str, ...], ttl: float, generation: int) -> bool:
+        if generation != self._generation:
+            return False
+        self._remove(key)
+        self._entries[key] = _Entry(body, time.monotonic() + ttl, tags)
+        self.size += len(body)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while self.size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return True
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        self._generation += 1
+        self._invalidated_at = time.time()
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= len(entry.body)
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": self.name, "entries": len(self._entries), "bytes": self.size, "evictions": self.evictions}
+
+    async def close(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+        self.size = 0
+
+
+class RedisBackend:
+    """
+    Entries shared by all workers. Each tag is a Redis set of the entry keys that
+    carry it; invalidating a tag deletes its members and bumps a generation counter.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "response-cache:"):
+        import redis.asyncio as redis  # optional dependency, only needed for this backend
+
+        self._redis = redis.from_url(url)
+        self._prefix = prefix
+        self._generation_key = prefix + "generation"
+        self._invalidated_at_key = prefix + "invalidated-at"
+
+    def _entry_key(self, key: str) -> str:
+        return self._prefix + "entry:" + key
+
+    def _tag_key(self, tag: str) -> str:
+        return self._prefix + "tag:" + tag
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(self._entry_key(key))
+
+    async def state(self) -> Tuple[int, float]:
+        generation, invalidated_at = await self._redis.mget(self._generation_key, self._invalidated_at_key)
+        return int(generation or 0), float(invalidated_at or 0)
+
+    async def set(self, key: str, body: bytes, tags: Tuple[str, ...], ttl: float, generation: int) -> bool:
+        current = await self._redis.get(self._generation_key)
+        if int(current or 0) != generation:
+            return False
+        ttl_ms = max(int(ttl * 1000), 1)
+        entry_key = self._entry_key(key)
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.set(entry_key, body, px=ttl_ms)
+        for tag in tags:
+            pipe.sadd(self._tag_key(tag), entry_key)
+            # A tag set lives as long as its newest entry
+            pipe.pexpire(self._tag_key(tag), ttl_ms)
+        await pipe.execute()
+        return True
+
+    async def invalidate(self, tags: Iterable[str]) -> None:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.incr(self._generation_key)
+        pipe.set(self._invalidated_at_key, repr(time.time()))
+        for tag_key in tag_keys:
+            pipe.smembers(tag_key)
+        results = await pipe.execute()
+        entry_keys = {key for members in results[2:] for key in members}
+        await self._redis.delete(*entry_keys, *tag_keys)
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class ResponseCache:
+    def __init__(self):
+        self._backend: Optional[Union[MemoryBackend, RedisBackend]] = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self.invalidations = 0
+        self.errors = 0
+
+    @property
+    def backend(self) -> Union[MemoryBackend, RedisBackend]:
+        if self._backend is None:
+            if settings.response_cache_backend == "redis":
+                self._backend = RedisBackend(settings.response_cache_redis_url)
+            else:
+                self._backend = MemoryBackend(settings.response_cache_max_bytes)
+        return self._backend
+
+    def read_your_writes_seconds(self) -> float:
+        """How long after a write its client gets neither cached nor shared in-flight results"""
+        seconds = settings.read_your_writes_seconds if replica_engine is not None else 0.0
+        if settings.response_cache_enabled and settings.response_cache_backend == "memory":
+            # Other workers' entries only expire
+            seconds = max(seconds, settings.response_cache_ttl)
+        return seconds
+
+    def use_backend(self, backend: Union[MemoryBackend, RedisBackend]) -> None:
+        """Replace the backend (benchmarks and tests)"""
+        self._backend = backend
+
+    def _count(self, name: str, event: str) -> None:
+        stats = self._stats.setdefault(
+            name, {"hits": 0, "misses": 0, "bypassed": 0, "coalesced": 0, "stores": 0, "not_stored": 0}
+        )
+        stats[event] += 1
+
+    @staticmethod
+    def _key(name: str, params: Dict[str, Any]) -> str:
+        plain = sorted((k, "" if v is None else str(v)) for k, v in params.items() if isinstance(v, _PLAIN_TYPES))
+        return f"{name}?{urlencode(plain)}"
+
+    def cached(self, model: Any, tags: Tags) -> Callable:
+        """
+        Cache a GET handler's JSON. `model` is the route's response model; `tags` is a
+        list of tags or a function of the handler's result returning them.
+        """
+        adapter: List[TypeAdapter] = []
+
+        def decorator(func: Callable) -> Callable:
+            name = f"{func.__module__}.{func.__name__}"
+
+            async def compute(key: str, kwargs: Dict[str, Any], state: Optional[Tuple[int, float]]) -> Union[bytes, Response]:
+                result = await func(**kwargs)
+                if isinstance(result, Response):
+                    if result.status_code != 200 or result.media_type != "application/json":
+                        return result
+                    body = result.body
+                else:
+                    if not adapter:
+                        adapter.append(TypeAdapter(model))
+                    body = adapter[0].dump_json(adapter[0].validate_python(result, from_attributes=True))
+                if state is not None:
+                    await self._store(name, key, body, tags(result) if callable(tags) else tags, state)
+                return body
+
+            @functools.wraps(func)
+            async def wrapper(_cache_request: Request, **kwargs):
+                if not settings.response_cache_enabled and not settings.single_flight_enabled:
+                    return await func(**kwargs)
+                if wrote_recently(_cache_request, self.read_your_writes_seconds()):
+                    # Neither a cached nor a shared in-flight result may predate the client's write
+                    self._count(name, "bypassed")
+                    return await func(**kwargs)
+                key = self._key(name, kwargs)
+                state = None
+                if settings.response_cache_enabled:
+                    try:
+                        body = await self.backend.get(key)
+                        state = await self.backend.state()
+                    except Exception as e:
+                        self.errors += 1
+                        logger.warning(f"Response cache unavailable, serving {name} uncached: {e}")
+                        body, state = None, None
+                    if body is not None:
+                        self._count(name, "hits")
+                        return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+                    self._count(name, "misses")
+
+                if settings.single_flight_enabled:
+                    body, shared = await single_flight.do(key, lambda: compute(key, kwargs, state))
+                    if shared:
+                        self._count(name, "coalesced")
+                else:
+                    body = await compute(key, kwargs, state)
+                if isinstance(body, Response):
+                    return body
+                headers = {"X-Cache": "MISS"} if state is not None else None
+                return Response(content=body, media_type="application/json", headers=headers)
+
+            # FastAPI reads the handler's parameters from this signature; add the request
+            signature = inspect.signature(func)
+            wrapper.__signature__ = signature.replace(parameters=[
+                *signature.parameters.values(),
+                inspect.Parameter("_cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            ])
+            return wrapper
+
+        return decorator
+
+    async def _store(self, name: str, key: str, body: bytes, tags: Iterable[str], state: Tuple[int, float]) -> None:
+        generation, invalidated_at = state
+        # The replica may not have the last write yet; don't keep what we read from it
+        replica_lagging = replica_engine is not None and time.time() - invalidated_at < settings.read_your_writes_seconds
+        if len(body) > settings.response_cache_max_entry_bytes or replica_lagging:
+            self._count(name, "not_stored")
+            return
+        try:
+            stored = await self.backend.set(key, body, tuple(tags), settings.response_cache_ttl, generation)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Failed to store {name} in the response cache: {e}")
+            return
+        self._count(name, "stores" if stored else "not_stored")
+
+    async def invalidate(self, *tags: str) -> None:
+        """Drop every entry carrying one of `tags`; call after the write is committed"""
+        if not settings.response_cache_enabled:
+            return
+        self.invalidations += 1
+        try:
+            await self.backend.invalidate(tags)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Failed to invalidate response cache tags {tags}: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        hits = sum(s["hits"] for s in self._stats.values())
+        misses = sum(s["misses"] for s in self._stats.values())
+        return {
+            "enabled": settings.response_cache_enabled,
+            "ttl_seconds": settings.response_cache_ttl,
+            **(self.backend.info() if settings.response_cache_enabled else {}),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "single_flight": single_flight.snapshot(),
+            "endpoints": {
+                name: {**s, "hit_ratio": round(s["hits"] / (s["hits"] + s["misses"]), 4) if s["hits"] + s["misses"] else None}
+                for name, s in sorted(self._stats.items())
+            },
+        }
+
+    async def close(self) -> None:
+        if self._backend is not None:
+            await self._backend.close()
+            self._backend = None
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,63 @@
+import asyncio
+import mimetypes
+from typing import Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import FileResponse
+from auth import get_current_user_role
+from blob_store import BlobError, blob_store
+from config import settings
+from schemas import BlobRead
+
+router = APIRouter(prefix="/api/blobs", tags=["Blobs"])
+
+# Blob names are content hashes, so a URL always returns the same bytes
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+
+@router.post("", response_model=BlobRead)
+async def upload_blob(file: UploadFile = File(...), current_role: str = Depends(get_current_user_role)):
+    """Store an image and return its short URL, to be saved as logo_url or profile_picture_url"""
+    max_bytes = settings.max_file_size_mb * 1024 * 1024
+    data = await file.read(max_bytes + 1)
+    content_type = file.content_type
+    if not content_type or content_type == "application/octet-stream":
+        content_type = mimetypes.guess_type(file.filename or "")[0] or ""
+    try:
+        name = await asyncio.to_thread(blob_store.put, data, content_type)
+    except BlobError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return BlobRead(name=name, url=blob_store.url_for(name), size=len(data), content_type=blob_store.content_type_for(name))
+
+
+@router.get("/{name}")
+async def get_blob(
+    name: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=16, le=2048),
+    h: Optional[int] = Query(None, ge=16, le=2048),
+):
+    """Stored image, optionally scaled to fit w x h (thumbnails are generated once)"""
+    try:
+        path = blob_store.path_for(name)
+    except BlobError:
+        raise HTTPException(404, "Not found")
+    if not path.exists():
+        raise HTTPException(404, "Not found")
+
+    etag = f'"{name.split(".", 1)[0]}-{w or 0}x{h or 0}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE,
+        # SVG can carry scripts; never let a blob run in the app's origin
+        "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'",
+        "X-Content-Type-Options": "nosniff",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    media_type = blob_store.content_type_for(name)
+    if w or h:
+        thumb = await blob_store.thumbnail(name, w or h, h or w)
+        if thumb != path:
+            path, media_type = thumb, "image/png"
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -1,24 +1,22 @@
+import asyncio
 from config import settings as app_settings
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from db import get_session
+from auth import get_current_user
 from models import CompanySettings
 from schemas import CompanySettingsRead, CompanySettingsUpdate
+from logo_cache import logo_cache
+from blob_store import BlobError, blob_store
+from settings_cache import company_settings_cache
 
-router = APIRouter(prefix="/api/company-settings", tags=["CompanySettings"])
+router = APIRouter(prefix="/api/company-settings", tags=["CompanySettings"], dependencies=[Depends(get_current_user)])
 
 @router.get("", response_model=CompanySettingsRead)
-async def get_company_settings(session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(CompanySettings).limit(1))
-    company_settings = result.scalars().first()
-    if not company_settings:
-        company_settings = CompanySettings(company_name=app_settings.default_company_name, default_vat_rate=app_settings.default_vat_rate)
-        session.add(company_settings)
-        await session.commit()
-        await session.refresh(company_settings)
-        # replaced: settings = company_settings
-    return company_settings
+async def get_company_settings():
+    # Served from the in-process snapshot; the row is created with defaults on first use
+    return await company_settings_cache.get()
 
 @router.put("", response_model=CompanySettingsRead)
 async def update_company_settings(payload: CompanySettingsUpdate, session: AsyncSession = Depends(get_session)):
@@ -29,9 +27,24 @@ async def update_company_settings(payload: CompanySettingsUpdate, session: Async
         session.add(company_settings)
         await session.flush()
 
-    for field, value in payload.model_dump(exclude_unset=True).items():
+    previous_logo_url = company_settings.logo_url
+    update_data = payload.model_dump(exclude_unset=True)
+    if "logo_url" in update_data:
+        # Older clients send the logo inline; keep only a short blob URL in the row
+        try:
+            update_data["logo_url"] = await asyncio.to_thread(blob_store.externalize, update_data["logo_url"])
+        except BlobError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid logo: {e}")
+    for field, value in update_data.items():
         setattr(company_settings, field, value)
 
+    await company_settings_cache.notify_change(session)
     await session.commit()
     await session.refresh(company_settings)
+    company_settings_cache.set(company_settings)
+
+    # Drop the cached logo and warm the new one so the next PDF doesn't wait for the download
+    if company_settings.logo_url != previous_logo_url:
+        logo_cache.invalidate(previous_logo_url)
+        logo_cache.schedule_refresh(company_settings.logo_url)
     return company_settings
\ No newline at end of file
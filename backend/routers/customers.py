@@ -1,18 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_
-from db import get_session
+from db import get_session, get_read_session
 from models import Customer
 from schemas import CustomerCreate, CustomerRead, CustomerUpdate
+from response_cache import response_cache
+from auth import get_current_user
 
-router = APIRouter(prefix="/api/customers", tags=["Customers"])
+router = APIRouter(prefix="/api/customers", tags=["Customers"], dependencies=[Depends(get_current_user)])
 
 @router.get("", response_model=list[CustomerRead])
+@response_cache.cached(list[CustomerRead], tags=["customers"])
 async def list_customers(
     q: str | None = Query(None),
     skip: int = 0,
     limit: int = 50,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     stmt = select(Customer).where(Customer.archived == False).offset(skip).limit(limit)
     if q:
@@ -39,13 +42,15 @@ async def create_customer(payload: CustomerCreate, session: AsyncSession = Depen
     session.add(customer)
     await session.commit()
     await session.refresh(customer)
+    await response_cache.invalidate("customers")
     
     # created_date is automatically populated by the property in the model
     
     return customer
 
 @router.get("/{customer_id}", response_model=CustomerRead)
-async def get_customer(customer_id: int, session: AsyncSession = Depends(get_session)):
+@response_cache.cached(CustomerRead, tags=lambda customer: [f"customer:{customer.id}"])
+async def get_customer(customer_id: int, session: AsyncSession = Depends(get_read_session)):
     res = await session.execute(select(Customer).where(Customer.id == customer_id))
     customer = res.scalar_one_or_none()
     if not customer:
@@ -71,6 +76,8 @@ async def update_customer(customer_id: int, payload: CustomerUpdate, session: As
         setattr(customer, k, v)
     await session.commit()
     await session.refresh(customer)
+    # Quote lists show the customer's name
+    await response_cache.invalidate("customers", f"customer:{customer_id}", "quotes")
     
     # created_date is automatically populated by the property in the model
     
@@ -84,4 +91,5 @@ async def delete_customer(customer_id: int, session: AsyncSession = Depends(get_
         raise HTTPException(404, "Customer not found")
     await session.delete(customer)
     await session.commit()
+    await response_cache.invalidate("customers", f"customer:{customer_id}", "quotes")
     return customer
\ No newline at end of file
@@ -1,8 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from typing import Optional
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import get_session, get_read_session
+from models import EmailOutbox
 from email_service import email_service
+from email_outbox import email_outbox
+from bulk_email import bulk_mailer, is_unresolved
+from schemas import BulkEmailJobRead, BulkQuotationEmailRequest
 from auth import get_current_user_role
+from config import settings
 
 router = APIRouter(prefix="/api/email", tags=["email"])
 
@@ -17,6 +25,20 @@ class QuotationEmailRequest(BaseModel):
     company_email: str = ""
     quotation_data: Optional[dict] = None
 
+class EmailOutboxRead(BaseModel):
+    id: int
+    to_email: str
+    subject: str
+    status: str
+    attempts: int
+    max_attempts: int
+    next_attempt_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    sent_at: Optional[datetime] = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
 class TestEmailRequest(BaseModel):
     to_email: EmailStr
 
@@ -31,34 +53,95 @@ class EmailConfigRequest(BaseModel):
     mail_ssl: bool = False
     mail_use_credentials: bool = True
 
-@router.post("/send-quotation")
+@router.post("/send-quotation", status_code=202)
 async def send_quotation_email(
     request: QuotationEmailRequest,
+    session: AsyncSession = Depends(get_session),
     current_role: str = Depends(get_current_user_role)
 ):
     """
-    Send quotation email to customer
+    Queue a quotation email; the PDF is rendered and sent by the outbox workers.
+    Delivery progress is available at /api/email/outbox/{id}.
     """
-    try:
-        success = await email_service.send_quotation_email(
-            to_email=request.to_email,
-            customer_name=request.customer_name,
-            quotation_number=request.quotation_number,
-            total_amount=request.total_amount,
-            valid_until=request.valid_until,
-            notes=request.notes,
-            company_name=request.company_name,
-            company_email=request.company_email,
-            quotation_data=request.quotation_data
-        )
-        
-        if success:
-            return {"message": "Quotation email sent successfully", "success": True}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to send email")
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Email sending failed: {str(e)}")
+    if not email_service.is_configured:
+        raise HTTPException(status_code=500, detail="Email service is not configured")
+
+    message = await email_outbox.enqueue_quotation(session, request.model_dump(mode="json"))
+    return {
+        "message": "Quotation email queued for delivery",
+        "success": True,
+        "outbox_id": message.id,
+        "status": message.status,
+    }
+
+@router.post("/send-quotations/bulk", status_code=202)
+async def send_quotations_bulk(
+    request: BulkQuotationEmailRequest,
+    session: AsyncSession = Depends(get_session),
+    current_role: str = Depends(get_current_user_role)
+):
+    """
+    Queue stored quotes for many recipients in the outbox. Each distinct quote is
+    rendered once; per-recipient results are available at
+    /api/email/send-quotations/bulk/{job_id}.
+    """
+    if not email_service.is_configured:
+        raise HTTPException(status_code=500, detail="Email service is not configured")
+    if len(request.quote_ids) + len(request.recipients) > settings.bulk_email_max_recipients:
+        raise HTTPException(status_code=400, detail=f"Too many recipients (max {settings.bulk_email_max_recipients})")
+
+    job = await bulk_mailer.start(session, request)
+    return {"job_id": job.id, "total": job.total, "status": job.status}
+
+@router.get("/send-quotations/bulk/{job_id}", response_model=BulkEmailJobRead)
+async def get_bulk_email_job(
+    job_id: str,
+    session: AsyncSession = Depends(get_read_session),
+    current_role: str = Depends(get_current_user_role)
+):
+    job = await bulk_mailer.get_job(session, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Bulk email job not found")
+    return BulkEmailJobRead.model_validate(job, from_attributes=True)
+
+@router.get("/outbox")
+async def get_outbox_status(
+    session: AsyncSession = Depends(get_read_session),
+    current_role: str = Depends(get_current_user_role)
+):
+    """
+    Number of queued, in-flight, sent and failed emails
+    """
+    return await email_outbox.status_counts(session)
+
+@router.get("/outbox/{message_id}", response_model=EmailOutboxRead)
+async def get_outbox_message(
+    message_id: int,
+    session: AsyncSession = Depends(get_read_session),
+    current_role: str = Depends(get_current_user_role)
+):
+    message = await session.get(EmailOutbox, message_id)
+    if not message:
+        raise HTTPException(status_code=404, detail="Email not found")
+    return message
+
+@router.post("/outbox/{message_id}/retry", response_model=EmailOutboxRead)
+async def retry_outbox_message(
+    message_id: int,
+    session: AsyncSession = Depends(get_session),
+    current_role: str = Depends(get_current_user_role)
+):
+    """
+    Requeue an email that failed permanently
+    """
+    message = await session.get(EmailOutbox, message_id)
+    if not message:
+        raise HTTPException(status_code=404, detail="Email not found")
+    if message.status != "failed":
+        raise HTTPException(status_code=400, detail="Only failed emails can be retried")
+    if is_unresolved(message):
+        raise HTTPException(status_code=400, detail=f"Nothing to retry: {message.last_error}")
+    return await email_outbox.retry(session, message)
 
 @router.post("/send-test")
 async def send_test_email(
@@ -79,6 +162,15 @@ async def send_test_email(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Test email sending failed: {str(e)}")
 
+@router.get("/smtp-stats")
+async def get_smtp_stats(current_role: str = Depends(get_current_user_role)):
+    """
+    Connection reuse and rate limiting counters of the pooled SMTP client
+    """
+    if email_service.smtp_pool is None:
+        return {"configured": False}
+    return {"configured": True, **email_service.smtp_pool.snapshot()}
+
 @router.get("/config-status")
 async def get_email_config_status(current_role: str = Depends(get_current_user_role)):
     """
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends
+from auth import require_admin_role
+from db import pool_status
+from load_shedding import load_shedder
+from pdf_engines import render_pool_status
+from response_cache import response_cache
+
+router = APIRouter(prefix="/api/metrics", tags=["Metrics"])
+
+
+@router.get("/db-pool")
+async def get_db_pool_metrics(_: str = Depends(require_admin_role)):
+    """Database connection pool gauges (checked out, overflow) and checkout wait times"""
+    return pool_status()
+
+
+@router.get("/response-cache")
+async def get_response_cache_metrics(_: str = Depends(require_admin_role)):
+    """Response cache hit ratios, overall and per endpoint, and backend size"""
+    return response_cache.snapshot()
+
+
+@router.get("/load-shedding")
+async def get_load_shedding_metrics(_: str = Depends(require_admin_role)):
+    """Per-route concurrency caps: running, queued, admitted and shed requests, and missed deadlines"""
+    return load_shedder.snapshot()
+
+
+@router.get("/pdf-render")
+async def get_pdf_render_metrics(_: str = Depends(require_admin_role)):
+    """In-process PDF render pools: hung and abandoned renders, retired pools"""
+    return render_pool_status()
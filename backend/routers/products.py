@@ -2,27 +2,47 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_
 from datetime import datetime
-from db import get_session
+from config import settings
+from db import get_session, get_read_session
+from fast_json import FastJSONResponse, rows_to_dicts
 from models import Product
+from response_cache import response_cache
 from schemas import ProductCreate, ProductRead, ProductUpdate
-from auth import require_admin_role
+from auth import get_current_user, require_admin_role
 
-router = APIRouter(prefix="/api/products", tags=["Products"])
+router = APIRouter(prefix="/api/products", tags=["Products"], dependencies=[Depends(get_current_user)])
+
+# ProductRead's fields, in its order, for the fast list path (fast_json.py)
+PRODUCT_READ_COLUMNS = (
+    Product.name, Product.sku, Product.description, Product.unit_price, Product.currency,
+    Product.category, Product.vat_rate, Product.active, Product.available_for_quotations,
+    Product.archived, Product.id,
+)
+PRODUCT_FLOAT_COLUMNS = ("unit_price", "vat_rate")
+
+def _list_columns():
+    return PRODUCT_READ_COLUMNS if settings.fast_list_serialization else (Product,)
+
+def _list_response(res):
+    if settings.fast_list_serialization:
+        return FastJSONResponse(rows_to_dicts(res, floats=PRODUCT_FLOAT_COLUMNS))
+    return res.scalars().all()
 
 @router.get("", response_model=list[ProductRead])
-async def list_products(q: str | None = Query(None), skip: int = 0, limit: int = 50, include_deleted: bool = False, session: AsyncSession = Depends(get_session)):
-    stmt = select(Product).offset(skip).limit(limit)
+@response_cache.cached(list[ProductRead], tags=["products"])
+async def list_products(q: str | None = Query(None), skip: int = 0, limit: int = 50, include_deleted: bool = False, session: AsyncSession = Depends(get_read_session)):
+    stmt = select(*_list_columns()).offset(skip).limit(limit)
     if not include_deleted:
         stmt = stmt.where(Product.deleted == False)
     if q:
         like = f"%{q}%"
-        stmt = select(Product).where(
+        stmt = select(*_list_columns()).where(
             or_(Product.name.ilike(like), Product.sku.ilike(like), Product.category.ilike(like))
         ).offset(skip).limit(limit)
         if not include_deleted:
             stmt = stmt.where(Product.deleted == False)
     res = await session.execute(stmt)
-    return res.scalars().all()
+    return _list_response(res)
 
 @router.post("", response_model=ProductRead, status_code=201)
 async def create_product(payload: ProductCreate, session: AsyncSession = Depends(get_session)):
@@ -30,15 +50,18 @@ async def create_product(payload: ProductCreate, session: AsyncSession = Depends
     session.add(product)
     await session.commit()
     await session.refresh(product)
+    await response_cache.invalidate("products")
     return product
 
 @router.get("/deleted", response_model=list[ProductRead])
-async def list_deleted_products(session: AsyncSession = Depends(get_session)):
-    res = await session.execute(select(Product).where(Product.deleted == True).order_by(Product.deleted_at.desc()))
-    return res.scalars().all()
+@response_cache.cached(list[ProductRead], tags=["products"])
+async def list_deleted_products(session: AsyncSession = Depends(get_read_session)):
+    res = await session.execute(select(*_list_columns()).where(Product.deleted == True).order_by(Product.deleted_at.desc()))
+    return _list_response(res)
 
 @router.get("/{product_id}", response_model=ProductRead)
-async def get_product(product_id: int, session: AsyncSession = Depends(get_session)):
+@response_cache.cached(ProductRead, tags=lambda product: [f"product:{product.id}"])
+async def get_product(product_id: int, session: AsyncSession = Depends(get_read_session)):
     res = await session.execute(select(Product).where(Product.id == product_id))
     product = res.scalar_one_or_none()
     if not product:
@@ -55,6 +78,8 @@ async def update_product(product_id: int, payload: ProductUpdate, session: Async
         setattr(product, k, v)
     await session.commit()
     await session.refresh(product)
+    # Quotes show the product's name and SKU on their items
+    await response_cache.invalidate("products", f"product:{product_id}", "quotes")
     return product
 
 @router.delete("/{product_id}", response_model=ProductRead)
@@ -71,6 +96,7 @@ async def delete_product(product_id: int, session: AsyncSession = Depends(get_se
     product.deleted_at = datetime.utcnow()
     await session.commit()
     await session.refresh(product)
+    await response_cache.invalidate("products", f"product:{product_id}")
     return product
 
 @router.post("/{product_id}/restore", response_model=ProductRead)
@@ -87,4 +113,5 @@ async def restore_product(product_id: int, session: AsyncSession = Depends(get_s
     product.deleted_at = None
     await session.commit()
     await session.refresh(product)
+    await response_cache.invalidate("products", f"product:{product_id}")
     return product
\ No newline at end of file
@@ -0,0 +1,33 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from auth import TokenUser, require_authenticated_admin
+from request_profiler import request_profiler
+
+router = APIRouter(prefix="/api/profiles", tags=["Profiles"])
+
+
+@router.get("")
+async def list_profiles(limit: int = Query(20, ge=1, le=200), _: TokenUser = Depends(require_authenticated_admin)):
+    """Recent request profiles on this worker, newest first (send a request with X-Profile to add one)"""
+    return await asyncio.to_thread(request_profiler.list, limit)
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str, _: TokenUser = Depends(require_authenticated_admin)):
+    """Profile summary, hottest functions and the request's SQL statements with timings"""
+    path = request_profiler.document(profile_id)
+    if path is None:
+        raise HTTPException(404, "Profile not found")
+    return json.loads(await asyncio.to_thread(path.read_text))
+
+
+@router.get("/{profile_id}/download")
+async def download_profile(profile_id: str, _: TokenUser = Depends(require_authenticated_admin)):
+    """Raw profile: collapsed stacks (speedscope, flamegraph.pl) or a pstats dump (snakeviz)"""
+    path = request_profiler.artifact(profile_id)
+    if path is None:
+        raise HTTPException(404, "Profile not found")
+    media_type = "application/octet-stream" if path.suffix == ".prof" else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=path.name)
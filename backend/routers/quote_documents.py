@@ -0,0 +1,166 @@
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth import get_current_user
+from db import get_read_session, read_sessionmaker
+from config import settings
+from quote_documents import QuoteDocument, current_etag, load_company_settings, load_quote, quote_documents
+from quote_exports import quote_exporter
+from schemas import QuoteExportJobRead, QuoteExportRequest
+
+router = APIRouter(prefix="/api/quotes", tags=["Quotes"], dependencies=[Depends(get_current_user)])
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [c.strip() for c in header.split(",")]
+    # Weak comparison, as If-None-Match requires
+    return any(c.removeprefix("W/") == f'"{etag}"' for c in candidates)
+
+
+def _if_range_matches(header: str, etag: str) -> bool:
+    # If-Range needs a strong match: a weak tag (or a date) never selects the range
+    return header.strip() == f'"{etag}"'
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into (start, end) inclusive. Returns None when the
+    header is absent, malformed or asks for several ranges (the full file is sent then);
+    raises 416 when the range lies outside the file.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+    start_s, end_s = (part.strip() for part in spec.split("-", 1))
+    try:
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        else:
+            # Suffix range: the last N bytes
+            length = int(end_s)
+            if length <= 0:
+                raise HTTPException(416, headers={"Content-Range": f"bytes */{size}"})
+            start, end = max(size - length, 0), size - 1
+    except ValueError:
+        return None
+    if start > end and end_s:
+        return None
+    if start >= size:
+        raise HTTPException(416, headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+
+def _iter_file(path, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _document_headers(document: QuoteDocument) -> dict:
+    return {
+        "ETag": f'"{document.etag}"',
+        # Browsers keep the file but always revalidate, which is a cheap 304
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'inline; filename="{document.filename}"',
+        "Accept-Ranges": "bytes",
+    }
+
+
+@router.get("/{quote_id}/pdf")
+async def download_quote_pdf(quote_id: int, request: Request, session: AsyncSession = Depends(get_read_session)):
+    """
+    Rendered quotation PDF. Repeated downloads of an unchanged quote are served from
+    the render cache (or by nginx when X-Accel-Redirect is configured) and clients
+    holding the current version get a 304.
+    """
+    etag = await current_etag(session, quote_id)
+    if etag is None:
+        raise HTTPException(404, "Quote not found")
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"})
+
+    quote = await load_quote(session, quote_id)
+    if not quote:
+        raise HTTPException(404, "Quote not found")
+    company = await load_company_settings()
+    try:
+        document = await quote_documents.get(quote, company)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
+
+    headers = _document_headers(document)
+
+    if settings.pdf_accel_redirect_prefix:
+        # nginx serves the file itself, including Range requests
+        headers["X-Accel-Redirect"] = settings.pdf_accel_redirect_prefix.rstrip("/") + "/" + document.path.name
+        return Response(media_type="application/pdf", headers=headers)
+
+    size = document.size
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or _if_range_matches(if_range, document.etag):
+        byte_range = _parse_range(request.headers.get("range"), size)
+
+    if byte_range is None:
+        return FileResponse(document.path, media_type="application/pdf", headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _iter_file(document.path, start, length),
+        status_code=206,
+        media_type="application/pdf",
+        headers=headers,
+    )
+
+
+@router.post("/export")
+async def export_quote_pdfs(payload: QuoteExportRequest, request: Request):
+    """
+    Stream a ZIP with the PDFs of the selected quotes. Progress of the export can be
+    polled at /api/quotes/export/{job_id} using the X-Export-Job-Id response header.
+    """
+    # Only reads: the quotes are loaded from the replica when one is configured
+    sessions = read_sessionmaker(request)
+    quote_ids = await quote_exporter.select_quote_ids(payload, sessions)
+    if not quote_ids:
+        raise HTTPException(404, "No quotes match the export")
+    if len(quote_ids) > settings.pdf_export_max_quotes:
+        raise HTTPException(400, f"Too many quotes for one export (max {settings.pdf_export_max_quotes})")
+
+    job = quote_exporter.start(quote_ids)
+    filename = f"quotations-{datetime.now().strftime('%Y%m%d-%H%M%S')}.zip"
+    return StreamingResponse(
+        quote_exporter.stream(job, quote_ids, sessions),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Export-Job-Id": job.id,
+        },
+    )
+
+
+@router.get("/export/{job_id}", response_model=QuoteExportJobRead)
+async def get_export_job(job_id: str):
+    job = quote_exporter.get_job(job_id)
+    if not job:
+        raise HTTPException(404, "Export job not found")
+    return QuoteExportJobRead.model_validate(job, from_attributes=True)
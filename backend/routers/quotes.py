@@ -2,14 +2,59 @@ from decimal import Decimal
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from db import get_session
-from models import Quote, QuoteItem, Product
+from sqlalchemy import func, null, select
+from db import get_session, get_read_session
+from fast_json import FastJSONResponse, rows_to_dicts
+from models import Customer, Quote, QuoteItem, Product
 from schemas import QuoteCreate, QuoteRead, QuoteUpdate
 from config import settings
-from auth import require_admin_role
+from auth import get_current_user, require_admin_role
+from quote_documents import quote_documents
+from response_cache import response_cache
 
-router = APIRouter(prefix="/api/quotes", tags=["Quotes"])
+router = APIRouter(prefix="/api/quotes", tags=["Quotes"], dependencies=[Depends(get_current_user)])
+
+# QuoteRead's and QuoteItemRead's fields, in their order, for the fast list path (fast_json.py)
+QUOTE_READ_COLUMNS = (
+    Quote.customer_id, Quote.status, Quote.notes, Quote.quotation_number, Quote.valid_until,
+    Quote.terms_and_conditions, Quote.discount_type, Quote.discount_value, Quote.id,
+    Quote.subtotal, Quote.total_vat, Quote.total, Quote.created_at.label("created_date"),
+    null().label("items"),  # placeholder that keeps the key in place; filled in below
+    Quote.is_archived, Quote.archived_at, Quote.archived_by,
+    Customer.name.label("customer_name"), Customer.email.label("customer_email"),
+    Customer.phone.label("customer_phone"), Customer.address.label("customer_address"),
+    Customer.contact_person.label("customer_contact_person"), Customer.vat_number.label("customer_vat_number"),
+)
+QUOTE_FLOAT_COLUMNS = ("discount_value", "subtotal", "total_vat", "total")
+QUOTE_ITEM_READ_COLUMNS = (
+    QuoteItem.id, QuoteItem.product_id, QuoteItem.description, QuoteItem.quantity,
+    QuoteItem.unit_price, QuoteItem.vat_rate, QuoteItem.line_total, QuoteItem.line_total_vat,
+    Product.name.label("product_name"), Product.sku.label("product_sku"),
+)
+QUOTE_ITEM_FLOAT_COLUMNS = ("quantity", "unit_price", "vat_rate", "line_total", "line_total_vat")
+
+async def _list_quotes_fast(session: AsyncSession, conditions: list, order_by) -> FastJSONResponse:
+    """The quotes matching `conditions` as list_quotes returns them, from two Core queries"""
+    quotes_stmt = (
+        select(*QUOTE_READ_COLUMNS)
+        .outerjoin(Customer, Customer.id == Quote.customer_id)
+        .where(*conditions)
+        .order_by(order_by)
+    )
+    quotes = rows_to_dicts(await session.execute(quotes_stmt), floats=QUOTE_FLOAT_COLUMNS)
+
+    items_stmt = (
+        select(QuoteItem.quote_id, *QUOTE_ITEM_READ_COLUMNS)
+        .outerjoin(Product, Product.id == QuoteItem.product_id)
+        .where(QuoteItem.quote_id.in_(select(Quote.id).where(*conditions)))
+        .order_by(QuoteItem.id)
+    )
+    items_by_quote: dict[int, list] = {}
+    for item in rows_to_dicts(await session.execute(items_stmt), floats=QUOTE_ITEM_FLOAT_COLUMNS):
+        items_by_quote.setdefault(item.pop("quote_id"), []).append(item)
+    for quote in quotes:
+        quote["items"] = items_by_quote.get(quote["id"], [])
+    return FastJSONResponse(quotes)
 
 def _totals_for_items(items: list[QuoteItem], discount_type: str = "none", discount_value: Decimal = Decimal("0")) -> tuple[Decimal, Decimal, Decimal]:
     subtotal = Decimal("0")
@@ -32,8 +77,19 @@ def _totals_for_items(items: list[QuoteItem], discount_type: str = "none", disco
     
     return subtotal, total_vat, total
 
+def _quote_tags(quote: Quote) -> list[str]:
+    # A single quote also shows its customer's and products' details
+    return [
+        f"quote:{quote.id}",
+        f"customer:{quote.customer_id}",
+        *{f"product:{item.product_id}" for item in quote.items if item.product_id is not None},
+    ]
+
 @router.get("", response_model=list[QuoteRead])
-async def list_quotes(include_deleted: bool = False, session: AsyncSession = Depends(get_session)):
+@response_cache.cached(list[QuoteRead], tags=["quotes"])
+async def list_quotes(include_deleted: bool = False, session: AsyncSession = Depends(get_read_session)):
+    if settings.fast_list_serialization:
+        return await _list_quotes_fast(session, [] if include_deleted else [Quote.deleted == False], Quote.id.desc())
     from sqlalchemy.orm import selectinload
     stmt = select(Quote).options(selectinload(Quote.customer), selectinload(Quote.items).selectinload(QuoteItem.product))
     
@@ -61,7 +117,10 @@ async def list_quotes(include_deleted: bool = False, session: AsyncSession = Dep
     return quotes
 
 @router.get("/deleted", response_model=list[QuoteRead])
-async def list_deleted_quotes(session: AsyncSession = Depends(get_session)):
+@response_cache.cached(list[QuoteRead], tags=["quotes"])
+async def list_deleted_quotes(session: AsyncSession = Depends(get_read_session)):
+    if settings.fast_list_serialization:
+        return await _list_quotes_fast(session, [Quote.deleted == True], Quote.deleted_at.desc())
     from sqlalchemy.orm import selectinload
     res = await session.execute(
         select(Quote)
@@ -88,7 +147,8 @@ async def list_deleted_quotes(session: AsyncSession = Depends(get_session)):
     return quotes
 
 @router.get("/{quote_id}", response_model=QuoteRead)
-async def get_quote(quote_id: int, session: AsyncSession = Depends(get_session)):
+@response_cache.cached(QuoteRead, tags=_quote_tags)
+async def get_quote(quote_id: int, session: AsyncSession = Depends(get_read_session)):
     from sqlalchemy.orm import selectinload
     res = await session.execute(
         select(Quote)
@@ -177,6 +237,7 @@ async def create_quote(payload: QuoteCreate, session: AsyncSession = Depends(get
 
     await session.commit()
     await session.refresh(quote)
+    await response_cache.invalidate("quotes", f"quote:{quote.id}")
     return quote
 
 @router.put("/{quote_id}", response_model=QuoteRead)
@@ -229,6 +290,8 @@ async def update_quote(quote_id: int, payload: QuoteUpdate, session: AsyncSessio
             session.add(item)
         
         quote.subtotal, quote.total_vat, quote.total = _totals_for_items(built_items, quote.discount_type, quote.discount_value)
+        # Item edits don't always change a quote column; bump updated_at so cached PDFs are re-rendered
+        quote.updated_at = func.now()
 
     if not quote.quotation_number:
         year = datetime.utcnow().year
@@ -240,6 +303,7 @@ async def update_quote(quote_id: int, payload: QuoteUpdate, session: AsyncSessio
 
     await session.commit()
     await session.refresh(quote)
+    await response_cache.invalidate("quotes", f"quote:{quote.id}")
     return quote
 
 @router.delete("/{quote_id}", response_model=QuoteRead)
@@ -256,6 +320,8 @@ async def delete_quote(quote_id: int, session: AsyncSession = Depends(get_sessio
     quote.deleted_at = datetime.utcnow()
     await session.commit()
     await session.refresh(quote)
+    quote_documents.invalidate(quote.id)
+    await response_cache.invalidate("quotes", f"quote:{quote.id}")
     return quote
 
 @router.post("/{quote_id}/restore", response_model=QuoteRead)
@@ -272,4 +338,5 @@ async def restore_quote(quote_id: int, session: AsyncSession = Depends(get_sessi
     quote.deleted_at = None
     await session.commit()
     await session.refresh(quote)
+    await response_cache.invalidate("quotes", f"quote:{quote.id}")
     return quote
\ No newline at end of file
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Request
+from reference_data import currencies, vat_rates
+
+router = APIRouter(prefix="/api", tags=["Reference data"])
+
+
+@router.get("/vat-rates")
+async def list_vat_rates(request: Request):
+    """VAT rate presets offered for products and quote lines."""
+    return vat_rates.list_response(request)
+
+
+@router.get("/currencies")
+async def list_currencies(request: Request):
+    """Currencies products can be priced in."""
+    return currencies.list_response(request)
@@ -1,23 +1,35 @@
-from typing import List
+import asyncio
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete
 from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
 
-from db import get_session
+from db import get_session, get_read_session
 from models import User
-from schemas import UserCreate, UserUpdate, UserRead, UserPasswordUpdate, hash_password, verify_password
-from auth import require_admin_role
+from schemas import UserCreate, UserUpdate, UserRead, UserPasswordUpdate, LoginResponse
+from passwords import hash_password, verify_dummy_password, verify_password
+from blob_store import BlobError, blob_store
+from auth import TokenUser, create_access_token, get_current_user, get_current_user_role, require_admin_role, user_state_cache
 
+# Every route but verify-login needs a token (while auth_required is on)
 router = APIRouter(prefix="/api/users", tags=["users"])
+_authenticated = [Depends(get_current_user)]
 
-@router.get("", response_model=List[UserRead])
+async def _externalize_picture(value: str | None) -> str | None:
+    """Store an inline (data URI) picture in the blob store and return its URL"""
+    try:
+        return await asyncio.to_thread(blob_store.externalize, value)
+    except BlobError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid profile picture: {e}")
+
+@router.get("", response_model=List[UserRead], dependencies=_authenticated)
 async def list_users(
     q: str | None = Query(None),
     skip: int = 0,
     limit: int = 50,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """List all users with optional search"""
     stmt = select(User).where(User.is_active == True).offset(skip).limit(limit)
@@ -34,9 +46,9 @@ async def list_users(
     
     return users
 
-@router.get("/deleted", response_model=List[UserRead])
+@router.get("/deleted", response_model=List[UserRead], dependencies=_authenticated)
 async def list_deleted_users(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """List all deleted users (is_active = False)"""
     stmt = select(User).where(User.is_active == False)
@@ -45,10 +57,10 @@ async def list_deleted_users(
     
     return users
 
-@router.get("/{user_id}", response_model=UserRead)
+@router.get("/{user_id}", response_model=UserRead, dependencies=_authenticated)
 async def get_user(
     user_id: int,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """Get a specific user by ID"""
     stmt = select(User).where(User.id == user_id, User.is_active == True)
@@ -79,8 +91,8 @@ async def create_user(
         full_name=user_data.full_name,
         email=user_data.email,
         role=user_data.role,
-        profile_picture_url=user_data.profile_picture_url,
-        password_hash=hash_password(user_data.password)
+        profile_picture_url=await _externalize_picture(user_data.profile_picture_url),
+        password_hash=await hash_password(user_data.password)
     )
     
     session.add(user)
@@ -99,8 +111,12 @@ async def update_user(
     user_id: int,
     user_data: UserUpdate,
     session: AsyncSession = Depends(get_session),
+    current_user: Optional[TokenUser] = Depends(get_current_user),
+    current_role: str = Depends(get_current_user_role),
 ):
-    """Update an existing user"""
+    """Update an existing user; users may edit their own profile, admins anyone's and roles"""
+    if current_role != "admin" and (current_user is None or current_user.id != user_id):
+        raise HTTPException(status_code=403, detail="Admin role required for this operation")
     # Get existing user
     stmt = select(User).where(User.id == user_id, User.is_active == True)
     result = await session.execute(stmt)
@@ -119,12 +135,20 @@ async def update_user(
     
     # Update user fields
     update_data = user_data.model_dump(exclude_unset=True)
+    if current_role != "admin" and any(
+        field in update_data and update_data[field] != getattr(user, field) for field in ("role", "is_active")
+    ):
+        raise HTTPException(status_code=403, detail="Admin role required to change a role")
+    if "profile_picture_url" in update_data:
+        update_data["profile_picture_url"] = await _externalize_picture(update_data["profile_picture_url"])
     for field, value in update_data.items():
         setattr(user, field, value)
     
     try:
         await session.commit()
         await session.refresh(user)
+        # Role or active flag may have changed; tokens are re-checked on the next request
+        user_state_cache.invalidate(user_id)
         
         return user
     except IntegrityError as e:
@@ -149,6 +173,7 @@ async def delete_user(
     # Soft delete by setting is_active to False
     user.is_active = False
     await session.commit()
+    user_state_cache.invalidate(user_id)
     
     return {"message": "User deleted successfully"}
 
@@ -172,10 +197,11 @@ async def restore_user(
     user.is_active = True
     await session.commit()
     await session.refresh(user)
+    user_state_cache.invalidate(user_id)
     
     return user
 
-@router.post("/{user_id}/change-password", response_model=dict)
+@router.post("/{user_id}/change-password", response_model=dict, dependencies=_authenticated)
 async def change_password(
     user_id: int,
     password_data: UserPasswordUpdate,
@@ -191,11 +217,12 @@ async def change_password(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Verify current password
-    if not verify_password(password_data.current_password, user.password_hash):
+    valid, _ = await verify_password(password_data.current_password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     # Update password
-    user.password_hash = hash_password(password_data.new_password)
+    user.password_hash = await hash_password(password_data.new_password)
     await session.commit()
     
     return {"message": "Password updated successfully"}
@@ -204,24 +231,37 @@ class LoginRequest(BaseModel):
     email: str
     password: str
 
-@router.post("/verify-login", response_model=UserRead)
+@router.post("/verify-login", response_model=LoginResponse)
 async def verify_login(
     login_data: LoginRequest,
     session: AsyncSession = Depends(get_session),
 ):
-    """Verify user login credentials"""
+    """Verify user login credentials and issue an access token"""
     # Find user by email
     stmt = select(User).where(User.email == login_data.email, User.is_active == True)
     result = await session.execute(stmt)
     user = result.scalar_one_or_none()
     
     if not user:
-        # Return 401 without logging - this is expected behavior for invalid credentials
+        # Take as long as a wrong password, so unknown emails can't be told apart by timing
+        await verify_dummy_password(login_data.password)
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     # Verify password
-    if not verify_password(login_data.password, user.password_hash):
+    valid, new_hash = await verify_password(login_data.password, user.password_hash)
+    if not valid:
         # Return 401 without logging - this is expected behavior for invalid credentials
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    return user
+    if new_hash:
+        # Legacy SHA-256 hash or an outdated bcrypt cost; store the upgraded hash
+        user.password_hash = new_hash
+        await session.commit()
+        await session.refresh(user)
+    
+    access_token, expires_in = create_access_token(user)
+    return LoginResponse(
+        **UserRead.model_validate(user).model_dump(),
+        access_token=access_token,
+        expires_in=expires_in,
+    )
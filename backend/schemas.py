@@ -2,15 +2,6 @@ from typing import List, Optional
 from decimal import Decimal
 from pydantic import BaseModel, Field, EmailStr, ConfigDict, model_validator, field_serializer
 from datetime import datetime
-import hashlib
-
-def hash_password(password: str) -> str:
-    """Hash a password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def verify_password(password: str, hashed: str) -> bool:
-    """Verify a password against its hash"""
-    return hash_password(password) == hashed
 
 # Company Settings
 class CompanySettingsBase(BaseModel):
@@ -234,6 +225,67 @@ class QuoteRead(QuoteBase):
     def _ser_quote_decimal(self, v: Decimal):
         return float(v) if v is not None else 0.0
 
+class QuoteExportRequest(BaseModel):
+    # Either explicit ids or a filter; with ids the filter fields are ignored
+    ids: Optional[List[int]] = None
+    status: Optional[str] = None
+    customer_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    include_archived: bool = False
+
+class QuoteExportJobRead(BaseModel):
+    id: str
+    status: str  # running, completed, failed, cancelled
+    total: int
+    rendered: int
+    cached: int
+    failed: int
+    errors: List[str] = []
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+class BulkQuotationRecipient(BaseModel):
+    to_email: EmailStr
+    customer_name: Optional[str] = None
+
+class BulkQuotationEmailRequest(BaseModel):
+    # Each quote in quote_ids goes to its own customer; quote_id goes to every address in recipients
+    quote_ids: List[int] = []
+    quote_id: Optional[int] = None
+    recipients: List[BulkQuotationRecipient] = []
+    notes: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _check_targets(self):
+        if self.recipients and self.quote_id is None:
+            raise ValueError("quote_id is required when recipients are given")
+        if not self.quote_ids and not self.recipients:
+            raise ValueError("Provide quote_ids or quote_id with recipients")
+        return self
+
+class BulkRecipientResultRead(BaseModel):
+    to_email: str
+    quote_id: int
+    status: str  # pending, sending, sent, failed (outbox message status)
+    error: Optional[str] = None
+
+class BulkEmailJobRead(BaseModel):
+    id: str
+    status: str  # running, completed
+    total: int
+    sent: int
+    failed: int
+    results: List[BulkRecipientResultRead] = []
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+class BlobRead(BaseModel):
+    name: str
+    url: str
+    size: int
+    content_type: str
+
 # User schemas
 class UserBase(BaseModel):
     full_name: str
@@ -261,4 +313,9 @@ class UserRead(UserBase):
     created_date: datetime
     updated_at: datetime
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class LoginResponse(UserRead):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int  # seconds
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+In-process cache of the company settings row.
+
+Every print, email and quote builder load reads the company settings, so the row is
+kept in memory as a snapshot (a detached copy, never attached to a request's
+session) with a version number that increases on every reload.
+
+`update_company_settings` replaces the snapshot on the worker that handled it and
+sends a Postgres NOTIFY on the `company_settings` channel in the same transaction.
+Every worker LISTENs on that channel over a dedicated asyncpg connection and drops
+its snapshot when another worker changed the row. While the listener is not
+connected the snapshot also expires after `company_settings_cache_ttl` seconds, so
+a missed notification is never permanent.
+
+The row is always loaded from the primary: a lagging replica could hand back the
+old row right after a notification, and with LISTEN connected that snapshot would
+never expire. A load that was running when the snapshot was invalidated or
+replaced is not kept, for the same reason.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Optional
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from db import AsyncSessionLocal
+from models import CompanySettings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "company_settings"
+_RECONNECT_DELAY = 5.0
+
+
+def _snapshot_of(company: CompanySettings) -> CompanySettings:
+    """Transient copy of the row; safe to share between requests"""
+    return CompanySettings(**{
+        column.name: getattr(company, column.name)
+        for column in CompanySettings.__table__.columns
+    })
+
+
+class CompanySettingsCache:
+    def __init__(self):
+        self.version = 0
+        self._snapshot: Optional[CompanySettings] = None
+        self._loaded_at = 0.0
+        # Bumped by every invalidation and replacement, to spot loads that raced one
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        # Identifies this process in notifications so it ignores its own
+        self._instance_id = uuid.uuid4().hex
+        self._listener_task: Optional[asyncio.Task] = None
+        self._listening = False
+
+    def _fresh(self) -> bool:
+        if self._snapshot is None:
+            return False
+        # While LISTEN is connected, notifications keep the snapshot current
+        return self._listening or time.monotonic() - self._loaded_at < settings.company_settings_cache_ttl
+
+    async def get(self) -> CompanySettings:
+        """
+        Current company settings; the row is created with defaults if it does not
+        exist. The returned object is shared and must not be modified.
+        """
+        if self._fresh():
+            return self._snapshot
+        async with self._lock:
+            if self._fresh():
+                return self._snapshot
+            generation = self._generation
+            async with AsyncSessionLocal() as session:
+                company = await self._load(session)
+            if generation != self._generation:
+                # Invalidated (or replaced) while loading; this row may predate the change
+                return self._snapshot or _snapshot_of(company)
+            self.set(company)
+            return self._snapshot
+
+    async def _load(self, session: AsyncSession) -> CompanySettings:
+        result = await session.execute(select(CompanySettings).limit(1))
+        company = result.scalars().first()
+        if not company:
+            company = CompanySettings(company_name=settings.default_company_name, default_vat_rate=settings.default_vat_rate)
+            session.add(company)
+            await session.commit()
+            await session.refresh(company)
+        return company
+
+    def set(self, company: CompanySettings) -> None:
+        """Replace the snapshot with a freshly committed row"""
+        self._snapshot = _snapshot_of(company)
+        self._loaded_at = time.monotonic()
+        self._generation += 1
+        self.version += 1
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+        self._generation += 1
+
+    async def notify_change(self, session: AsyncSession) -> None:
+        """Queue a NOTIFY for other workers; it is delivered when `session` commits"""
+        if session.get_bind().dialect.name != "postgresql":
+            return
+        await session.execute(select(func.pg_notify(CHANNEL, self._instance_id)))
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        if payload != self._instance_id:
+            logger.info("Company settings changed by another worker; reloading on next use")
+            self.invalidate()
+
+    def start(self) -> None:
+        if self._listener_task is None and make_url(str(settings.database_url)).get_backend_name() == "postgresql":
+            self._listener_task = asyncio.create_task(self._listen(), name="company-settings-listener")
+
+    async def stop(self) -> None:
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            await asyncio.gather(self._listener_task, return_exceptions=True)
+            self._listener_task = None
+
+    async def _listen(self) -> None:
+        dsn = make_url(str(settings.database_url)).set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(CHANNEL, self._on_notification)
+                # Changes made while we were not listening are unknown
+                self.invalidate()
+                self._listening = True
+                logger.info(f"Listening for company settings changes on '{CHANNEL}'")
+                await closed.wait()
+                logger.warning("Company settings listener connection closed; reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Company settings listener failed: {e}; retrying in {_RECONNECT_DELAY:.0f}s")
+            finally:
+                self._listening = False
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(_RECONNECT_DELAY)
+
+
+company_settings_cache = CompanySettingsCache()
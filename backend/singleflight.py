@@ -0,0 +1,69 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+When many clients ask for the same thing at once (every browser loading the
+dashboard when the office opens), only the first request runs the query; the
+others wait for it and share its result. Calls are identified by a key, which for
+GET handlers is the handler and its normalized query (see response_cache.py, whose
+cached handlers coalesce their cache misses through `single_flight`).
+
+The caller that runs the computation is the leader. If it fails, every waiting
+caller gets the same exception. If the leader itself is cancelled (its client went
+away), the waiting callers are not: the next one in line runs the computation again.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+def _fail(future: asyncio.Future, exc: BaseException) -> None:
+    future.set_exception(exc)
+    future.exception()  # mark it retrieved, so a call nobody waited on logs nothing
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run `fn`, or wait for the call already running under `key`; returns (result, shared)"""
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                break
+            try:
+                # shield: a waiter's cancellation must not cancel the shared result
+                result = await asyncio.shield(future)
+            except _LeaderCancelled:
+                continue
+            self.shared += 1
+            return result, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            _fail(future, _LeaderCancelled())
+            raise
+        except BaseException as e:
+            _fail(future, e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
+
+
+single_flight = SingleFlight()
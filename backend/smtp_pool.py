@@ -0,0 +1,202 @@
+"""
+Pooled SMTP client.
+
+FastMail opens a new connection (TCP, TLS handshake, AUTH) for every message. This
+pool keeps authenticated aiosmtplib connections open and sends any number of
+messages over each of them, so bulk mailing pays the handshake once per connection.
+
+- Connections idle for longer than `smtp_idle_timeout` are closed and reopened
+  before use, since servers drop idle sessions (usually after 1-5 minutes).
+- A connection the server closed anyway is detected on send and the message is
+  retried once on a fresh connection.
+- Connections are retired after `smtp_max_messages_per_connection` messages, a
+  limit most providers enforce per session.
+- Sends to one server are spaced to at most `smtp_rate_limit_per_minute`.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from email.message import Message
+from typing import TYPE_CHECKING, Dict, List
+
+from config import settings
+
+if TYPE_CHECKING:
+    import aiosmtplib
+    from fastapi_mail import ConnectionConfig, MessageSchema
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PooledConnection:
+    smtp: "aiosmtplib.SMTP"
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    messages_sent: int = 0
+
+
+class RateLimiter:
+    """Spaces calls evenly so no more than `per_minute` start in any minute"""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+        self.waits = 0
+
+    async def acquire(self) -> None:
+        if self.per_minute <= 0:
+            return
+        interval = 60.0 / self.per_minute
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + interval
+        if delay > 0:
+            self.waits += 1
+            await asyncio.sleep(delay)
+
+
+# Shared per server so the limit also holds across pools (e.g. after a reconfiguration)
+_rate_limiters: Dict[str, RateLimiter] = {}
+
+
+def _rate_limiter_for(server: str) -> RateLimiter:
+    limiter = _rate_limiters.get(server)
+    if limiter is None or limiter.per_minute != settings.smtp_rate_limit_per_minute:
+        limiter = _rate_limiters[server] = RateLimiter(settings.smtp_rate_limit_per_minute)
+    return limiter
+
+
+class SMTPConnectionPool:
+    def __init__(self, config: "ConnectionConfig"):
+        self.config = config
+        self.server = f"{config.MAIL_SERVER}:{config.MAIL_PORT}"
+        self._idle: List[_PooledConnection] = []
+        self._slots = asyncio.Semaphore(settings.smtp_pool_size)
+        self._rate_limiter = _rate_limiter_for(self.server)
+        self._in_use = 0
+        self._closed = False
+        self.stats = {
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "reconnects": 0,
+            "messages_sent": 0,
+            "messages_on_reused_connection": 0,
+            "send_errors": 0,
+        }
+
+    def sender(self) -> str:
+        if self.config.MAIL_FROM_NAME is not None:
+            return f"{self.config.MAIL_FROM_NAME} <{self.config.MAIL_FROM}>"
+        return self.config.MAIL_FROM
+
+    async def build_message(self, message: "MessageSchema") -> Message:
+        """Build the MIME message exactly as FastMail would"""
+        from fastapi_mail.msg import MailMsg
+
+        return await MailMsg(message)._message(self.sender())
+
+    async def send_message(self, message: "MessageSchema") -> None:
+        await self.send(await self.build_message(message))
+
+    async def send(self, mime_message: Message) -> None:
+        if self._closed:
+            raise RuntimeError("SMTP pool is closed")
+        await self._rate_limiter.acquire()
+        async with self._slots:
+            self._in_use += 1
+            try:
+                await self._send_with_retry(mime_message)
+            finally:
+                self._in_use -= 1
+
+    async def _send_with_retry(self, mime_message: Message) -> None:
+        import aiosmtplib  # only needed once mail is sent; kept off the startup path
+
+        conn = await self._checkout()
+        try:
+            reused = conn.messages_sent > 0
+            try:
+                await conn.smtp.send_message(mime_message)
+            except (aiosmtplib.SMTPServerDisconnected, ConnectionError) as e:
+                if not reused:
+                    raise
+                # The server dropped a connection we believed was alive; retry once on a new one
+                logger.info(f"SMTP connection to {self.server} was closed by the server ({e}); reconnecting")
+                self.stats["reconnects"] += 1
+                await self._close(conn)
+                conn = await self._open()
+                reused = False
+                await conn.smtp.send_message(mime_message)
+        except Exception:
+            self.stats["send_errors"] += 1
+            await self._close(conn)
+            raise
+
+        self.stats["messages_sent"] += 1
+        if reused:
+            self.stats["messages_on_reused_connection"] += 1
+        conn.messages_sent += 1
+        conn.last_used = time.monotonic()
+        await self._checkin(conn)
+
+    async def _checkout(self) -> _PooledConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            idle_for = time.monotonic() - conn.last_used
+            if conn.smtp.is_connected and idle_for < settings.smtp_idle_timeout:
+                return conn
+            self.stats["reconnects"] += 1
+            await self._close(conn)
+        return await self._open()
+
+    async def _checkin(self, conn: _PooledConnection) -> None:
+        if self._closed or conn.messages_sent >= settings.smtp_max_messages_per_connection:
+            await self._close(conn)
+        else:
+            self._idle.append(conn)
+
+    async def _open(self) -> _PooledConnection:
+        import aiosmtplib
+
+        smtp = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            timeout=self.config.TIMEOUT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+        )
+        await smtp.connect()
+        if self.config.USE_CREDENTIALS:
+            await smtp.login(self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD)
+        self.stats["connections_opened"] += 1
+        logger.info(f"Opened SMTP connection to {self.server}")
+        return _PooledConnection(smtp)
+
+    async def _close(self, conn: _PooledConnection) -> None:
+        self.stats["connections_closed"] += 1
+        try:
+            if conn.smtp.is_connected:
+                await conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+    async def close(self) -> None:
+        self._closed = True
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(self._close(conn) for conn in idle), return_exceptions=True)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "server": self.server,
+            "pool_size": settings.smtp_pool_size,
+            "in_use": self._in_use,
+            "idle": len(self._idle),
+            "rate_limit_per_minute": self._rate_limiter.per_minute,
+            "rate_limit_waits": self._rate_limiter.waits,
+            **self.stats,
+        }
@@ -0,0 +1,42 @@
+"""
+Shared fixtures. The tests need no running services: mail goes to the in-process
+SMTP sink (benchmarks/smtp_sink.py) and database code runs against SQLite.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from config import settings
+from models import Base
+
+
+@pytest.fixture
+def mail_settings(monkeypatch):
+    """Returns a function that points the mail settings at a local SMTP sink port"""
+
+    def configure(port: int) -> None:
+        monkeypatch.setattr(settings, "mail_server", "127.0.0.1")
+        monkeypatch.setattr(settings, "mail_port", port)
+        monkeypatch.setattr(settings, "mail_from", "quotes@example.com")
+        monkeypatch.setattr(settings, "mail_tls", False)
+        monkeypatch.setattr(settings, "mail_ssl", False)
+        monkeypatch.setattr(settings, "mail_use_credentials", False)
+
+    return configure
+
+
+@pytest.fixture
+def sqlite_sessions(tmp_path):
+    """A session factory for a fresh SQLite database with the full schema"""
+    # NullPool: every test body runs in its own event loop (asyncio.run)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=NullPool)
+
+    async def create_schema() -> None:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_schema())
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
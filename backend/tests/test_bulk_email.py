@@ -0,0 +1,122 @@
+"""Bulk quotation mailing: queued in the email outbox and delivered to the SMTP sink"""
+import asyncio
+from typing import Any, Dict
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+import email_outbox as email_outbox_module
+import quote_documents as quote_documents_module
+from benchmarks.smtp_sink import SMTPSink
+from bulk_email import BulkMailer, is_unresolved
+from config import settings
+from email_outbox import EmailOutboxWorkers
+from email_service import EmailService
+from models import Customer, EmailOutbox, Quote
+from pdf_engines import RenderEngine
+from quote_documents import QuoteDocumentCache
+from routers.email import retry_outbox_message
+from schemas import BulkQuotationEmailRequest
+
+
+class CountingEngine(RenderEngine):
+    name = "counting"
+
+    def __init__(self):
+        self.renders = 0
+
+    async def render(self, quotation_data: Dict[str, Any]) -> bytes:
+        self.renders += 1
+        return b"%PDF-1.4\n%%EOF\n"
+
+
+async def _no_company_settings():
+    return None
+
+
+@pytest.fixture
+def outbox(sqlite_sessions, tmp_path, monkeypatch):
+    """Outbox workers and the render cache wired to SQLite, a temp dir and a counting engine"""
+    engine = CountingEngine()
+    monkeypatch.setattr(settings, "bulk_email_per_domain_per_minute", 0)
+    monkeypatch.setattr(email_outbox_module, "AsyncSessionLocal", sqlite_sessions)
+    monkeypatch.setattr(quote_documents_module, "AsyncSessionLocal", sqlite_sessions)
+    monkeypatch.setattr(quote_documents_module, "quote_documents", QuoteDocumentCache(str(tmp_path / "pdf")))
+    monkeypatch.setattr(quote_documents_module, "get_engine_for", lambda payload: engine)
+    monkeypatch.setattr(quote_documents_module, "load_company_settings", _no_company_settings)
+    monkeypatch.setattr("bulk_email.load_company_settings", _no_company_settings)
+    return engine
+
+
+async def _add_quotes(sessions) -> Dict[str, int]:
+    async with sessions() as session:
+        rossi = Customer(name="Rossi", email="mario@rossi.example", contact_person="Mario Rossi")
+        bianchi = Customer(name="Bianchi", email="anna@bianchi.example")
+        verdi = Customer(name="Verdi", email=None)
+        quotes = {
+            "rossi": Quote(customer=rossi, quotation_number="QUO/2026/0001", total=100),
+            "bianchi": Quote(customer=bianchi, quotation_number="QUO/2026/0002", total=200),
+            "verdi": Quote(customer=verdi, quotation_number="QUO/2026/0003", total=300),
+        }
+        session.add_all(quotes.values())
+        await session.commit()
+        return {name: quote.id for name, quote in quotes.items()}
+
+
+def test_bulk_job_is_delivered_through_the_outbox(sqlite_sessions, outbox, mail_settings, monkeypatch):
+    async def main():
+        sink = SMTPSink(use_aiosmtpd=False)
+        mail_settings(await sink.start())
+        service = EmailService()
+        monkeypatch.setattr(email_outbox_module, "email_service", service)
+        try:
+            ids = await _add_quotes(sqlite_sessions)
+            request = BulkQuotationEmailRequest(
+                quote_ids=[ids["rossi"], ids["bianchi"], ids["verdi"], 9999],
+                quote_id=ids["rossi"],
+                recipients=[{"to_email": f"buyer{i}@partner.example"} for i in range(3)],
+            )
+            mailer = BulkMailer()
+            async with sqlite_sessions() as session:
+                job = await mailer.start(session, request)
+            assert job.total == 7
+            assert job.failed == 2  # customer without an email address, unknown quote
+
+            workers = EmailOutboxWorkers()
+            while await workers.process_batch():
+                pass
+
+            assert sink.messages == 5
+            # Rossi's quote goes to four recipients but is rendered once
+            assert outbox.renders == 2
+            async with sqlite_sessions() as session:
+                job = await mailer.get_job(session, job.id)
+            assert (job.status, job.sent, job.failed) == ("completed", 5, 2)
+            errors = sorted(r.error for r in job.results if r.status == "failed")
+            assert errors == sorted([
+                "Quote 9999 not found",
+                f"Quote {ids['verdi']} customer has no email address",
+            ])
+        finally:
+            await service.close()
+            await sink.stop()
+
+    asyncio.run(main())
+
+
+def test_unresolved_recipients_can_not_be_retried(sqlite_sessions, outbox):
+    async def main():
+        ids = await _add_quotes(sqlite_sessions)
+        async with sqlite_sessions() as session:
+            await BulkMailer().start(session, BulkQuotationEmailRequest(quote_ids=[ids["rossi"], ids["verdi"]]))
+            messages = (await session.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all()
+            queued, unresolved = messages
+            assert not is_unresolved(queued)
+            assert is_unresolved(unresolved)
+            with pytest.raises(HTTPException) as raised:
+                await retry_outbox_message(unresolved.id, session=session, current_role="admin")
+            assert raised.value.status_code == 400
+            assert unresolved.status == "failed"
+
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""Quotation emails through EmailService and the SMTP connection pool, against the SMTP sink"""
+import asyncio
+
+import pytest
+
+from benchmarks.smtp_sink import SMTPSink
+from config import settings
+from email_service import EmailService
+
+PDF = b"%PDF-1.4\n%%EOF\n"
+
+
+def _email(i: int) -> dict:
+    return {
+        "to_email": f"customer{i}@example.com",
+        "customer_name": "Mario Rossi",
+        "quotation_number": f"QUO/2026/{i:04d}",
+        "total_amount": 1234.5,
+        "valid_until": "31/12/2026",
+        "company_name": "Grow United Italy",
+        "attachment": (f"quote-{i}.pdf", PDF),
+    }
+
+
+def _run_with_sink(mail_settings, scenario) -> None:
+    """Run `scenario(sink, service)` with the email service pointed at a fresh sink"""
+
+    async def main() -> None:
+        sink = SMTPSink(use_aiosmtpd=False)
+        mail_settings(await sink.start())
+        service = EmailService()
+        try:
+            await scenario(sink, service)
+        finally:
+            await service.close()
+            await sink.stop()
+
+    asyncio.run(main())
+
+
+def test_concurrent_sends_share_pooled_connections(mail_settings, monkeypatch):
+    monkeypatch.setattr(settings, "smtp_pool_size", 2)
+
+    async def scenario(sink, service):
+        await asyncio.gather(*(service.deliver_quotation_email(**_email(i)) for i in range(10)))
+        assert sink.messages == 10
+        assert sink.connections <= 2
+        stats = service.smtp_pool.snapshot()
+        assert stats["messages_sent"] == 10
+        assert stats["messages_on_reused_connection"] >= 8
+        assert stats["send_errors"] == 0
+
+    _run_with_sink(mail_settings, scenario)
+
+
+def test_connection_is_retired_after_max_messages(mail_settings, monkeypatch):
+    monkeypatch.setattr(settings, "smtp_max_messages_per_connection", 3)
+
+    async def scenario(sink, service):
+        for i in range(7):
+            await service.deliver_quotation_email(**_email(i))
+        assert sink.messages == 7
+        assert sink.connections == 3
+
+    _run_with_sink(mail_settings, scenario)
+
+
+def test_reconnects_when_the_server_dropped_the_connection(mail_settings):
+    async def scenario(sink, service):
+        await service.deliver_quotation_email(**_email(1))
+        await sink.drop_connections()
+        await asyncio.sleep(0.05)  # let the client notice the closed socket, or not
+        await service.deliver_quotation_email(**_email(2))
+        assert sink.messages == 2
+        assert sink.connections == 2
+        stats = service.smtp_pool.snapshot()
+        assert stats["reconnects"] == 1
+        assert stats["send_errors"] == 0
+
+    _run_with_sink(mail_settings, scenario)
+
+
+def test_idle_connection_is_reopened(mail_settings, monkeypatch):
+    monkeypatch.setattr(settings, "smtp_idle_timeout", 0)
+
+    async def scenario(sink, service):
+        await service.deliver_quotation_email(**_email(1))
+        await service.deliver_quotation_email(**_email(2))
+        assert sink.messages == 2
+        assert sink.connections == 2
+        assert service.smtp_pool.snapshot()["reconnects"] == 1
+
+    _run_with_sink(mail_settings, scenario)
+
+
+def test_send_raises_when_the_server_is_down(mail_settings):
+    async def scenario(sink, service):
+        await sink.stop()
+        with pytest.raises(OSError):
+            await service.deliver_quotation_email(**_email(1))
+        assert sink.messages == 0
+
+    _run_with_sink(mail_settings, scenario)
+
+
+def test_unconfigured_service_refuses_to_send(monkeypatch):
+    monkeypatch.setattr(settings, "mail_server", "")
+    service = EmailService()
+    assert not service.is_configured
+    with pytest.raises(RuntimeError, match="not configured"):
+        asyncio.run(service.deliver_quotation_email(**_email(1)))
@@ -0,0 +1,133 @@
+"""Per-route concurrency limits (503 with Retry-After) and the request deadline (504)"""
+import asyncio
+from typing import Dict, List, Tuple
+
+import pytest
+
+from config import settings
+from load_shedding import LoadSheddingMiddleware, load_shedder
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "route_concurrency_limits", {"POST /api/quotes/export": [1, 1]})
+    monkeypatch.setattr(settings, "route_queue_timeout", 1.0)
+    monkeypatch.setattr(settings, "load_shed_retry_after", 7)
+    monkeypatch.setattr(settings, "request_deadline_seconds", 0)
+    monkeypatch.setattr(load_shedder, "deadline_exceeded", 0)
+    load_shedder.reload()
+    yield
+    load_shedder.reload()
+
+
+def _app(seconds: float, events: List[str]):
+    """An ASGI app that works `seconds` before it answers"""
+
+    async def app(scope, receive, send):
+        events.append("started")
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"done"})
+
+    return app
+
+
+async def _call(app, method: str, path: str) -> Tuple[int, Dict[str, str], bytes]:
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": [], "query_string": b""}
+    await LoadSheddingMiddleware(app)(scope, receive, send)
+    start = messages[0]
+    headers = {k.decode().lower(): v.decode() for k, v in start.get("headers", [])}
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], headers, body
+
+
+def test_requests_beyond_the_queue_are_shed():
+    async def main():
+        app = _app(0.1, [])
+        first = asyncio.create_task(_call(app, "POST", "/api/quotes/export"))
+        await asyncio.sleep(0.01)
+        queued = asyncio.create_task(_call(app, "POST", "/api/quotes/export"))
+        await asyncio.sleep(0.01)
+
+        status, headers, _ = await _call(app, "POST", "/api/quotes/export")
+        assert status == 503
+        assert headers["retry-after"] == "7"
+
+        assert (await first)[0] == 200
+        assert (await queued)[0] == 200  # got the slot once the first one finished
+        route = load_shedder.snapshot()["routes"]["POST /api/quotes/export"]
+        assert (route["admitted"], route["rejected"], route["active"]) == (2, 1, 0)
+
+    asyncio.run(main())
+
+
+def test_queued_request_is_shed_after_the_queue_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "route_queue_timeout", 0.05)
+
+    async def main():
+        app = _app(0.3, [])
+        first = asyncio.create_task(_call(app, "POST", "/api/quotes/export"))
+        await asyncio.sleep(0.01)
+        status, _, _ = await _call(app, "POST", "/api/quotes/export")
+        assert status == 503
+        assert (await first)[0] == 200
+
+    asyncio.run(main())
+
+
+def test_routes_without_a_rule_are_not_limited():
+    async def main():
+        app = _app(0.05, [])
+        results = await asyncio.gather(*(_call(app, "GET", "/api/quotes") for _ in range(5)))
+        assert [status for status, _, _ in results] == [200] * 5
+
+    asyncio.run(main())
+
+
+def test_handler_past_the_deadline_is_cancelled_with_504(monkeypatch):
+    monkeypatch.setattr(settings, "request_deadline_seconds", 0.05)
+    events: List[str] = []
+
+    async def main():
+        status, _, body = await _call(_app(1.0, events), "GET", "/api/quotes")
+        assert status == 504
+        assert b"deadline" in body
+
+    asyncio.run(main())
+    assert events == ["started", "cancelled"]
+    assert load_shedder.deadline_exceeded == 1
+
+
+def test_response_that_started_in_time_is_not_cut_off(monkeypatch):
+    monkeypatch.setattr(settings, "request_deadline_seconds", 0.05)
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await asyncio.sleep(0.1)  # past the deadline, but the response has started
+        await send({"type": "http.response.body", "body": b"zip bytes"})
+
+    status, _, body = asyncio.run(_call(streaming_app, "POST", "/api/quotes/export"))
+    assert (status, body) == (200, b"zip bytes")
+    assert load_shedder.deadline_exceeded == 0
+
+
+def test_the_apps_own_timeout_is_not_turned_into_504(monkeypatch):
+    monkeypatch.setattr(settings, "request_deadline_seconds", 5)
+
+    async def app(scope, receive, send):
+        raise TimeoutError("SMTP server did not answer")
+
+    with pytest.raises(TimeoutError, match="SMTP"):
+        asyncio.run(_call(app, "GET", "/api/quotes"))
@@ -0,0 +1,152 @@
+"""Quote PDF downloads: Range parsing, If-None-Match and If-Range against the render cache"""
+import asyncio
+from typing import Any, Dict
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import quote_documents as quote_documents_module
+import routers.quote_documents as router_module
+import settings_cache as settings_cache_module
+from config import settings
+from models import Customer, Quote
+from pdf_engines import RenderEngine
+from quote_documents import QuoteDocumentCache
+from settings_cache import CompanySettingsCache
+from routers.quote_documents import _etag_matches, _if_range_matches, _parse_range, download_quote_pdf
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 4 + b"\n%%EOF\n"
+
+
+class StaticEngine(RenderEngine):
+    name = "static"
+
+    async def render(self, quotation_data: Dict[str, Any]) -> bytes:
+        return PDF
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    (" bytes=0-0", None),
+    (None, None),
+    ("items=0-99", None),
+    ("bytes=0-99,200-299", None),
+    ("bytes=abc-", None),
+    ("bytes=50-10", None),
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=5000-6000", "bytes=-0"])
+def test_unsatisfiable_range_is_416(header):
+    with pytest.raises(HTTPException) as raised:
+        _parse_range(header, 1000)
+    assert raised.value.status_code == 416
+    assert raised.value.headers == {"Content-Range": "bytes */1000"}
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"old", "abc"', True),
+    ("*", True),
+    ('"old"', False),
+    ("abc", False),
+    (None, False),
+    ("", False),
+])
+def test_if_none_match(header, expected):
+    assert _etag_matches(header, "abc") is expected
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('"abc"', True),
+    (' "abc" ', True),
+    ('W/"abc"', False),
+    ('"old"', False),
+    ("Wed, 21 Oct 2026 07:28:00 GMT", False),
+])
+def test_if_range_needs_a_strong_match(header, expected):
+    assert _if_range_matches(header, "abc") is expected
+
+
+@pytest.fixture
+def documents(sqlite_sessions, tmp_path, monkeypatch):
+    """The download route wired to SQLite, a temp render cache and a static engine"""
+    cache = QuoteDocumentCache(str(tmp_path / "pdf"))
+    monkeypatch.setattr(settings, "pdf_accel_redirect_prefix", "")
+    monkeypatch.setattr(quote_documents_module, "AsyncSessionLocal", sqlite_sessions)
+    monkeypatch.setattr(router_module, "quote_documents", cache)
+    monkeypatch.setattr(settings_cache_module, "AsyncSessionLocal", sqlite_sessions)
+    monkeypatch.setattr(quote_documents_module, "company_settings_cache", CompanySettingsCache())
+    monkeypatch.setattr(quote_documents_module, "get_engine_for", lambda payload: StaticEngine())
+
+    async def add_quote() -> int:
+        async with sqlite_sessions() as session:
+            quote = Quote(customer=Customer(name="Rossi"), quotation_number="QUO/2026/0001", total=100)
+            session.add(quote)
+            await session.commit()
+            return quote.id
+
+    return asyncio.run(add_quote())
+
+
+def _download(sessions, quote_id: int, **headers: str):
+    async def main():
+        request = Request({
+            "type": "http",
+            "method": "GET",
+            "path": f"/api/quotes/{quote_id}/pdf",
+            "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+            "query_string": b"",
+        })
+        async with sessions() as session:
+            response = await download_quote_pdf(quote_id, request, session=session)
+        body = b""
+        if hasattr(response, "body_iterator"):
+            body = b"".join([chunk async for chunk in response.body_iterator])
+        return response, body
+
+    return asyncio.run(main())
+
+
+def test_full_download_then_304_for_the_current_etag(sqlite_sessions, documents):
+    response, _ = _download(sqlite_sessions, documents)
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    etag = response.headers["etag"]
+
+    response, _ = _download(sqlite_sessions, documents, if_none_match=etag)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+
+def test_range_is_served_as_206(sqlite_sessions, documents):
+    response, body = _download(sqlite_sessions, documents, range="bytes=10-19")
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 10-19/{len(PDF)}"
+    assert body == PDF[10:20]
+
+
+def test_if_range_with_a_stale_etag_sends_the_whole_file(sqlite_sessions, documents):
+    etag = _download(sqlite_sessions, documents)[0].headers["etag"]
+
+    response, body = _download(sqlite_sessions, documents, range="bytes=-7", if_range=etag)
+    assert response.status_code == 206
+    assert body == PDF[-7:]
+
+    response, _ = _download(sqlite_sessions, documents, range="bytes=-7", if_range='"stale"')
+    assert response.status_code == 200
+    assert "content-range" not in response.headers
+
+
+def test_unknown_quote_is_404(sqlite_sessions, documents):
+    with pytest.raises(HTTPException) as raised:
+        _download(sqlite_sessions, 9999)
+    assert raised.value.status_code == 404
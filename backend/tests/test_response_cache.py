@@ -0,0 +1,108 @@
+"""The shared (redis) response cache backend, against the in-process Redis stand-in"""
+import asyncio
+from typing import Dict, List
+
+from starlette.requests import Request
+
+from benchmarks.redis_standin import RedisStandin
+from config import settings
+from response_cache import RedisBackend, ResponseCache
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+
+def _run_with_redis(scenario) -> None:
+    async def main() -> None:
+        standin = RedisStandin()
+        await standin.start()
+        backend = RedisBackend(standin.url)
+        try:
+            await scenario(backend)
+        finally:
+            await backend.close()
+            await standin.stop()
+
+    asyncio.run(main())
+
+
+def test_invalidate_drops_only_entries_with_the_tag():
+    async def scenario(backend):
+        generation, _ = await backend.state()
+        assert await backend.set("quotes?", b"[1]", ("quotes",), 30, generation)
+        assert await backend.set("quote?id=1", b"{}", ("quote:1",), 30, generation)
+
+        await backend.invalidate(["quotes"])
+
+        assert await backend.get("quotes?") is None
+        assert await backend.get("quote?id=1") == b"{}"
+        assert (await backend.state())[0] == generation + 1
+
+    _run_with_redis(scenario)
+
+
+def test_result_computed_before_an_invalidation_is_not_stored():
+    async def scenario(backend):
+        generation, _ = await backend.state()
+        await backend.invalidate(["quotes"])  # e.g. a write committed while the miss was running
+        assert not await backend.set("quotes?", b"[1]", ("quotes",), 30, generation)
+        assert await backend.get("quotes?") is None
+
+    _run_with_redis(scenario)
+
+
+def test_cached_handler_is_recomputed_after_invalidation(monkeypatch):
+    monkeypatch.setattr(settings, "response_cache_enabled", True)
+    monkeypatch.setattr(settings, "response_cache_backend", "redis")
+    calls: List[int] = []
+
+    async def scenario(backend):
+        cache = ResponseCache()
+        cache.use_backend(backend)
+
+        @cache.cached(List[Dict[str, int]], tags=["quotes"])
+        async def list_quotes(limit: int = 10):
+            calls.append(limit)
+            return [{"id": 1, "total": len(calls)}]
+
+        first = await list_quotes(_cache_request=_request(), limit=10)
+        second = await list_quotes(_cache_request=_request(), limit=10)
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.body == first.body == b'[{"id":1,"total":1}]'
+        assert len(calls) == 1
+
+        await cache.invalidate("quotes")
+        third = await list_quotes(_cache_request=_request(), limit=10)
+        assert third.headers["X-Cache"] == "MISS"
+        assert third.body == b'[{"id":1,"total":2}]'
+        assert len(calls) == 2
+
+    _run_with_redis(scenario)
+
+
+def test_cache_is_bypassed_while_redis_is_down(monkeypatch):
+    monkeypatch.setattr(settings, "response_cache_enabled", True)
+    monkeypatch.setattr(settings, "response_cache_backend", "redis")
+
+    async def scenario(backend):
+        cache = ResponseCache()
+        cache.use_backend(backend)
+
+        @cache.cached(List[int], tags=["products"])
+        async def list_products():
+            return [1, 2, 3]
+
+        cache.use_backend(RedisBackend("redis://127.0.0.1:1/0"))  # nothing listens there
+        try:
+            response = await list_products(_cache_request=_request())
+            assert response.body == b"[1,2,3]"
+            assert "X-Cache" not in response.headers
+            assert cache.errors == 1
+            await cache.invalidate("products")  # logged, not raised
+            assert cache.errors == 2
+        finally:
+            await cache.close()
+
+    _run_with_redis(scenario)
@@ -0,0 +1,88 @@
+"""Single-flight coalescing: sharing, error propagation and cancellation of the leader"""
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_computation():
+    async def main():
+        flight = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return calls
+
+        results = await asyncio.gather(*(flight.do("dashboard", compute) for _ in range(5)))
+        assert calls == 1
+        assert sorted(results) == [(1, False)] + [(1, True)] * 4
+        assert flight.snapshot() == {"in_flight": 0, "leaders": 1, "shared": 4}
+
+    asyncio.run(main())
+
+
+def test_waiters_get_the_leaders_exception():
+    async def main():
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            raise ValueError("database went away")
+
+        results = await asyncio.gather(*(flight.do("quotes", compute) for _ in range(3)), return_exceptions=True)
+        assert [type(r) for r in results] == [ValueError] * 3
+        assert flight.snapshot()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_leader_hands_over_to_a_waiter():
+    async def main():
+        flight = SingleFlight()
+        started = []
+
+        async def compute():
+            started.append(len(started))
+            await asyncio.sleep(0.1)
+            return "quotes"
+
+        leader = asyncio.create_task(flight.do("quotes", compute))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(flight.do("quotes", compute)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        leader.cancel()  # its client went away
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        results = await asyncio.gather(*waiters)
+        # One waiter ran the computation again; the others shared its result
+        assert len(started) == 2
+        assert sorted(results) == [("quotes", False)] + [("quotes", True)] * 2
+        assert flight.snapshot()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_the_leader():
+    async def main():
+        flight = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return 42
+
+        leader = asyncio.create_task(flight.do("products", compute))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(flight.do("products", compute))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+
+        assert await leader == (42, False)
+        assert waiter.cancelled()
+
+    asyncio.run(main())
@@ -1,4 +1,4 @@
-import { apiGet, apiPost, apiPut, apiDelete } from "./integrations";
+import { apiGet, apiPost, apiPut, apiDelete, ACCESS_TOKEN_KEY } from "./integrations";
 
 // Sort helper (kept)
 const sortItems = (items, sort) => {
@@ -166,6 +166,14 @@ export const Country = {
   async get(code) { return apiGet(`/api/countries/${code}`); },
 };
 
+export const VatRate = {
+  async list() { return apiGet(`/api/vat-rates`); },
+};
+
+export const Currency = {
+  async list() { return apiGet(`/api/currencies`); },
+};
+
 // User authentication and management
 const USER_KEY = "current_user";
 const defaultUser = { id: "user-1", full_name: "Demo User", email: "demo@example.com", role: "admin", profile_picture_url: "" };
@@ -212,6 +220,7 @@ export const User = {
   async logout() {
     // Clear user data from localStorage completely
     localStorage.removeItem(USER_KEY);
+    localStorage.removeItem(ACCESS_TOKEN_KEY);
     return { success: true };
   },
   async isAuthenticated() {
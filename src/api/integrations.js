@@ -1,34 +1,66 @@
-// Minimal integration mocks for dev
+import { CONFIG } from '@/config/constants';
 
-// Returns a persistent data URL so it survives reloads (better than ObjectURL)
-export async function UploadFile({ file }) {
-  const file_url = await new Promise((resolve, reject) => {
-    const reader = new FileReader();
-    reader.onload = () => resolve(reader.result); // data URL
-    reader.onerror = reject;
-    reader.readAsDataURL(file);
-  });
-  return { file_url };
+const BASE_URL = CONFIG.API_BASE_URL;
+
+export const ACCESS_TOKEN_KEY = "access_token";
+
+// Set by AuthContext at login
+const CURRENT_USER_KEY = "current_user";
+
+// Authorization header for the access token issued at login (none for demo users)
+export function authHeaders() {
+  const token = localStorage.getItem(ACCESS_TOKEN_KEY);
+  return token ? { Authorization: `Bearer ${token}` } : {};
 }
 
-import { CONFIG } from '@/config/constants';
+// The token expired or was revoked (or the server requires one): end the session
+// and go back to the login page instead of failing every request
+function handleUnauthorized(res) {
+  if (res.status !== 401) return;
+  localStorage.removeItem(ACCESS_TOKEN_KEY);
+  localStorage.removeItem(CURRENT_USER_KEY);
+  if (window.location.pathname !== "/login") {
+    window.location.assign("/login");
+  }
+}
 
-const BASE_URL = CONFIG.API_BASE_URL;
+// Stores the image in the backend blob store and returns its short URL
+export async function UploadFile({ file }) {
+  const form = new FormData();
+  form.append("file", file);
+  const res = await fetch(`${BASE_URL}/api/blobs`, {
+    method: "POST",
+    headers: authHeaders(),
+    credentials: "include",
+    body: form,
+  });
+  if (!res.ok) {
+    handleUnauthorized(res);
+    const errorData = await res.json().catch(() => ({}));
+    throw new Error(errorData.detail || `Upload failed (${res.status})`);
+  }
+  const blob = await res.json();
+  return { file_url: blob.url };
+}
 
 export async function apiGet(path) {
-  const res = await fetch(`${BASE_URL}${path}`, { credentials: "include" });
-  if (!res.ok) throw new Error(`GET ${path} ${res.status}`);
+  const res = await fetch(`${BASE_URL}${path}`, { headers: authHeaders(), credentials: "include" });
+  if (!res.ok) {
+    handleUnauthorized(res);
+    throw new Error(`GET ${path} ${res.status}`);
+  }
   return res.json();
 }
 
 export async function apiPost(path, body) {
   const res = await fetch(`${BASE_URL}${path}`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
+    headers: { "Content-Type": "application/json", ...authHeaders() },
     credentials: "include",
     body: JSON.stringify(body),
   });
   if (!res.ok) {
+    handleUnauthorized(res);
     const errorData = await res.json().catch(() => ({}));
     const errorMessage = errorData.detail || errorData.message || `POST ${path} ${res.status}`;
     throw new Error(errorMessage);
@@ -39,11 +71,12 @@ export async function apiPost(path, body) {
 export async function apiPut(path, body) {
   const res = await fetch(`${BASE_URL}${path}`, {
     method: "PUT",
-    headers: { "Content-Type": "application/json" },
+    headers: { "Content-Type": "application/json", ...authHeaders() },
     credentials: "include",
     body: JSON.stringify(body),
   });
   if (!res.ok) {
+    handleUnauthorized(res);
     const errorData = await res.json().catch(() => ({}));
     const errorMessage = errorData.detail || errorData.message || `PUT ${path} ${res.status}`;
     throw new Error(errorMessage);
@@ -54,9 +87,13 @@ export async function apiPut(path, body) {
 export async function apiDelete(path) {
   const res = await fetch(`${BASE_URL}${path}`, {
     method: "DELETE",
+    headers: authHeaders(),
     credentials: "include",
   });
-  if (!res.ok) throw new Error(`DELETE ${path} ${res.status}`);
+  if (!res.ok) {
+    handleUnauthorized(res);
+    throw new Error(`DELETE ${path} ${res.status}`);
+  }
   return res.json();
 }
 
@@ -1,4 +1,4 @@
-import React, { useState } from "react";
+import React, { useState, useEffect } from "react";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
@@ -7,6 +7,14 @@ import { Textarea } from "@/components/ui/textarea";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { Switch } from "@/components/ui/switch";
 import { Package, Save, X } from "lucide-react";
+import { Currency } from "@/api/entities";
+
+// Used until /api/currencies answers, or if it fails
+const FALLBACK_CURRENCIES = [
+  { code: "EUR", symbol: "€" },
+  { code: "USD", symbol: "$" },
+  { code: "GBP", symbol: "£" }
+];
 
 export default function ProductForm({ product, onSave, onCancel }) {
   const [formData, setFormData] = useState({
@@ -19,6 +27,15 @@ export default function ProductForm({ product, onSave, onCancel }) {
     is_active: product?.is_active !== false
   });
 
+  const [currencies, setCurrencies] = useState(FALLBACK_CURRENCIES);
+
+  // Load currencies from API
+  useEffect(() => {
+    Currency.list()
+      .then(setCurrencies)
+      .catch((error) => console.error("Failed to load currencies:", error));
+  }, []);
+
   const handleSubmit = (e) => {
     e.preventDefault();
     
@@ -106,9 +123,11 @@ export default function ProductForm({ product, onSave, onCancel }) {
                   <SelectValue />
                 </SelectTrigger>
                 <SelectContent className="clay-shadow border-none rounded-2xl">
-                  <SelectItem value="EUR">EUR (€)</SelectItem>
-                  <SelectItem value="USD">USD ($)</SelectItem>
-                  <SelectItem value="GBP">GBP (£)</SelectItem>
+                  {currencies.map((currency) => (
+                    <SelectItem key={currency.code} value={currency.code}>
+                      {currency.code} ({currency.symbol})
+                    </SelectItem>
+                  ))}
                 </SelectContent>
               </Select>
             </div>
@@ -1,6 +1,7 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import { User } from '@/api/entities';
 import { CONFIG } from '@/config/constants';
+import { ACCESS_TOKEN_KEY } from '@/api/integrations';
 
 const AuthContext = createContext();
 
@@ -51,6 +52,7 @@ export const AuthProvider = ({ children }) => {
       if (credential) {
         // Store user in localStorage
         localStorage.setItem('current_user', JSON.stringify(credential.user));
+        localStorage.removeItem(ACCESS_TOKEN_KEY);
         setUser(credential.user);
         setIsAuthenticated(true);
         return { success: true, user: credential.user };
@@ -76,8 +78,9 @@ export const AuthProvider = ({ children }) => {
                 profile_picture_url: dbUser.profile_picture_url || ''
               };
               
-              // Store user in localStorage
+              // Store user and access token in localStorage
               localStorage.setItem('current_user', JSON.stringify(userData));
+              localStorage.setItem(ACCESS_TOKEN_KEY, dbUser.access_token);
               setUser(userData);
               setIsAuthenticated(true);
               return { success: true, user: userData };
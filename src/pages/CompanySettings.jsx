@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from "react";
-import { CompanySettings } from "@/api/entities";
+import { CompanySettings, VatRate } from "@/api/entities";
 import { UploadFile } from "@/api/integrations";
 import { createPageUrl } from "@/utils";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
@@ -56,10 +56,15 @@ export default function CompanySettingsPage() {
   });
   const [isTestingEmail, setIsTestingEmail] = useState(false);
   const [testEmailAddress, setTestEmailAddress] = useState("");
+  const [vatRates, setVatRates] = useState([]);
 
   useEffect(() => {
     loadCompanySettings();
     loadEmailSettings();
+    // Presets suggested for the default VAT rate; any other rate can still be typed
+    VatRate.list()
+      .then(setVatRates)
+      .catch((error) => console.error("Failed to load VAT rates:", error));
   }, []);
 
   const loadEmailSettings = () => {
@@ -581,11 +586,17 @@ export default function CompanySettingsPage() {
                   step="0.1"
                   min="0"
                   max="100"
+                  list="vat-rate-presets"
                   value={companyData.default_vat_rate}
                   onChange={(e) => handleChange("default_vat_rate", parseFloat(e.target.value) || 0)} // Parse to float, default to 0 if invalid
                   className="clay-inset bg-white/60 border-none rounded-2xl h-12"
                   placeholder="4.0"
                 />
+                <datalist id="vat-rate-presets">
+                  {vatRates.map((vatRate) => (
+                    <option key={vatRate.code} value={vatRate.rate}>{vatRate.name}</option>
+                  ))}
+                </datalist>
               </div>
             </div>
 
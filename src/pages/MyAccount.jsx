@@ -1,7 +1,7 @@
 
 import React, { useState, useEffect } from "react";
 import { User } from "@/api/entities";
-import { UploadFile } from "@/api/integrations";
+import { UploadFile, authHeaders } from "@/api/integrations";
 import { CONFIG } from "@/config/constants";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
@@ -164,6 +164,7 @@ export default function MyAccount() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...authHeaders(),
         },
         body: JSON.stringify({
           current_password: passwordData.current_password,
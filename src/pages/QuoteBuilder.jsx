@@ -520,7 +520,7 @@ export default function QuoteBuilder() {
 
       setMessage({
         type: "success",
-        text: "Quotation email sent successfully!"
+        text: "Quotation email queued and will be sent shortly."
       });
 
     } catch (error) {
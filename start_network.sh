@@ -12,6 +12,7 @@ echo "Starting backend..."
 cd "/home/anmolgarg/Downloads/Telegram Desktop/grow-united-qutation-app-09a1ddde(2)"
 source .venv/bin/activate
 cd backend
+python migrate.py || exit 1
 uvicorn main:app --reload --host 0.0.0.0 --port 3000 &
 BACKEND_PID=$!
 